@@ -0,0 +1,115 @@
+"""
+api.py
+HTTP job API for upstream systems: submit reports, poll the job, fetch the result later.
+
+    uvicorn api:app --port 8000      (or: python api.py)
+
+    POST /jobs                  multipart "file" (+ optional "mode")      -> 202 job status
+    POST /jobs/batch            multipart "files" (repeated, + "mode")    -> 202 {"jobs": [...]}
+    GET  /jobs/{job_id}         status: queued / running / done / failed
+    GET  /jobs/{job_id}/result  the five result fields (409 until the job is done)
+    GET  /health                job counts and rate limiter stats
+
+Jobs run with at most JOBS_WORKERS documents in flight (see src/jobs.py).
+"""
+
+import os
+import shutil
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from src.config import JobConfig, PipelineConfig
+from src.jobs import DONE, FAILED, QueueFull, get_job_manager, store_upload
+from src.ratelimit import rate_limit_stats
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    yield
+    get_job_manager().close()  # workery żyją na pętli w tle, nie na pętli serwera
+
+
+app = FastAPI(title="Chart Analysis Jobs", lifespan=_lifespan)
+
+
+def _check_mode(mode: Optional[str]) -> Optional[str]:
+    if mode and mode.lower() not in PipelineConfig.MODES:
+        raise HTTPException(400, f"Unknown mode '{mode}', expected one of {PipelineConfig.MODES}.")
+    return mode.lower() if mode else None
+
+
+def _store(files: List[UploadFile]) -> List[str]:
+    paths = []
+    try:
+        for upload in files:
+            paths.append(store_upload(upload.filename, upload.file))
+    except ValueError as e:
+        _discard(paths)
+        raise HTTPException(400, str(e))
+    return paths
+
+
+def _discard(paths: List[str]) -> None:
+    for path in paths:
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+def _submit(files: List[UploadFile], mode: Optional[str]) -> list:
+    mode = _check_mode(mode)
+    paths = _store(files)
+    try:
+        jobs = get_job_manager().submit_many(paths, mode, owns_file=True)
+    except QueueFull as e:
+        _discard(paths)
+        raise HTTPException(503, str(e))
+    return [job.as_dict() for job in jobs]
+
+
+def _job(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(404, f"Unknown job '{job_id}' (or it expired).")
+    return job
+
+
+# Handlery są synchroniczne: FastAPI uruchamia je w puli wątków (zapis pliku blokuje)
+@app.post("/jobs", status_code=202)
+def submit_job(file: UploadFile = File(...), mode: Optional[str] = Form(None)):
+    return _submit([file], mode)[0]
+
+
+@app.post("/jobs/batch", status_code=202)
+def submit_batch(files: List[UploadFile] = File(...), mode: Optional[str] = Form(None)):
+    if len(files) > JobConfig.MAX_BATCH_FILES:
+        raise HTTPException(413, f"At most {JobConfig.MAX_BATCH_FILES} files per batch.")
+    return {"jobs": _submit(files, mode)}
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    return _job(job_id).as_dict()
+
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = _job(job_id)
+    if job.status == FAILED:
+        return JSONResponse(status_code=500, content=job.as_dict())
+    if job.status != DONE:
+        return JSONResponse(status_code=409, content=job.as_dict())
+    return {"job_id": job.id, **job.result}
+
+
+@app.get("/health")
+def health():
+    return {"jobs": get_job_manager().stats(), "rate_limits": rate_limit_stats()}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    print("Launching job API...")
+    uvicorn.run(app, host=os.getenv("API_HOST", "127.0.0.1"), port=int(os.getenv("API_PORT", "8000")))
@@ -1,6 +1,6 @@
 import gradio as gr
 import os
-from src.pipeline import analyze_report_file
+from src.pipeline import analyze_report_file_stream
 
 example_file_path = os.path.join(os.getcwd(), "data")
 example_1 = os.path.join(example_file_path, "Wydatki.pdf")
@@ -8,8 +8,15 @@ example_2 = os.path.join(example_file_path, "Wydatki.png")
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+
+def analyze(report_file, request: gr.Request):
+    # live=True: a new upload in the same browser session cancels the previous analysis
+    session = request.session_hash if request else None
+    yield from analyze_report_file_stream(report_file, session=session)
+
+
 demo = gr.Interface(
-    fn=analyze_report_file,
+    fn=analyze,  # generator: fields appear as soon as they are ready
     inputs=gr.File(label="File"),
     outputs=[
         gr.Image(label="Chart Preview", type="filepath", height=300),
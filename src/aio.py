@@ -0,0 +1,182 @@
+"""
+aio.py
+Bridge between the blocking API (Gradio, CLI) and the asyncio pipeline.
+
+All blocking wrappers run their coroutines on one long-lived background event loop,
+so async clients (and their keep-alive connections) are reused between calls
+instead of being rebuilt by a fresh asyncio.run() every time.
+"""
+
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Coroutine, Dict, Iterator, Optional, Tuple
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """Returns the shared event loop, starting its daemon thread on first use."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="pipeline-loop", daemon=True
+                )
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+def _check_not_on_loop(loop: asyncio.AbstractEventLoop) -> None:
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("Blocking wrapper called from the pipeline loop - await instead.")
+
+
+def run_sync(coro: Coroutine) -> Any:
+    """
+    Runs a coroutine on the background loop and blocks until it finishes.
+
+    Raises:
+        RuntimeError: When called from the background loop itself (it would deadlock).
+    """
+    loop = get_background_loop()
+    try:
+        _check_not_on_loop(loop)
+    except RuntimeError:
+        coro.close()
+        raise
+
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def iterate_sync(agen: AsyncIterator) -> Iterator:
+    """
+    Consumes an async generator on the background loop as a plain (blocking) generator.
+    Used to hand streaming results to Gradio, which accepts generator functions.
+    """
+    loop = get_background_loop()
+    _check_not_on_loop(loop)
+    try:
+        while True:
+            try:
+                item = asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        # Consumer stopped early (e.g. the UI was cleared) - close the async generator too
+        asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
+
+
+async def merge_async_iterators(streams: Dict[str, AsyncIterator]) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Runs several async iterators concurrently and yields (name, value) as values arrive.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    async def pump(name, iterator):
+        try:
+            async for value in iterator:
+                await queue.put((name, value))
+        finally:
+            await queue.put((name, finished))
+
+    tasks = [asyncio.ensure_future(pump(name, it)) for name, it in streams.items()]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            name, value = await queue.get()
+            if value is finished:
+                remaining -= 1
+                continue
+            yield name, value
+        await asyncio.gather(*tasks)  # re-raise errors of the producers
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class FlightAbandoned(Exception):
+    """The leading computation of a single flight ended without a result (e.g. cancelled)."""
+
+
+class SingleFlight:
+    """
+    De-duplicates concurrent computations: callers with the same key while one is
+    in flight wait for its result instead of starting their own.
+
+    Flights are tracked per event loop (futures cannot be shared between loops);
+    the Gradio handlers all share the background loop, so they coalesce.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Tuple[int, str], asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def pending(self, key: str) -> Optional[asyncio.Future]:
+        """Future of the computation in flight for `key`, if any."""
+        return self._flights.get((id(asyncio.get_running_loop()), key))
+
+    def lead(self, key: str) -> asyncio.Future:
+        """
+        Registers the caller as the computation for `key`; it must resolve the returned
+        future (set_result / set_exception). The flight ends when the future is done.
+        """
+        slot = (id(asyncio.get_running_loop()), key)
+        future = asyncio.get_running_loop().create_future()
+        self._flights[slot] = future
+        future.add_done_callback(lambda done: self._finish(slot, done))
+        self.leaders += 1
+        return future
+
+    def _finish(self, slot: Tuple[int, str], future: asyncio.Future) -> None:
+        self._flights.pop(slot, None)
+        if not future.cancelled():
+            future.exception()  # błąd bez czekających nie jest logowany jako "never retrieved"
+
+    async def follow(self, future: asyncio.Future) -> Any:
+        """Waits for a flight led by someone else (cancelling the wait does not cancel it)."""
+        self.coalesced += 1
+        return await asyncio.shield(future)
+
+    async def run(self, key: str, factory) -> Any:
+        """Result of factory() for `key`, computed once for all concurrent callers."""
+        while True:
+            future = self.pending(key)
+            if future is None:
+                break
+            try:
+                return await self.follow(future)
+            except FlightAbandoned:
+                continue  # lider przerwał - liczymy od nowa (lub dołączamy do nowego lidera)
+
+        future = self.lead(key)
+        task = asyncio.ensure_future(factory())
+        task.add_done_callback(lambda done: _resolve(future, done))
+        # Lider dostaje własny wynik/błąd (np. JobCancelled), czekający - przez future
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+def _resolve(future: asyncio.Future, task: asyncio.Future) -> None:
+    if future.done():
+        return
+    error = None if task.cancelled() else task.exception()
+    if task.cancelled() or (error is not None and not isinstance(error, Exception)):
+        # Anulowanie lidera (CancelledError, JobCancelled) nie dotyczy czekających - liczą sami
+        future.set_exception(FlightAbandoned("Computation was cancelled."))
+    elif error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(task.result())
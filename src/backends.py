@@ -0,0 +1,186 @@
+"""
+backends.py
+Pluggable backends of the OCR and chat-completion stages.
+
+The pipeline talks to an OCRBackend (file -> text lines) and a CompletionBackend
+(chat request -> answer) instead of calling Azure directly, so the same code can run
+against live services or against local stand-ins:
+
+    azure   - Azure Read API (src/modul_ocr.py) and Azure OpenAI (src/llm.py)
+    replay  - stored data/*_ocr_result.txt and data/*.txt files with injected
+              latency and errors (src/replay.py), for load tests and benchmarks
+
+The backend is selected with OCR_BACKEND / LLM_BACKEND (see BackendConfig) or
+replaced at runtime with set_ocr_backend() / set_completion_backend().
+"""
+
+import asyncio
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List, Optional
+
+from .config import BackendConfig
+
+
+class BackendError(Exception):
+    """Error raised by a backend (including failures injected by the replay stand-ins)."""
+
+
+class OCRError(BackendError):
+    """The OCR service did not return a usable operation."""
+
+
+class OCRFailedError(OCRError):
+    """The OCR operation finished with status 'failed'."""
+
+
+class PageChunk:
+    """A range of pages cut out of a PDF (see src/pdf_utils.py), pages numbered from 1."""
+
+    __slots__ = ("source", "data", "first_page", "last_page", "total_pages")
+
+    def __init__(self, source: str, data: bytes, first_page: int, last_page: int, total_pages: int):
+        self.source = source  # ścieżka oryginalnego pliku
+        self.data = data  # bajty jednego, mniejszego PDF-a
+        self.first_page = first_page
+        self.last_page = last_page
+        self.total_pages = total_pages
+
+    @property
+    def label(self) -> str:
+        if self.first_page == self.last_page:
+            return f"strona {self.first_page}"
+        return f"strony {self.first_page}-{self.last_page}"
+
+
+class OCRBackend(ABC):
+    """Reads the text lines of a document (PNG, JPG, JPEG or PDF); subclasses implement read_lines."""
+
+    name = "base"
+
+    @abstractmethod
+    def read_lines(self, path: str) -> List[str]:
+        """
+        Returns the recognized lines in reading order.
+
+        Raises:
+            OCRFailedError: The service could not recognize the document.
+            Exception: Transport and service errors are propagated to the caller.
+        """
+
+    async def read_lines_async(self, path: str) -> List[str]:
+        """Async variant of read_lines (default: runs it in a worker thread)."""
+        return await asyncio.to_thread(self.read_lines, path)
+
+    def read_chunk_lines(self, chunk: PageChunk) -> List[str]:
+        """
+        Lines of one page chunk of a PDF (default: via a temporary file and read_lines).
+        """
+        fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(chunk.data)
+            return self.read_lines(tmp_path)
+        finally:
+            os.remove(tmp_path)
+
+    async def read_chunk_lines_async(self, chunk: PageChunk) -> List[str]:
+        """Async variant of read_chunk_lines (default: runs it in a worker thread)."""
+        return await asyncio.to_thread(self.read_chunk_lines, chunk)
+
+
+class CompletionBackend(ABC):
+    """
+    Answers chat completion requests; subclasses implement complete.
+
+    `request` holds the OpenAI parameters: model, messages, max_tokens, temperature
+    and optionally response_format. `stage` is the pipeline stage name
+    (interpret, summary, short_summary, combined).
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def complete(self, stage: str, request: dict) -> Optional[str]:
+        """Message content of the first choice (None if the model returned nothing)."""
+
+    async def complete_async(self, stage: str, request: dict) -> Optional[str]:
+        """Async variant of complete (default: runs it in a worker thread)."""
+        return await asyncio.to_thread(self.complete, stage, request)
+
+    async def stream_async(self, stage: str, request: dict) -> AsyncIterator[str]:
+        """Yields the answer in pieces (deltas) as they are generated."""
+        content = await self.complete_async(stage, request)
+        if content:
+            yield content
+
+
+_lock = threading.Lock()
+_ocr_backend: Optional[OCRBackend] = None
+_completion_backend: Optional[CompletionBackend] = None
+
+
+def _create_ocr_backend(name: str) -> OCRBackend:
+    if name == "azure":
+        from .modul_ocr import AzureReadBackend
+
+        return AzureReadBackend()
+    if name == "replay":
+        from .replay import ReplayOCRBackend
+
+        return ReplayOCRBackend.from_config()
+    raise ValueError(f"Unknown OCR backend '{name}' (expected one of {BackendConfig.BACKENDS}).")
+
+
+def _create_completion_backend(name: str) -> CompletionBackend:
+    if name == "azure":
+        from .llm import AzureOpenAIBackend
+
+        return AzureOpenAIBackend()
+    if name == "replay":
+        from .replay import ReplayCompletionBackend
+
+        return ReplayCompletionBackend.from_config()
+    raise ValueError(f"Unknown LLM backend '{name}' (expected one of {BackendConfig.BACKENDS}).")
+
+
+def get_ocr_backend() -> OCRBackend:
+    """Process-wide OCR backend (BackendConfig.OCR unless replaced with set_ocr_backend)."""
+    global _ocr_backend
+    if _ocr_backend is None:
+        with _lock:
+            if _ocr_backend is None:
+                _ocr_backend = _create_ocr_backend(BackendConfig.OCR)
+    return _ocr_backend
+
+
+def get_completion_backend() -> CompletionBackend:
+    """Process-wide completion backend (BackendConfig.LLM unless replaced)."""
+    global _completion_backend
+    if _completion_backend is None:
+        with _lock:
+            if _completion_backend is None:
+                _completion_backend = _create_completion_backend(BackendConfig.LLM)
+    return _completion_backend
+
+
+def set_ocr_backend(backend: Optional[OCRBackend]) -> None:
+    """Replaces the OCR backend (None = back to the configured one)."""
+    global _ocr_backend
+    with _lock:
+        _ocr_backend = backend
+
+
+def set_completion_backend(backend: Optional[CompletionBackend]) -> None:
+    """Replaces the completion backend (None = back to the configured one)."""
+    global _completion_backend
+    with _lock:
+        _completion_backend = backend
+
+
+def azure_openai_required() -> bool:
+    """True when completions go to Azure OpenAI, i.e. its credentials must be set."""
+    backend = _completion_backend
+    return backend.name == "azure" if backend is not None else BackendConfig.LLM == "azure"
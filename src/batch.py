@@ -0,0 +1,190 @@
+"""
+batch.py
+Batch processing of a whole directory of reports (nightly backfills).
+
+Walks a directory, runs the analysis pipeline over every supported file with bounded
+concurrency and streams one JSON line per document to the output file. Files that
+already have a successful record in the output are skipped with --resume.
+
+Usage:
+    python -m src.batch data/ --output batch_results.jsonl --workers 8 --resume
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from .pipeline import StageFailed, analyze_report_file_staged_async
+from .ratelimit import rate_limit_stats
+from .tracing import latency_stats
+
+SUPPORTED_EXTENSIONS = (".png", ".pdf", ".jpg", ".jpeg")
+
+# Names of the 5 pipeline outputs, in the order returned by analyze_report_file
+RESULT_FIELDS = ("preview", "short_desc", "key_insights", "conclusion", "text")
+
+
+def find_reports(directory: str, recursive: bool = True) -> List[str]:
+    """Supported report files under `directory`, sorted for a stable processing order."""
+    found = []
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        for name in sorted(names):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                found.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return found
+
+
+def load_checkpoint(output_path: str) -> set:
+    """Files that already have a successful record in an existing output file."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # np. urwana ostatnia linia po przerwanym przebiegu
+            if record.get("status") == "ok":
+                done.add(record.get("file"))
+    return done
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def process_one(path: str, mode: Optional[str] = None) -> dict:
+    """
+    Analyses one file; the record holds the five result fields, status, error and elapsed_ms.
+
+    The pipeline runs stage by stage and stops at the first stage that returns an error
+    answer (e.g. OCR found no text - no LLM call is made then); that stage is recorded
+    in "stage" and the record gets status "error", so --resume processes it again.
+    """
+    started = time.perf_counter()
+    record = {"file": path, "started_at": datetime.now().isoformat()}
+    try:
+        result = await analyze_report_file_staged_async(path, mode)
+        record.update(zip(RESULT_FIELDS, result))
+        record["status"] = "ok"
+    except StageFailed as e:
+        record["status"] = "error"
+        record["stage"] = e.stage
+        record["error"] = str(e)
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e)
+    record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return record
+
+
+async def run_batch(
+    files: Iterable[str],
+    output_path: str,
+    workers: int = 4,
+    append: bool = False,
+    mode: Optional[str] = None,
+) -> dict:
+    """
+    Processes `files` with at most `workers` documents in flight.
+
+    Every record is appended and flushed as soon as it is ready, so an interrupted run
+    loses at most the documents that were in flight.
+
+    Returns:
+        dict: Throughput and failure summary of the run.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for path in files:
+        queue.put_nowait(path)
+    total = queue.qsize()
+
+    latencies: List[float] = []
+    failures: List[str] = []
+    started = time.perf_counter()
+
+    with open(output_path, "a" if append else "w", encoding="utf-8") as out:
+
+        async def worker():
+            while True:
+                try:
+                    path = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                record = await process_one(path, mode)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+
+                latencies.append(record["elapsed_ms"])
+                if record["status"] != "ok":
+                    failures.append(path)
+                print(
+                    f"[Batch] {len(latencies)}/{total} {record['status'].upper()} "
+                    f"{path} ({record['elapsed_ms']} ms)"
+                )
+
+        await asyncio.gather(*(worker() for _ in range(max(1, min(workers, total or 1)))))
+
+    wall_seconds = time.perf_counter() - started
+    return {
+        "documents": total,
+        "succeeded": total - len(failures),
+        "failed": len(failures),
+        "failed_files": failures,
+        "wall_seconds": round(wall_seconds, 2),
+        "throughput_docs_per_min": round(total / wall_seconds * 60, 2) if wall_seconds else 0.0,
+        "latency_ms_p50": _percentile(latencies, 50),
+        "latency_ms_p95": _percentile(latencies, 95),
+        "stages": {
+            name: {key: stats.get(key) for key in ("count", "errors", "p50_ms", "p95_ms", "p99_ms")}
+            for name, stats in latency_stats().items()
+        },
+        "rate_limits": rate_limit_stats(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Analyze every report in a directory.")
+    parser.add_argument("directory", help="Directory with PNG/JPG/PDF reports, e.g. data/")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL output file")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="Documents processed concurrently")
+    parser.add_argument("--resume", action="store_true", help="Skip files already processed successfully")
+    parser.add_argument("--mode", choices=("three_call", "combined"), help="Pipeline mode (default: PIPELINE_MODE)")
+    parser.add_argument("--no-recursive", action="store_true", help="Do not descend into subdirectories")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        print(f"❗ Katalog '{args.directory}' nie istnieje.")
+        return 2
+
+    files = find_reports(args.directory, recursive=not args.no_recursive)
+    skipped = 0
+    if args.resume:
+        done = load_checkpoint(args.output)
+        skipped = sum(1 for path in files if path in done)
+        files = [path for path in files if path not in done]
+
+    print(f"[Batch] {len(files)} files to process ({skipped} skipped from checkpoint).")
+    summary = asyncio.run(run_batch(files, args.output, args.workers, append=args.resume, mode=args.mode))
+    summary["skipped"] = skipped
+
+    print("\n=== Batch summary ===")
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+"""
+benchmark.py
+Per-stage benchmark of the analysis pipeline over the sample corpus in data/.
+
+Runs the OCR, interpretation and summary stages and the full pipeline at several
+concurrency levels and reports p50/p95/p99 latency, throughput and peak memory.
+By default the replay backends are used (see src/replay.py), so the numbers measure
+our own code plus the simulated service latency - no Azure quota is needed.
+
+Results are written as JSON; pass a previous result file with --baseline to flag
+regressions (exit code 1).
+
+Usage:
+    python -m src.benchmark --concurrency 1,4,16 --iterations 3 --output benchmark_results.json
+    python -m src.benchmark --baseline benchmark_results.json --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+try:
+    import resource  # tylko Unix
+except ImportError:
+    resource = None
+
+from .backends import set_completion_backend, set_ocr_backend
+from .batch import find_reports
+from .config import CacheConfig, LLMCacheConfig, PipelineConfig, ReplayConfig
+from .data_interpreter import EMPTY_ANSWER, ERROR_MESSAGE, interpret_async
+from .modul_ocr import NO_TEXT_RESULT, OCR_FAILED_RESULT, get_text_from_file_async
+from .pipeline import StageFailed, analyze_report_file_async, check_result
+from .ratelimit import rate_limit_stats
+from .replay import FaultInjector, ReplayCompletionBackend, ReplayOCRBackend, shared_recordings
+from .summarizer import ERROR_PREFIXES, create_short_summary_async, create_summary_async
+
+STAGES = ("ocr", "interpret", "short_summary", "summary", "pipeline", "pipeline_combined")
+
+# Metrics compared against the baseline: name -> True if higher is better
+COMPARED_METRICS = {"latency_ms_p50": False, "latency_ms_p95": False, "throughput_ops_per_s": True}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile (pct in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _is_error(stage: str, result: Any) -> bool:
+    if stage == "ocr":
+        return not result or result in (OCR_FAILED_RESULT, NO_TEXT_RESULT)
+    if stage == "interpret":
+        return result in (ERROR_MESSAGE, EMPTY_ANSWER)
+    if stage in ("short_summary", "summary"):
+        return not result or result.startswith(ERROR_PREFIXES)
+    try:
+        check_result(result)  # błąd dowolnego etapu potoku (OCR, interpretacja, streszczenia)
+    except StageFailed:
+        return True
+    return False
+
+
+async def _run_level(
+    stage: str, call: Callable[[Any], Awaitable[Any]], inputs: List[Any], concurrency: int
+) -> dict:
+    """Runs `call` over `inputs` with at most `concurrency` calls in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(item):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await call(item)
+                failed = _is_error(stage, result)
+            except Exception:
+                failed = True
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(item) for item in inputs))
+    wall = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "operations": len(inputs),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_ops_per_s": round(len(inputs) / wall, 3) if wall else 0.0,
+        "latency_ms_p50": round(percentile(latencies, 50), 2),
+        "latency_ms_p95": round(percentile(latencies, 95), 2),
+        "latency_ms_p99": round(percentile(latencies, 99), 2),
+        "latency_ms_max": round(max(latencies), 2) if latencies else 0.0,
+    }
+
+
+async def _peak_alloc_mb(call: Callable[[Any], Awaitable[Any]], inputs: List[Any], concurrency: int) -> float:
+    """
+    Peak Python allocations of one untimed pass over `inputs` (tracemalloc slows every
+    allocation down, so it never runs during the timed passes).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(item):
+        async with semaphore:
+            try:
+                await call(item)
+            except Exception:
+                pass
+
+    tracemalloc.start()
+    try:
+        await asyncio.gather(*(one(item) for item in inputs))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1024 * 1024), 3)
+
+
+async def _prepare_inputs(files: List[str]) -> Dict[str, List[Any]]:
+    """Stage inputs: files for OCR, OCR text for interpretation, interpretations for summaries."""
+    texts = [await get_text_from_file_async(path) for path in files]
+    interpretations = [await interpret_async(text) for text in texts]
+    return {
+        "ocr": files,
+        "interpret": texts,
+        "short_summary": interpretations,
+        "summary": interpretations,
+        "pipeline": files,
+        "pipeline_combined": files,
+    }
+
+
+STAGE_CALLS: Dict[str, Callable[[Any], Awaitable[Any]]] = {
+    "ocr": get_text_from_file_async,
+    "interpret": interpret_async,
+    "short_summary": create_short_summary_async,
+    "summary": create_summary_async,
+    "pipeline": lambda path: analyze_report_file_async(path, "three_call"),
+    "pipeline_combined": lambda path: analyze_report_file_async(path, "combined"),
+}
+
+
+async def run_benchmark(
+    files: List[str],
+    stages: List[str],
+    concurrency_levels: List[int],
+    iterations: int = 3,
+    verbose: bool = False,
+) -> dict:
+    """
+    Benchmarks every stage at every concurrency level.
+
+    Each level processes the corpus `iterations` times, then once more untimed to
+    measure peak memory. Pipeline output is silenced unless `verbose` is set (printing
+    would dominate the timings).
+    """
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    results: Dict[str, List[dict]] = {}
+    with quiet:
+        inputs = await _prepare_inputs(files)  # także rozgrzewka: indeks nagrań, klienci
+        for stage in stages:
+            results[stage] = []
+            for concurrency in concurrency_levels:
+                level = await _run_level(
+                    stage, STAGE_CALLS[stage], inputs[stage] * iterations, concurrency
+                )
+                level["peak_alloc_mb"] = await _peak_alloc_mb(STAGE_CALLS[stage], inputs[stage], concurrency)
+                results[stage].append(level)
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[dict]:
+    """
+    Regressions of `current` against `baseline` (both as written by main).
+
+    A metric regresses when it is worse than the baseline by more than `threshold`
+    (a fraction, e.g. 0.2 = 20 %).
+    """
+    regressions = []
+    for stage, levels in current.get("results", {}).items():
+        old_levels = {lvl["concurrency"]: lvl for lvl in baseline.get("results", {}).get(stage, [])}
+        for level in levels:
+            old = old_levels.get(level["concurrency"])
+            if not old:
+                continue
+            for metric, higher_is_better in COMPARED_METRICS.items():
+                before, after = old.get(metric), level.get(metric)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before
+                if (-change if higher_is_better else change) > threshold:
+                    regressions.append(
+                        {
+                            "stage": stage,
+                            "concurrency": level["concurrency"],
+                            "metric": metric,
+                            "baseline": before,
+                            "current": after,
+                            "change": round(change, 3),
+                        }
+                    )
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _max_rss_mb() -> Optional[float]:
+    """Peak resident memory of the process (None where the resource module is missing, e.g. Windows)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux podaje kilobajty, macOS bajty
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _use_replay_backends(args) -> dict:
+    recordings = shared_recordings()
+    set_ocr_backend(
+        ReplayOCRBackend(
+            recordings,
+            FaultInjector(args.ocr_latency_ms, ReplayConfig.LATENCY_JITTER, args.error_rate, args.seed),
+        )
+    )
+    set_completion_backend(
+        ReplayCompletionBackend(
+            recordings,
+            FaultInjector(args.llm_latency_ms, ReplayConfig.LATENCY_JITTER, args.error_rate, args.seed),
+            args.tokens_per_second,
+        )
+    )
+    return {
+        "ocr_latency_ms": args.ocr_latency_ms,
+        "llm_latency_ms": args.llm_latency_ms,
+        "latency_jitter": ReplayConfig.LATENCY_JITTER,
+        "tokens_per_second": args.tokens_per_second,
+        "error_rate": args.error_rate,
+        "seed": args.seed,
+    }
+
+
+def _print_table(results: dict) -> None:
+    header = f"{'stage':<18}{'conc':>5}{'ops':>6}{'err':>5}{'ops/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'mem MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for stage, levels in results.items():
+        for lvl in levels:
+            print(
+                f"{stage:<18}{lvl['concurrency']:>5}{lvl['operations']:>6}{lvl['errors']:>5}"
+                f"{lvl['throughput_ops_per_s']:>9.2f}{lvl['latency_ms_p50']:>9.1f}"
+                f"{lvl['latency_ms_p95']:>9.1f}{lvl['latency_ms_p99']:>9.1f}{lvl['peak_alloc_mb']:>8.2f}"
+            )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline stage by stage.")
+    parser.add_argument("directory", nargs="?", default=ReplayConfig.DATA_DIR, help="Corpus (default: data/)")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma separated subset of {STAGES}")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma separated concurrency levels")
+    parser.add_argument("--iterations", type=int, default=3, help="Passes over the corpus per level")
+    parser.add_argument("--backend", choices=("replay", "configured"), default="replay",
+                        help="replay = simulated services (default), configured = OCR_BACKEND/LLM_BACKEND")
+    parser.add_argument("--ocr-latency-ms", type=float, default=ReplayConfig.OCR_LATENCY_MS or 800)
+    parser.add_argument("--llm-latency-ms", type=float, default=ReplayConfig.LLM_LATENCY_MS or 300)
+    parser.add_argument("--tokens-per-second", type=float, default=ReplayConfig.LLM_TOKENS_PER_SECOND)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Injected failure rate of every call")
+    parser.add_argument("--seed", default=ReplayConfig.SEED or "benchmark")
+    parser.add_argument(
+        "--with-cache", action="store_true", help="Keep the OCR/LLM result caches and single-flight coalescing enabled"
+    )
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON result file")
+    parser.add_argument("--baseline", help="Previous result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show pipeline output")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+    concurrency_levels = [max(1, int(c)) for c in args.concurrency.split(",") if c.strip()]
+
+    files = find_reports(args.directory)
+    if not files:
+        print(f"❗ Brak plików do przetestowania w '{args.directory}'.")
+        return 2
+
+    if not args.with_cache:
+        # Cache zafałszowałby pomiary po pierwszym przebiegu
+        CacheConfig.ENABLED = False
+        LLMCacheConfig.ENABLED = False
+        PipelineConfig.COALESCE = False  # równoległe kopie tego samego pliku liczone osobno
+    backend_settings = _use_replay_backends(args) if args.backend == "replay" else None
+
+    print(f"[Benchmark] {len(files)} files, stages: {', '.join(stages)}, concurrency: {concurrency_levels}")
+    results = asyncio.run(run_benchmark(files, stages, concurrency_levels, args.iterations, args.verbose))
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "files": len(files),
+            "iterations": args.iterations,
+            "cache_enabled": args.with_cache,
+            "backend": args.backend,
+            "replay": backend_settings,
+            "max_rss_mb": _max_rss_mb(),
+        },
+        "results": results,
+        "rate_limits": rate_limit_stats(),
+    }
+
+    print()
+    _print_table(results)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        report["regressions"] = regressions
+        print(f"\n=== Comparison with {args.baseline} (threshold {args.threshold:.0%}) ===")
+        for r in regressions:
+            print(
+                f"⚠️ REGRESSION {r['stage']} @ {r['concurrency']}: {r['metric']} "
+                f"{r['baseline']} -> {r['current']} ({r['change']:+.0%})"
+            )
+        if not regressions:
+            print("✓ No regressions.")
+        exit_code = 1 if regressions else 0
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Results saved to {args.output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+cache.py
+Two-tier, content-addressed result cache (in-process LRU + on-disk store).
+
+Used to skip repeated Azure round trips for inputs we have already seen,
+e.g. the same PDF uploaded twice or Gradio re-running the pipeline with live=True.
+Values must be JSON-serializable (str, dict, list, numbers). get() and set() copy them, so callers
+may mutate what they store or receive without changing the cached entry.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from .config import CacheConfig
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(*parts: Any) -> str:
+    """
+    Builds a stable cache key (sha256 hex) from any JSON-serializable parts.
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Returns the sha256 hex digest of a file's bytes (read in chunks).
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TwoTierCache:
+    """
+    LRU memory tier in front of a directory of JSON files.
+
+    Entries expire after `ttl_seconds`. The memory tier is bounded by entry count,
+    the disk tier by total size in bytes (oldest files are removed first).
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 256,
+        ttl_seconds: float = 7 * 24 * 3600,
+        disk_dir: Optional[str] = None,
+        max_disk_bytes: int = 200 * 1024 * 1024,
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = os.path.join(disk_dir, namespace) if disk_dir else None
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None  # liczone leniwie przy pierwszym zapisie
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # -------------------------
+    # Public API
+    # -------------------------
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value or None (miss or expired)."""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return copy.deepcopy(value)
+                del self._memory[key]
+
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits_disk += 1
+            self._remember(key, entry)
+        return copy.deepcopy(entry[1])
+
+    def set(self, key: str, value: Any) -> None:
+        """Stores a copy of the value in both tiers."""
+        entry = (time.time(), copy.deepcopy(value))
+        with self._lock:
+            self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def clear(self) -> None:
+        """Drops all entries from both tiers (counters are kept)."""
+        with self._lock:
+            self._memory.clear()
+            self._disk_bytes = 0
+        for path in self._disk_files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Hit/miss counters for monitoring."""
+        with self._lock:
+            hits = self.hits_memory + self.hits_disk
+            total = hits + self.misses
+            return {
+                "namespace": self.namespace,
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(hits / total, 3) if total else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    # -------------------------
+    # Memory tier
+    # -------------------------
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        # Wywoływane pod self._lock
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    # -------------------------
+    # Disk tier
+    # -------------------------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + ".json")
+
+    def _read_disk(self, key: str, now: float) -> Optional[tuple]:
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        created = data.get("created", 0)
+        if now - created > self.ttl_seconds:
+            self._remove_file(path)
+            return None
+        return created, data.get("value")
+
+    def _write_disk(self, key: str, entry: tuple) -> None:
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"created": entry[0], "value": entry[1]}, f, ensure_ascii=False)
+            old_size = self._file_size(path)  # nadpisanie klucza - stary plik przestaje się liczyć
+            os.replace(tmp_path, path)  # atomowa podmiana - brak połówkowych plików
+            size = os.path.getsize(path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Cache '{self.namespace}': nie udało się zapisać wpisu: {e}")
+            self._remove_file(tmp_path)
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(self._file_size(p) for p in self._disk_files())
+            else:
+                self._disk_bytes += size - old_size
+            over_limit = self._disk_bytes > self.max_disk_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        files = []
+        for path in self._disk_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_disk_bytes * 0.9)  # trochę zapasu, żeby nie czyścić przy każdym zapisie
+        removed = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            if self._remove_file(path):
+                total -= size
+                removed += 1
+
+        with self._lock:
+            self._disk_bytes = total
+            self.evictions += removed
+
+    def _disk_files(self):
+        if not self.disk_dir or not os.path.isdir(self.disk_dir):
+            return
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                if name.endswith(".json"):
+                    yield os.path.join(root, name)
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove_file(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+_caches: dict = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(
+    namespace: str, persistent: Optional[bool] = None, max_entries: Optional[int] = None
+) -> TwoTierCache:
+    """
+    Returns the process-wide cache for a namespace (e.g. "ocr"), configured from CacheConfig.
+
+    Args:
+        namespace (str): Cache name, also the sub-directory of the disk tier.
+        persistent (bool, optional): Overrides CacheConfig.DISK_ENABLED on first creation.
+        max_entries (int, optional): Overrides CacheConfig.MEMORY_MAX_ENTRIES on first creation
+            (smaller memory tier for large values such as images).
+    """
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            if persistent is None:
+                persistent = CacheConfig.DISK_ENABLED
+            cache = TwoTierCache(
+                namespace,
+                max_entries=CacheConfig.MEMORY_MAX_ENTRIES if max_entries is None else max_entries,
+                ttl_seconds=CacheConfig.TTL_SECONDS,
+                disk_dir=CacheConfig.DIR if persistent else None,
+                max_disk_bytes=CacheConfig.DISK_MAX_MB * 1024 * 1024,
+            )
+            _caches[namespace] = cache
+        return cache
+
+
+def cache_stats() -> list:
+    """Stats of every cache created so far."""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [cache.stats() for cache in caches]
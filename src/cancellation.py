@@ -0,0 +1,195 @@
+"""
+cancellation.py
+Cooperative cancellation of pipeline runs.
+
+A run gets a CancellationToken; polling loops, rate-limit queues and LLM calls check
+the current token and stop with JobCancelled once it is cancelled:
+
+    token = session_jobs.start(session_id, key)   # cancels the session's previous run
+    with use_token(token):
+        ...
+        check_cancelled()
+
+The current token lives in a ContextVar (like the current span in tracing.py), so it
+reaches asyncio tasks, asyncio.to_thread and executors started with copy_context().
+Async generators iterate nested generators with bind_token(); cancellable() stops an
+await (e.g. waiting for another run's result) as soon as the token is cancelled.
+
+JobCancelled derives from BaseException (as asyncio.CancelledError does), so the
+`except Exception` handlers of the stages do not turn it into an error message.
+"""
+
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class JobCancelled(BaseException):
+    """The run was cancelled (e.g. superseded by a newer upload in the same session)."""
+
+
+class CancellationToken:
+    """Thread-safe cancellation flag of one run."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """Cancels the token (only the first call counts) and runs the callbacks."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        """Runs `callback` on cancellation (immediately if already cancelled)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise JobCancelled(self.reason)
+
+    def wait(self, timeout: float) -> bool:
+        """Sleeps up to `timeout` seconds, returning early (True) on cancellation."""
+        return self._event.wait(timeout)
+
+
+_current: ContextVar[Optional[CancellationToken]] = ContextVar("cancellation_token", default=None)
+
+
+def current_token() -> Optional[CancellationToken]:
+    return _current.get()
+
+
+def check_cancelled() -> None:
+    """Raises JobCancelled when the current run has been cancelled (no-op outside of a run)."""
+    token = _current.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+@contextmanager
+def use_token(token: Optional[CancellationToken]) -> Iterator[Optional[CancellationToken]]:
+    """Makes `token` the current cancellation token for the block."""
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        try:
+            _current.reset(reset)
+        except ValueError:
+            # Token z innego kontekstu (np. zamknięty generator) - ustawiamy ręcznie
+            _current.set(None)
+
+
+async def bind_token(agen: AsyncIterator, token: Optional[CancellationToken]) -> AsyncIterator:
+    """Iterates an async generator with `token` current for each of its steps (see tracing.bind)."""
+    try:
+        while True:
+            with use_token(token):
+                try:
+                    value = await agen.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield value
+    finally:
+        await agen.aclose()
+
+
+async def cancellable(awaitable: Awaitable) -> Any:
+    """
+    Awaits `awaitable` (as a task), cancelling it and raising JobCancelled as soon as the
+    current token is cancelled - also while the task waits on the network.
+    """
+    token = _current.get()
+    if token is None:
+        return await awaitable
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(awaitable)
+    stop = loop.create_future()
+
+    def wake():
+        if not stop.done():
+            stop.set_result(None)
+
+    # cancel() bywa wywołane z innego wątku (UI) - budzimy pętlę bezpiecznie
+    token.add_callback(lambda: loop.call_soon_threadsafe(wake))
+    try:
+        await asyncio.wait({task, stop}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        wake()
+        if not task.done():
+            task.cancel()
+    token.raise_if_cancelled()
+    return task.result()
+
+
+class SessionJobs:
+    """
+    The running jobs of every UI session. Starting a job for another document cancels
+    all of the session's running jobs; re-submitting the same document does not (the
+    new job joins the run in flight, see pipeline.py), so a session can hold several
+    jobs for one document - every one of them is cancelled on supersede or clear.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, List[Tuple[CancellationToken, Optional[str]]]] = {}
+
+    def start(self, session: str, key: Optional[str] = None) -> CancellationToken:
+        token = CancellationToken()
+        with self._lock:
+            jobs = self._jobs.setdefault(session, [])
+            superseded = [job for job in jobs if key is None or job[1] != key]
+            jobs[:] = [job for job in jobs if job not in superseded]
+            jobs.append((token, key))
+        for previous, _ in superseded:
+            previous.cancel("superseded by a newer request")
+        return token
+
+    def finish(self, session: str, token: CancellationToken) -> None:
+        """Forgets the job (a no-op when it was cancelled and dropped already)."""
+        with self._lock:
+            jobs = self._jobs.get(session)
+            if jobs is None:
+                return
+            jobs[:] = [job for job in jobs if job[0] is not token]
+            if not jobs:
+                del self._jobs[session]
+
+    def cancel(self, session: str, reason: str = "cancelled") -> bool:
+        """Cancels all running jobs of the session; False when there is none."""
+        with self._lock:
+            jobs = self._jobs.pop(session, [])
+        for token, _ in jobs:
+            token.cancel(reason)
+        return bool(jobs)
+
+    def running(self, session: str) -> int:
+        """Number of running jobs of the session."""
+        with self._lock:
+            return len(self._jobs.get(session, ()))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+
+session_jobs = SessionJobs()
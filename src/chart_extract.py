@@ -0,0 +1,239 @@
+"""
+chart_extract.py
+Deterministic pre-extraction of chart data from OCR text (runs between OCR and interpret).
+
+Numbers, percentages, units, years and label/value pairs are parsed locally and sent
+to the model as a compact table instead of the raw OCR lines:
+
+    TEXT:
+    Sales by quarter (USD)
+    LABEL | VALUE
+    Q1 | 25000
+    Q2 | 31500
+    VALUES (reading order): 11.8%, 35.3%
+    UNITS: USD
+    YEARS: 2023
+
+Common OCR digit confusions inside numbers are fixed on the way ("25.OOO" -> 25000,
+"l2" -> 12). Pairs are only taken from a single line ("Q1: 25000"); values recognised
+on separate lines are listed in reading order, the model matches them to the labels.
+Captions and numbering ("Chart n° 04") stay text.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from .config import ChartDataConfig
+from .tracing import span
+
+# Letters OCR confuses with digits, fixed only inside tokens that already contain a digit
+DIGIT_CONFUSIONS = str.maketrans({"O": "0", "o": "0", "l": "1", "I": "1", "|": "1"})
+
+_CONFUSED_NUMBER = re.compile(r"(?<![\w.,])[\dOolI|]*\d[\dOolI|]*(?:[.,][\dOolI|]+)*(?![\w])")
+
+# Number (optionally with thousand separators, decimals, currency and unit) not glued to a word
+_NUMBER = re.compile(
+    r"(?<![\w/.,])(?P<currency>[$€£])?\s?"
+    r"(?P<number>[-+]?(?:\d{1,3}(?:(?P<sep>[.,])\d{3})(?:(?P=sep)\d{3})*|\d{1,2}(?: \d{3})+|\d+)(?:[.,]\d+)?)"
+    r"(?P<unit>\s?%|\s?(?:k|K|M|mln|bn|USD|EUR|PLN|zł)\b)?"
+    r"(?![\w/])"
+)
+
+# Unit symbols and words recognised anywhere in the text
+UNIT_SYMBOLS = ("%", "$", "€", "£")
+_UNITS = re.compile(
+    r"(?<!\w)(percent|USD|EUR|PLN|GBP|zł|thous\.|thousands?|mln|millions?|bn|billions?|"
+    r"kg|tons?|tonnes|km|hours?|days?|years?|people|users)(?!\w)",
+    re.IGNORECASE,
+)
+
+_LABEL_STRIP = " \t:;.,-_=*|()[]"
+
+# Labels of a pair: at most this many words / characters, otherwise the line is text
+MAX_LABEL_WORDS = 4
+MAX_LABEL_CHARS = 30
+
+# Captions and numbering ("Chart n° 04", "Fig. 2", "Page 3") are text, not label/value pairs:
+# a numbering marker right before a number, or a label that is just a caption word
+_NUMBERING = re.compile(r"(?:n°|nº|nr\.?|#|№)\s*\d", re.IGNORECASE)
+CAPTION_WORDS = frozenset(
+    ("chart", "figure", "fig", "graph", "table", "tab", "slide", "page", "wykres", "rys", "rysunek", "tabela", "strona")
+)
+
+# Zero-padded numbers ("04", "007") are identifiers, not measured values
+_IDENTIFIER = re.compile(r"0\d+")
+
+
+class ChartData:
+    """Result of the pre-extraction; render() gives the table sent to the model."""
+
+    __slots__ = ("text_lines", "pairs", "values", "units", "years", "fixes")
+
+    def __init__(self):
+        self.text_lines: List[str] = []
+        self.pairs: List[Tuple[str, str]] = []
+        self.values: List[str] = []
+        self.units: List[str] = []
+        self.years: List[str] = []
+        self.fixes: List[Tuple[str, str]] = []  # (jak w OCR, po poprawce)
+
+    @property
+    def has_numbers(self) -> bool:
+        return bool(self.pairs or self.values)
+
+    def render(self) -> str:
+        parts = []
+        if self.text_lines:
+            parts.append("TEXT:\n" + "\n".join(self.text_lines))
+        if self.pairs:
+            parts.append("LABEL | VALUE\n" + "\n".join(f"{label} | {value}" for label, value in self.pairs))
+        if self.values:
+            parts.append("VALUES (reading order): " + ", ".join(self.values))
+        if self.units:
+            parts.append("UNITS: " + ", ".join(self.units))
+        if self.years:
+            parts.append("YEARS: " + ", ".join(self.years))
+        return "\n".join(parts)
+
+
+def fix_digits(line: str, fixes: Optional[list] = None) -> str:
+    """Replaces O/o -> 0 and l/I/| -> 1 in tokens that are otherwise numbers ("29,8OO")."""
+
+    def fix(match: re.Match) -> str:
+        token = match.group(0)
+        fixed = token.translate(DIGIT_CONFUSIONS)
+        if fixed != token and fixes is not None:
+            fixes.append((token, fixed))
+        return fixed
+
+    return _CONFUSED_NUMBER.sub(fix, line)
+
+
+def normalize_number(raw: str, sep: Optional[str] = None) -> str:
+    """
+    "31 500" -> "31500", "25.000" -> "25000", "12,5" -> "12.5", "1.234,5" -> "1234.5".
+
+    `sep` is the thousand separator the number was matched with; a separator
+    followed by exactly three digits is read as one (how charts print 25.000 /
+    25,000), any other last separator as the decimal point.
+    """
+    parts = re.split(r"([.,])", raw.replace(" ", ""))
+    digits, seps = parts[0::2], parts[1::2]
+    if not seps:
+        return digits[0]
+    decimal = None
+    if sep is None or seps[-1] != sep or len(digits[-1]) != 3:
+        decimal = digits.pop()
+    value = "".join(digits)
+    return f"{value}.{decimal}" if decimal is not None else value
+
+
+def _is_year(value: str, unit: Optional[str], currency: Optional[str]) -> bool:
+    return not unit and not currency and value.isdigit() and len(value) == 4 and 1900 <= int(value) <= 2100
+
+
+def _numbers(line: str):
+    """(start, end, value as shown to the model, is_year) of every number in the line."""
+    found = []
+    for match in _NUMBER.finditer(line):
+        currency = match.group("currency")
+        unit = (match.group("unit") or "").strip() or None
+        value = normalize_number(match.group("number"), match.group("sep"))
+        shown = (currency or "") + value + ("%" if unit == "%" else f" {unit}" if unit else "")
+        found.append((match.start(), match.end(), shown, _is_year(value, unit, currency)))
+    return found
+
+
+def _label(line: str, numbers: list) -> str:
+    residual, last = [], 0
+    for start, end, _, _ in numbers:
+        residual.append(line[last:start])
+        last = end
+    residual.append(line[last:])
+    return " ".join("".join(residual).split()).strip(_LABEL_STRIP)
+
+
+def _is_label(label: str) -> bool:
+    words = label.split()
+    return (
+        0 < len(words) <= MAX_LABEL_WORDS
+        and len(label) <= MAX_LABEL_CHARS
+        # "S a 1 e s" (rozstrzelone litery) to szum, nie etykieta
+        and any(len(word.strip(_LABEL_STRIP)) >= 2 for word in words)
+    )
+
+
+def _is_caption(line: str, label: str, values: list) -> bool:
+    return (
+        label.casefold() in CAPTION_WORDS
+        or bool(_NUMBERING.search(line))
+        or any(_IDENTIFIER.fullmatch(value) for _, _, value, _ in values)
+    )
+
+
+def extract(ocr_text: str) -> ChartData:
+    """Parses OCR text (one recognised line per line) into ChartData."""
+    data = ChartData()
+    seen_text, seen_pairs = set(), set()
+
+    for raw_line in ocr_text.splitlines():
+        # "_" po OCR to szum przyklejony do liczb ("29800_")
+        line = " ".join(fix_digits(raw_line.replace("_", " "), data.fixes).split())
+        if not line:
+            continue
+
+        numbers = _numbers(line)
+        for _, _, value, is_year in numbers:
+            if is_year and value not in data.years:
+                data.years.append(value)
+        values = [n for n in numbers if not n[3]]
+        label = _label(line, numbers)
+
+        if not values and not label:
+            continue  # same lata (np. oś X) - są już w YEARS
+        if values and not label:
+            data.values.extend(value for _, _, value, _ in values)
+        elif values and len(values) == len(numbers) and _is_label(label) and not _is_caption(line, label, values):
+            pair = (label, " ".join(value for _, _, value, _ in values))
+            if pair not in seen_pairs:
+                seen_pairs.add(pair)
+                data.pairs.append(pair)
+        elif line.lower() not in seen_text:
+            seen_text.add(line.lower())
+            data.text_lines.append(line)
+
+    data.units.extend(symbol for symbol in UNIT_SYMBOLS if symbol in ocr_text)
+    for match in _UNITS.finditer(ocr_text):
+        unit = match.group(1)
+        if unit.lower() not in (u.lower() for u in data.units):
+            data.units.append(unit)
+    return data
+
+
+def compact_chart_text(ocr_text: str) -> str:
+    """
+    Text sent to the model for `ocr_text`: the compact table, or the OCR text itself when
+    pre-extraction is disabled, finds no numbers or would not be shorter.
+    """
+    if not ChartDataConfig.PRE_EXTRACT or not ocr_text or not ocr_text.strip():
+        return ocr_text
+
+    with span("chart_extract", chars_in=len(ocr_text)) as extract_span:
+        data = extract(ocr_text)
+        table = data.render()
+        used = data.has_numbers and len(table) < len(ocr_text.strip())
+        extract_span.set(
+            chars_out=len(table) if used else len(ocr_text),
+            pairs=len(data.pairs),
+            values=len(data.values),
+            digit_fixes=len(data.fixes),
+            used=used,
+        )
+        return table if used else ocr_text
+
+
+def data_heading(chart_data: str, ocr_text: str) -> str:
+    """Prompt heading above the data returned by compact_chart_text()."""
+    if chart_data is ocr_text:
+        return "OCR data:"
+    return "OCR data (pre-extracted table; OCR digit errors fixed, thousand separators removed):"
@@ -0,0 +1,128 @@
+"""
+combined_analyzer.py
+Single-round-trip analysis: key insights, one-line description and conclusion
+from ONE chat completion instead of three (interpret -> short summary -> summary).
+
+The model answers with a JSON object which is split into the same fields the
+three-call pipeline produces. Used by the pipeline in "combined" mode.
+"""
+
+import json
+import logging
+from typing import Optional, Tuple
+
+from .backends import azure_openai_required, get_completion_backend
+from .chart_extract import compact_chart_text, data_heading
+from .config import AzureConfig
+from .llm import chat_completion, chat_completion_async, fit_input
+
+logger = logging.getLogger(__name__)
+
+MAX_TOKENS = 700  # ~ 400 (interpret) + 250 (summary) + 40 (short summary)
+TEMPERATURE = 0.2
+
+
+def _build_messages(ocr_text: str) -> list:
+    """
+    One prompt covering the interpretation rules and both summary styles.
+    """
+    ocr_text = fit_input("combined", ocr_text)
+    chart_data = compact_chart_text(ocr_text)
+    prompt = f"""
+Interpret the following OCR text extracted from a chart, then summarize it.
+Clean OCR errors and recover numeric values. Do NOT guess missing information:
+if something is not present, write "unknown". Use only the content of the OCR text.
+
+Return ONLY a JSON object with exactly these keys:
+
+"key_insights": a structured interpretation, one item per line:
+    - Name of chart: <cleaned title or "unknown">
+    - Source of chart: <if mentioned, otherwise "unknown">
+    - Type of chart: <bar, line, pie, scatter, ... only if clearly determined, otherwise "unknown">
+    - Variables (axes or categories): <list of variables extracted from the text>
+    - Units: <if identified, otherwise "unknown">
+    - Topic of chart (1–2 sentences): <short explanation of what the chart describes>
+    - Trends (2–3 sentences): <main trend(s) visible in the data>
+    - Highest and lowest values: <specify category + value for highest and lowest>
+    - Confidence of your answers: <low / medium / high>
+
+"short_description": one sentence describing the main purpose of the chart.
+
+"conclusion": a summary for a non-technical reader, maximum 10 sentences,
+    positive and fun in tone, focused on trends, differences and key figures,
+    describing the data in words without repeating raw numbers one by one.
+
+{data_heading(chart_data, ocr_text)}
+{chart_data}
+"""
+    return [
+        {
+            "role": "system",
+            "content": "You are an expert of data analysis and charts and a helpful business assistant.",
+        },
+        {"role": "user", "content": prompt},
+    ]
+
+
+def _request(ocr_text: str) -> dict:
+    deployment = AzureConfig.AZURE_OPENAI_DEPLOYMENT_NAME
+    if azure_openai_required() and (
+        not AzureConfig.AZURE_OPENAI_ENDPOINT or not AzureConfig.AZURE_OPENAI_KEY or not deployment
+    ):
+        raise ValueError("Missing Azure OpenAI credentials in .env file.")
+    return {
+        "model": deployment,
+        "messages": _build_messages(ocr_text),
+        "max_tokens": MAX_TOKENS,
+        "temperature": TEMPERATURE,
+        "response_format": {"type": "json_object"},
+    }
+
+
+def _split(raw: Optional[str]) -> Optional[Tuple[str, str, str]]:
+    """
+    Splits the JSON answer into (key_insights, short_desc, conclusion), None if unusable.
+    """
+    if not raw:
+        return None
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        logger.warning("⚠️ Combined mode: model answer is not valid JSON.")
+        return None
+
+    fields = []
+    for name in ("key_insights", "short_description", "conclusion"):
+        value = data.get(name) if isinstance(data, dict) else None
+        if isinstance(value, list):
+            value = "\n".join(str(item) for item in value)
+        if not isinstance(value, str) or not value.strip():
+            logger.warning(f"⚠️ Combined mode: missing '{name}' in model answer.")
+            return None
+        fields.append(value.strip())
+    return fields[0], fields[1], fields[2]
+
+
+def analyze_combined(ocr_text: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Key insights, short description and conclusion from a single chat completion.
+
+    Returns:
+        tuple | None: (key_insights, short_desc, conclusion), or None when the model
+            answer could not be used (the caller falls back to the three-call path).
+
+    Raises:
+        Exception: Configuration or connection errors are propagated.
+    """
+    request = _request(ocr_text)
+    raw = chat_completion(get_completion_backend(), "combined", **request)
+    return _split(raw)
+
+
+async def analyze_combined_async(ocr_text: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Async variant of analyze_combined().
+    """
+    request = _request(ocr_text)
+    raw = await chat_completion_async(get_completion_backend(), "combined", **request)
+    return _split(raw)
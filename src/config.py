@@ -9,19 +9,27 @@ This module handles:
 - Configuration validation
 """
 
+import asyncio
+import logging
 import os
-from dotenv import load_dotenv
-from azure.cognitiveservices.vision.computervision import ComputerVisionClient
-from azure.cognitiveservices.vision.customvision.training import (
-    CustomVisionTrainingClient,
-)
+import threading
+import weakref
 
+logger = logging.getLogger(__name__)
 
+# Azure SDKs (msrest, computervision), openai and httpx are imported on first use in
+# ClientRegistry - importing the pipeline (CLI, batch workers) does not pay for them.
+
+
+def _load_env_file():
+    """Loads the nearest .env file (python-dotenv is imported here, on the first config import)."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
 
-from msrest.authentication import CognitiveServicesCredentials, ApiKeyCredentials
 
 # Load environment variables from .env file
-load_dotenv()
+_load_env_file()
 
 
 class AzureConfig:
@@ -72,7 +80,7 @@ class AzureConfig:
         if not AzureConfig.VISION_ENDPOINT.startswith("https://"):
             raise ValueError("VISION_ENDPOINT must start with https://")
 
-        print("✓ Computer Vision configuration validated")
+        logger.info("✓ Computer Vision configuration validated")
         return True
 
     
@@ -80,29 +88,239 @@ class AzureConfig:
     @staticmethod
     def get_computer_vision_client():
         """
-        Initialize and return Computer Vision client
+        Return the shared Computer Vision client
 
         AI-102 Pattern: Client initialization with key-based authentication
+        The client is created (and validated) once per process, see ClientRegistry.
 
         Returns:
             ComputerVisionClient: Initialized client for Computer Vision API
         """
-        AzureConfig.validate_computer_vision_config()
+        return ClientRegistry.get_computer_vision_client()
 
-        if not AzureConfig.VISION_ENDPOINT or not AzureConfig.VISION_KEY:
-            raise ValueError("Missing keys VISION in .env file!")
+    @staticmethod
+    def get_openai_client():
+        """
+        Return the shared Azure OpenAI client (see ClientRegistry)
+
+        Returns:
+            AzureOpenAI: Initialized client for Azure OpenAI chat completions
+        """
+        return ClientRegistry.get_openai_client()
+
+    @staticmethod
+    def get_async_openai_client():
+        """
+        Return the Azure OpenAI async client bound to the running event loop
+
+        Returns:
+            AsyncAzureOpenAI: Initialized async client for Azure OpenAI chat completions
+        """
+        return ClientRegistry.get_async_openai_client()
+
+    @staticmethod
+    def get_async_vision_http_client():
+        """
+        Return an async HTTP client for the Computer Vision REST API (Read API)
+
+        The msrest-based ComputerVisionClient has no asyncio support, so the async
+        pipeline talks to the REST endpoint directly.
+
+        Returns:
+            httpx.AsyncClient: Client with base_url=VISION_ENDPOINT and the key header set
+        """
+        return ClientRegistry.get_async_vision_http_client()
+
+
+class HttpConfig:
+    """Connection pool and timeout settings shared by all Azure clients"""
+
+    # Connections kept open per host (keep-alive) and upper bound of parallel connections
+    POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+    POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+
+    # Idle keep-alive connections are dropped after this many seconds (OpenAI/httpx)
+    KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+
+    CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+    READ_TIMEOUT_SECONDS = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "60"))
+
+    # Retries of the OpenAI SDK itself - only used when RATE_LIMIT_ENABLED=false; with the
+    # limiter on it retries 429s alone (stacked retries would multiply attempts and pauses)
+    OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+
+class ClientRegistry:
+    """
+    Process-wide, thread-safe holder of long-lived Azure clients
+
+    Creating a client per call means a new TLS handshake per call. Here each client
+    is built once (double-checked locking) on top of a pooled, keep-alive HTTP session.
+    """
+
+    _lock = threading.Lock()
+    _computer_vision_client = None
+    _openai_client = None
+
+    # Async clients can only be used on the loop they were created on: one set per loop
+    _async_clients = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def get_computer_vision_client(cls):
+        if cls._computer_vision_client is None:
+            with cls._lock:
+                if cls._computer_vision_client is None:
+                    cls._computer_vision_client = cls._create_computer_vision_client()
+        return cls._computer_vision_client
+
+    @classmethod
+    def get_openai_client(cls):
+        if cls._openai_client is None:
+            with cls._lock:
+                if cls._openai_client is None:
+                    cls._openai_client = cls._create_openai_client()
+        return cls._openai_client
+
+    @classmethod
+    def get_async_openai_client(cls):
+        return cls._get_async_client("openai", cls._create_async_openai_client)
+
+    @classmethod
+    def get_async_vision_http_client(cls):
+        return cls._get_async_client("vision", cls._create_async_vision_http_client)
+
+    @classmethod
+    def _get_async_client(cls, name, factory):
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            clients = cls._async_clients.setdefault(loop, {})
+            if name not in clients:
+                clients[name] = factory()
+            return clients[name]
+
+    @classmethod
+    def reset(cls):
+        """Close and forget all clients (e.g. after changing credentials)."""
+        with cls._lock:
+            if cls._computer_vision_client is not None:
+                cls._computer_vision_client.close()
+            if cls._openai_client is not None:
+                cls._openai_client.close()
+            cls._computer_vision_client = None
+            cls._openai_client = None
+            cls._async_clients = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _create_computer_vision_client():
+        from azure.cognitiveservices.vision.computervision import ComputerVisionClient
+        from msrest.authentication import CognitiveServicesCredentials
+
+        AzureConfig.validate_computer_vision_config()
 
         credentials = CognitiveServicesCredentials(AzureConfig.VISION_KEY)
         client = ComputerVisionClient(AzureConfig.VISION_ENDPOINT, credentials)
 
-        print(
+        # msrest closes its requests.Session after every call unless keep_alive is set
+        client.config.keep_alive = True
+        client.config.connection.timeout = (
+            HttpConfig.CONNECT_TIMEOUT_SECONDS,
+            HttpConfig.READ_TIMEOUT_SECONDS,
+        )
+        client.config.session_configuration_callback = _configure_vision_session
+
+        logger.info(
             f"✓ Computer Vision client initialized (Endpoint: {AzureConfig.VISION_ENDPOINT})"
         )
+        return client
 
+    @staticmethod
+    def _create_openai_client():
+        from openai import AzureOpenAI, DefaultHttpxClient
+
+        _require_openai_credentials()
+        client = AzureOpenAI(
+            azure_endpoint=AzureConfig.AZURE_OPENAI_ENDPOINT,
+            api_key=AzureConfig.AZURE_OPENAI_KEY,
+            api_version=AzureConfig.OPENAI_API_VERSION,
+            max_retries=_openai_max_retries(),
+            http_client=DefaultHttpxClient(**_httpx_pool_settings()),
+        )
+        logger.info("✓ Azure OpenAI client initialized")
         return client
 
-    
-    
+    @staticmethod
+    def _create_async_openai_client():
+        from openai import AsyncAzureOpenAI, DefaultAsyncHttpxClient
+
+        _require_openai_credentials()
+        return AsyncAzureOpenAI(
+            azure_endpoint=AzureConfig.AZURE_OPENAI_ENDPOINT,
+            api_key=AzureConfig.AZURE_OPENAI_KEY,
+            api_version=AzureConfig.OPENAI_API_VERSION,
+            max_retries=_openai_max_retries(),
+            http_client=DefaultAsyncHttpxClient(**_httpx_pool_settings()),
+        )
+
+    @staticmethod
+    def _create_async_vision_http_client():
+        import httpx
+
+        AzureConfig.validate_computer_vision_config()
+        return httpx.AsyncClient(
+            base_url=AzureConfig.VISION_ENDPOINT,
+            headers={"Ocp-Apim-Subscription-Key": AzureConfig.VISION_KEY},
+            **_httpx_pool_settings(),
+        )
+
+
+def _require_openai_credentials():
+    if not AzureConfig.AZURE_OPENAI_ENDPOINT or not AzureConfig.AZURE_OPENAI_KEY:
+        raise ValueError("Missing Azure OpenAI credentials in .env file.")
+
+
+def _openai_max_retries() -> int:
+    # Z limiterem to on ponawia 429 (z pauzą AIMD) - SDK nie może ponawiać drugi raz pod spodem
+    return 0 if RateLimitConfig.ENABLED else HttpConfig.OPENAI_MAX_RETRIES
+
+
+def _httpx_pool_settings() -> dict:
+    """Connection pool limits and timeouts for httpx-based clients (OpenAI, async Read API)."""
+    import httpx
+
+    return {
+        "limits": httpx.Limits(
+            max_connections=HttpConfig.POOL_MAXSIZE,
+            max_keepalive_connections=HttpConfig.POOL_CONNECTIONS,
+            keepalive_expiry=HttpConfig.KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        "timeout": httpx.Timeout(
+            HttpConfig.READ_TIMEOUT_SECONDS,
+            connect=HttpConfig.CONNECT_TIMEOUT_SECONDS,
+        ),
+    }
+
+
+def _configure_vision_session(session, global_config, local_config, **kwargs):
+    """
+    msrest session hook: replace the default adapters with a bigger connection pool.
+
+    msrest keeps one requests.Session per thread, so this runs once per worker thread.
+    """
+    if not getattr(session, "_levelup_pool_configured", False):
+        from requests.adapters import HTTPAdapter
+
+        for prefix in ("https://", "http://"):
+            old_adapter = session.adapters.get(prefix)
+            session.mount(
+                prefix,
+                HTTPAdapter(
+                    pool_connections=HttpConfig.POOL_CONNECTIONS,
+                    pool_maxsize=HttpConfig.POOL_MAXSIZE,
+                    max_retries=getattr(old_adapter, "max_retries", 0),
+                ),
+            )
+        session._levelup_pool_configured = True
+    return kwargs
 
 
 # AI-102 Best Practice: Configuration constants
@@ -116,6 +334,13 @@ class ImageConfig:
     MAX_IMAGE_SIZE_MB = 4  # For Custom Vision
     MAX_IMAGE_SIZE_MB_VISION = 50  # For Computer Vision
 
+    # Optional normalization before OCR upload (src/image_prep.py, needs Pillow)
+    NORMALIZE_ENABLED = os.getenv("IMAGE_NORMALIZE", "false").lower() in ("1", "true", "yes")
+    NORMALIZE_MAX_SIDE_PX = int(os.getenv("IMAGE_NORMALIZE_MAX_SIDE_PX", "2000"))
+    NORMALIZE_GREYSCALE = os.getenv("IMAGE_NORMALIZE_GREYSCALE", "true").lower() in ("1", "true", "yes")
+    NORMALIZE_FORMAT = os.getenv("IMAGE_NORMALIZE_FORMAT", "PNG").upper()  # PNG or JPEG
+    NORMALIZE_JPEG_QUALITY = int(os.getenv("IMAGE_NORMALIZE_JPEG_QUALITY", "85"))
+
     # OCR language codes (AI-102 Multi-language support)
     SUPPORTED_OCR_LANGUAGES = {
         "pl": "Polish",
@@ -127,7 +352,216 @@ class ImageConfig:
     }
 
 
+class OCRConfig:
+    """Read API settings: polling (see src/polling.py) and local PDF handling"""
+
+    # First poll comes quickly, then the interval grows up to POLL_MAX_INTERVAL_SECONDS
+    POLL_INITIAL_INTERVAL_SECONDS = float(os.getenv("OCR_POLL_INITIAL_INTERVAL_SECONDS", "0.25"))
+    POLL_MULTIPLIER = float(os.getenv("OCR_POLL_MULTIPLIER", "1.5"))
+    POLL_MAX_INTERVAL_SECONDS = float(os.getenv("OCR_POLL_MAX_INTERVAL_SECONDS", "2"))
+    POLL_JITTER = float(os.getenv("OCR_POLL_JITTER", "0.2"))
+
+    # Hard limit for a single OCR operation
+    POLL_DEADLINE_SECONDS = float(os.getenv("OCR_POLL_DEADLINE_SECONDS", "120"))
+
+    # Multi-page PDFs: split locally (needs pypdf) and OCR the page chunks concurrently
+    PDF_SPLIT_PAGES = os.getenv("OCR_PDF_SPLIT_PAGES", "false").lower() in ("1", "true", "yes")
+    PDF_PAGES_PER_CHUNK = int(os.getenv("OCR_PDF_PAGES_PER_CHUNK", "1"))
+    PDF_MAX_CONCURRENT_CHUNKS = int(os.getenv("OCR_PDF_MAX_CONCURRENT_CHUNKS", "4"))
+
+    # PDFs with an embedded text layer skip remote OCR (needs pypdf); the layer is
+    # used only if every page has at least PDF_TEXT_LAYER_MIN_CHARS_PER_PAGE characters
+    # and no page embeds an image of at least PDF_TEXT_LAYER_MIN_IMAGE_PX on both sides
+    # (a chart pasted as a picture; smaller images such as logos are ignored)
+    PDF_TEXT_LAYER = os.getenv("OCR_PDF_TEXT_LAYER", "true").lower() in ("1", "true", "yes")
+    PDF_TEXT_LAYER_MIN_CHARS_PER_PAGE = int(os.getenv("OCR_PDF_TEXT_LAYER_MIN_CHARS_PER_PAGE", "25"))
+    PDF_TEXT_LAYER_MIN_IMAGE_PX = int(os.getenv("OCR_PDF_TEXT_LAYER_MIN_IMAGE_PX", "150"))
+
+
+class ChartDataConfig:
+    """Local pre-extraction of chart data between OCR and the model (see src/chart_extract.py)"""
+
+    # Send the model a compact table of labels / values instead of the raw OCR lines
+    PRE_EXTRACT = os.getenv("CHART_PRE_EXTRACT", "true").lower() in ("1", "true", "yes")
+
+
+class CacheConfig:
+    """Result cache configuration (OCR results, see src/cache.py)"""
+
+    ENABLED = os.getenv("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # In-process LRU tier
+    MEMORY_MAX_ENTRIES = int(os.getenv("CACHE_MEMORY_MAX_ENTRIES", "256"))
+
+    # On-disk tier (survives restarts)
+    DISK_ENABLED = os.getenv("CACHE_DISK_ENABLED", "true").lower() in ("1", "true", "yes")
+    DIR = os.getenv(
+        "CACHE_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"),
+    )
+    DISK_MAX_MB = int(os.getenv("CACHE_DISK_MAX_MB", "200"))
+
+    # Entries older than this are treated as misses
+    TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+class LLMCacheConfig:
+    """Response cache for the Azure OpenAI stages (see src/llm.py)"""
+
+    ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # Persistent tier is opt-in: summaries are sampled with temperature > 0
+    PERSISTENT = os.getenv("LLM_CACHE_PERSISTENT", "false").lower() in ("1", "true", "yes")
+
+    # Stages: interpret, summary, short_summary, combined (comma separated)
+    DISABLED_STAGES = {
+        stage.strip()
+        for stage in os.getenv("LLM_CACHE_DISABLED_STAGES", "").split(",")
+        if stage.strip()
+    }
+
+
+class TokenBudgetConfig:
+    """Compaction of LLM input text and per-stage token budgets (see src/text_compaction.py)"""
+
+    # Drop duplicate / noise lines and collapse whitespace in OCR text, enforce the budgets below
+    COMPACTION_ENABLED = os.getenv("LLM_INPUT_COMPACTION", "true").lower() in ("1", "true", "yes")
+
+    # Stages whose input is OCR text; the others (markdown from the model) are only cut to the budget
+    OCR_INPUT_STAGES = ("interpret", "combined")
+
+    # Max estimated tokens of the data part of a prompt, per stage (0 = no limit)
+    STAGE_BUDGETS = {
+        "interpret": int(os.getenv("TOKEN_BUDGET_INTERPRET", "3000")),
+        "combined": int(os.getenv("TOKEN_BUDGET_COMBINED", "3000")),
+        "summary": int(os.getenv("TOKEN_BUDGET_SUMMARY", "1500")),
+        "short_summary": int(os.getenv("TOKEN_BUDGET_SHORT_SUMMARY", "1500")),
+    }
+
+
+class RateLimitConfig:
+    """Process-wide limits of the Azure calls (see src/ratelimit.py); 0 disables a bucket"""
+
+    ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # Read API transactions (upload and every result poll) per second - S1 tier: 10
+    VISION_TPS = float(os.getenv("RATE_LIMIT_VISION_TPS", "10"))
+    VISION_MAX_CONCURRENCY = int(os.getenv("RATE_LIMIT_VISION_MAX_CONCURRENCY", "8"))
+
+    # Quota of the Azure OpenAI deployment (requests and tokens per minute)
+    OPENAI_RPM = float(os.getenv("RATE_LIMIT_OPENAI_RPM", "180"))
+    OPENAI_TPM = float(os.getenv("RATE_LIMIT_OPENAI_TPM", "30000"))
+    OPENAI_MAX_CONCURRENCY = int(os.getenv("RATE_LIMIT_OPENAI_MAX_CONCURRENCY", "16"))
+
+    # AIMD lower bound of the concurrency limit and retries of a throttled (429) call
+    MIN_CONCURRENCY = int(os.getenv("RATE_LIMIT_MIN_CONCURRENCY", "1"))
+    MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3"))
+
+    # Wait times kept for the stats
+    WAIT_WINDOW = int(os.getenv("RATE_LIMIT_WAIT_WINDOW", "1000"))
+
+
+class PipelineConfig:
+    """Settings of the analysis pipeline (src/pipeline.py)"""
+
+    # "three_call": interpret -> short summary + summary (3 chat completions)
+    # "combined":   one chat completion returning all three fields (src/combined_analyzer.py)
+    MODE = os.getenv("PIPELINE_MODE", "three_call").strip().lower()
+    MODES = ("three_call", "combined")
+
+    # Concurrent runs on the same document (same content and mode) share one computation
+    COALESCE = os.getenv("PIPELINE_COALESCE", "true").lower() in ("1", "true", "yes")
+
+
+class JobConfig:
+    """HTTP job API (api.py, src/jobs.py)"""
+
+    # Documents analysed at the same time by the job workers
+    WORKERS = int(os.getenv("JOBS_WORKERS", "4"))
+
+    # Submissions beyond this many waiting jobs are rejected (HTTP 503)
+    MAX_QUEUED = int(os.getenv("JOBS_MAX_QUEUED", "1000"))
+
+    # Files per batch submission
+    MAX_BATCH_FILES = int(os.getenv("JOBS_MAX_BATCH_FILES", "100"))
+
+    # Finished jobs kept for result polling (oldest are forgotten first, with their uploads)
+    RETENTION = int(os.getenv("JOBS_RETENTION", "1000"))
+
+    # Uploaded documents are stored here until their job is forgotten
+    UPLOAD_DIR = os.getenv(
+        "JOBS_UPLOAD_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".jobs"),
+    )
+
+
+class JobQueueConfig:
+    """Durable SQLite job queue and its workers (src/job_queue.py)"""
+
+    DB_PATH = os.getenv(
+        "JOB_QUEUE_DB",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".jobs", "queue.sqlite3"),
+    )
+
+    # A job whose worker stops renewing the lease (crash, restart) is handed out again
+    LEASE_SECONDS = float(os.getenv("JOB_QUEUE_LEASE_SECONDS", "300"))
+
+    # Attempts per job; a failed attempt is retried after BACKOFF * 2^(attempt - 1) seconds
+    MAX_ATTEMPTS = int(os.getenv("JOB_QUEUE_MAX_ATTEMPTS", "3"))
+    RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_QUEUE_RETRY_BACKOFF_SECONDS", "30"))
+
+    # Idle workers look for new jobs this often
+    POLL_SECONDS = float(os.getenv("JOB_QUEUE_POLL_SECONDS", "2"))
+
+
+class BackendConfig:
+    """Backends of the OCR and completion stages (see src/backends.py)"""
+
+    # "azure":  Azure Read API / Azure OpenAI
+    # "replay": stored data/*_ocr_result.txt and data/*.txt (offline, see src/replay.py)
+    OCR = os.getenv("OCR_BACKEND", "azure").strip().lower()
+    LLM = os.getenv("LLM_BACKEND", "azure").strip().lower()
+    BACKENDS = ("azure", "replay")
+
+
+class TracingConfig:
+    """Per-stage spans and latency histograms (see src/tracing.py)"""
+
+    ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # Finished spans are appended here as JSON lines (empty = no export)
+    JSONL_PATH = os.getenv("TRACING_JSONL", "")
+
+    # Number of most recent spans per name kept for the latency histograms
+    HISTOGRAM_WINDOW = int(os.getenv("TRACING_HISTOGRAM_WINDOW", "1000"))
+
+    # Progress lines of the stages and one "[Trace]" summary line per finished root span on stdout
+    # (opt-in, e.g. for local debugging); when off, the "src" loggers only print warnings and errors
+    CONSOLE = os.getenv("TRACING_CONSOLE", "false").lower() in ("1", "true", "yes")
+
+
+class ReplayConfig:
+    """Offline stand-ins for load tests and benchmarks (src/replay.py)"""
+
+    DATA_DIR = os.getenv(
+        "REPLAY_DATA_DIR",
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"),
+    )
+
+    # Simulated service latency per call; JITTER is a +/- fraction of it
+    OCR_LATENCY_MS = float(os.getenv("REPLAY_OCR_LATENCY_MS", "0"))
+    LLM_LATENCY_MS = float(os.getenv("REPLAY_LLM_LATENCY_MS", "0"))
+    LATENCY_JITTER = float(os.getenv("REPLAY_LATENCY_JITTER", "0.2"))
+
+    # Generation speed of the replayed answers (0 = whole answer at once)
+    LLM_TOKENS_PER_SECOND = float(os.getenv("REPLAY_LLM_TOKENS_PER_SECOND", "0"))
+
+    # Fraction of calls that fail with BackendError (0.0 - 1.0)
+    OCR_ERROR_RATE = float(os.getenv("REPLAY_OCR_ERROR_RATE", "0"))
+    LLM_ERROR_RATE = float(os.getenv("REPLAY_LLM_ERROR_RATE", "0"))
 
+    # Seed of the latency/error generator (empty = random)
+    SEED = os.getenv("REPLAY_SEED") or None
 
 
 # Utility functions
@@ -8,26 +8,39 @@
 #  with modules: Name of chart, Source of chart, Type of chart, Variables, Units,
 #                Topic of chart, Trends, Highest and lowest values, Confidence of your answers
 
+import logging
+
 from .config import AzureConfig
 
 # Configuration environment to use Azure resources,
 # taking information like: API_KEY, API_ENDPOINT from .env
 
-from openai import AzureOpenAI
+from .backends import azure_openai_required, get_completion_backend
+from .chart_extract import compact_chart_text, data_heading
+from .llm import chat_completion, chat_completion_async, fit_input, stream_chat_completion_async
 
-# setup communication with Azure OpenAI resources
+# shared chat-completion call with response cache, sent to the configured backend
+# (Azure OpenAI, or the offline replay stand-in used for benchmarks)
 
 
-def interpret(ocr_text: str) -> str:
+logger = logging.getLogger(__name__)
+
+# Settings of the interpretation call (also part of the response-cache key)
+MODEL = "gpt-4o"
+TEMPERATURE = 0.0
+MAX_TOKENS = 400
+ERROR_MESSAGE = "Nie udało się zinterpretować danych OCR. Could not interpret OCR data"
+EMPTY_ANSWER = "Error: AI provided no interpretation."
+
+
+def _build_messages(ocr_text: str) -> list:
     """
-    Analyzes raw data from OCR and gives key information about chart.
+    Builds the chat messages (system role + prompt with OCR data).
+    The OCR text is compacted to the stage token budget, then numbers and labels are
+    pre-extracted locally into a compact table (see chart_extract.py).
     """
-    print("\n=== INTERPRETATION OF OCR DATA ===")
-    # Informing we start interpreting procedure
-
-    if not ocr_text or not ocr_text.strip():
-        print("⚠️ OCR returned empty text. Skipping interpretation.")
-        return "No text available for interpretation."
+    ocr_text = fit_input("interpret", ocr_text)
+    chart_data = compact_chart_text(ocr_text)
 
     # PROMPT
     prompt = f"""
@@ -53,67 +66,155 @@ def interpret(ocr_text: str) -> str:
     - Highest and lowest values: <specify category + value for highest and lowest>
     - Confidence of your answers: <low / medium / high>
 
-    OCR data:
-    {ocr_text}
+    {data_heading(chart_data, ocr_text)}
+    {chart_data}
 
     """
 
-    try:
-        # Connection to Azure OpenAI
-        endpoint = AzureConfig.AZURE_OPENAI_ENDPOINT
-        key = AzureConfig.AZURE_OPENAI_KEY
+    return [
+        {
+            "role": "system",
+            "content": "You are an expert of data analysis and charts.",
+        },
+        {"role": "user", "content": prompt},
+    ]
+    # This is "conversation with GPT-4"
+    # - System: mówi modelowi kim ma być (ekspertem) gives role to AI model
+    # - User: wysyła faktyczne dane OCR do interpretacji sends OCR-data to interpret
+
+
+def _check_input(ocr_text: str):
+    """
+    Returns a ready answer for empty OCR text, otherwise None.
+    """
+    logger.info("=== INTERPRETATION OF OCR DATA ===")
+    # Informing we start interpreting procedure
+
+    if not ocr_text or not ocr_text.strip():
+        logger.warning("⚠️ OCR returned empty text. Skipping interpretation.")
+        return "No text available for interpretation."
+    return None
+
+
+def _check_credentials():
+    if not azure_openai_required():
+        return  # offline backend, no Azure credentials needed
+
+    # Connection to Azure OpenAI
+    endpoint = AzureConfig.AZURE_OPENAI_ENDPOINT
+    key = AzureConfig.AZURE_OPENAI_KEY
+
+    if not endpoint or not key:
+        raise ValueError("Missing Azure OpenAI credentials in .env file.")
+
+
+def _finish(raw_contex) -> str:
+    """
+    Cleans up the model answer.
+    """
+    if not raw_contex:
+        logger.warning("⚠️ OpenAI returned no content.")
+        return EMPTY_ANSWER
 
-        if not endpoint or not key:
-            raise ValueError("Missing Azure OpenAI credentials in .env file.")
+    output = raw_contex.strip()
+    # Taking the answer
+    # .strip() = deleting unnessesery spaces and enters
 
-        client = AzureOpenAI(
-            azure_endpoint=endpoint,
-            api_key=key,
-            api_version=AzureConfig.OPENAI_API_VERSION,
+    logger.debug(f"--- Interpretation results ---\n{output}")
+    # printing the result for testing
+
+    return output
+    # Saving results for further steps in main
+
+
+def interpret(ocr_text: str) -> str:
+    """
+    Analyzes raw data from OCR and gives key information about chart.
+    """
+    early_answer = _check_input(ocr_text)
+    if early_answer is not None:
+        return early_answer
+
+    try:
+        _check_credentials()
+        backend = get_completion_backend()
+        # Shared backend; Azure uses the pooled client (see ClientRegistry in config.py)
+
+        # Sending question to GPT-4o (answered from cache if we saw this prompt before)
+        raw_contex = chat_completion(
+            backend,
+            "interpret",
+            _build_messages(ocr_text),
+            model=MODEL,
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS,
         )
-        # azure_endpoint = Adress od our END_POINT w Azure
-        # api_key = passwort to Azure API
-
-        # Sending question to GPT-4o
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            temperature=0.0,
-            max_tokens=400,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert of data analysis and charts.",
-                },
-                {"role": "user", "content": prompt},
-            ],
+        return _finish(raw_contex)
+
+    except Exception as e:
+        # If any errors (internet connection, invalid credentials in .env)
+        logger.error(f"Error: {e}")
+        return ERROR_MESSAGE
+
+
+async def interpret_async(ocr_text: str) -> str:
+    """
+    Async variant of interpret() (same prompt, backend and cache).
+    """
+    early_answer = _check_input(ocr_text)
+    if early_answer is not None:
+        return early_answer
+
+    try:
+        _check_credentials()
+        backend = get_completion_backend()
+
+        raw_contex = await chat_completion_async(
+            backend,
+            "interpret",
+            _build_messages(ocr_text),
+            model=MODEL,
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS,
         )
-        # This is "conversation with GPT-4"
-        # - System: mówi modelowi kim ma być (ekspertem) gives role to AI model
-        # - User: wysyła faktyczne dane OCR do interpretacji sends OCR-data to interpret
+        return _finish(raw_contex)
 
-        raw_contex = response.choices[0].message.content
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        return ERROR_MESSAGE
 
-        if not raw_contex:
-            print("⚠️ OpenAI returned no content.")
-            return "Error: AI provided no interpretation."
 
-        output = raw_contex.strip()
-        # Taking the answer
-        # .choice[0] = choosing first proposition of models answer
-        # .message.content = it's the messeage itself without metadata
-        # .strip() = deleting unnessesery spaces and enters
+async def interpret_stream_async(ocr_text: str):
+    """
+    Streaming variant of interpret_async(): yields the interpretation as tokens arrive.
+    The last value yielded is the final (cleaned) interpretation.
+    """
+    early_answer = _check_input(ocr_text)
+    if early_answer is not None:
+        yield early_answer
+        return
 
-        print("\n--- Interpretation results ---")
-        print(output)
-        # printing the result for testing
+    try:
+        _check_credentials()
+        backend = get_completion_backend()
 
-        return output
-        # Saving results for further steps in main
+        raw_contex = ""
+        async for raw_contex in stream_chat_completion_async(
+            backend,
+            "interpret",
+            _build_messages(ocr_text),
+            model=MODEL,
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS,
+        ):
+            yield raw_contex
 
     except Exception as e:
-        # If any errors (internet connection, invalid credentials in .env)
-        print(f"\nError: {e}")
-        return "Nie udało się zinterpretować danych OCR. Could not interpret OCR data"
+        logger.error(f"Error: {e}")
+        yield ERROR_MESSAGE
+        return
+
+    yield _finish(raw_contex)
 
 
 # LOCAL TEST
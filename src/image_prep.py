@@ -0,0 +1,183 @@
+"""
+image_prep.py
+Client-side normalization of images before they are uploaded to the Read API.
+
+Downscales to ImageConfig.NORMALIZE_MAX_SIDE_PX, converts to greyscale and re-encodes
+(optimized PNG or JPEG). Normalized images are cached by content hash in the
+"images" TwoTierCache (same TTL and disk size limit as the result caches), so
+the same upload is converted only once. Uploads larger than
+ImageConfig.MAX_IMAGE_SIZE_MB_VISION are rejected before they reach Azure.
+
+Pillow is an optional dependency: without it images are uploaded as received.
+It is imported on first use, not when the pipeline is imported.
+"""
+
+import base64
+import io
+import logging
+import os
+import threading
+from typing import Optional
+
+from .cache import TwoTierCache, file_digest, get_cache, make_key
+from .config import CacheConfig, ImageConfig
+from .tracing import span
+
+Image = ImageOps = None  # Pillow, importowany przy pierwszym użyciu
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+# Obrazy są duże - w pamięci trzymamy tylko kilka ostatnich, reszta zostaje na dysku
+CACHE_MEMORY_ENTRIES = 16
+
+_checked = False
+_import_lock = threading.Lock()
+
+
+class PreparedUpload:
+    """Bytes to upload plus what normalization saved."""
+
+    __slots__ = ("data", "original_bytes", "normalized", "cached")
+
+    def __init__(self, data: bytes, original_bytes: int, normalized: bool = False, cached: bool = False):
+        self.data = data
+        self.original_bytes = original_bytes
+        self.normalized = normalized
+        self.cached = cached
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - len(self.data)
+
+
+def settings() -> dict:
+    """Normalization parameters (part of the cache keys)."""
+    return {
+        "max_side_px": ImageConfig.NORMALIZE_MAX_SIDE_PX,
+        "greyscale": ImageConfig.NORMALIZE_GREYSCALE,
+        "format": ImageConfig.NORMALIZE_FORMAT,
+        "jpeg_quality": ImageConfig.NORMALIZE_JPEG_QUALITY,
+    }
+
+
+def applies_to(path: str) -> bool:
+    """True when `path` would be normalized before upload."""
+    return ImageConfig.NORMALIZE_ENABLED and path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def _pillow_available() -> bool:
+    global Image, ImageOps, _checked
+    if not _checked:
+        with _import_lock:
+            if not _checked:  # inny wątek mógł właśnie skończyć import
+                try:
+                    from PIL import Image, ImageOps
+                except ImportError:  # opcjonalna zależność (pip install Pillow)
+                    logger.warning(
+                        "⚠️ Pillow nie jest zainstalowany - obrazy są wysyłane do OCR bez normalizacji."
+                    )
+                _checked = True  # dopiero po imporcie, inaczej inne wątki widzą Image = None
+    return Image is not None
+
+
+def normalize_bytes(path: str) -> bytes:
+    """Downscaled, greyscale, re-encoded version of the image at `path`."""
+    with Image.open(path) as opened:
+        img = ImageOps.exif_transpose(opened)
+
+        # Przezroczyste tło -> białe (inaczej po konwersji do skali szarości robi się czarne)
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            img = img.convert("RGBA")
+            background = Image.new("RGBA", img.size, "white")
+            img = Image.alpha_composite(background, img)
+
+        if ImageConfig.NORMALIZE_GREYSCALE:
+            img = img.convert("L")
+        elif img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+
+        width, height = img.size
+        scale = ImageConfig.NORMALIZE_MAX_SIDE_PX / max(width, height)
+        if scale < 1:  # tylko zmniejszamy, nigdy nie powiększamy
+            img = img.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        if ImageConfig.NORMALIZE_FORMAT == "JPEG":
+            img.save(buffer, "JPEG", quality=ImageConfig.NORMALIZE_JPEG_QUALITY, optimize=True)
+        else:
+            img.save(buffer, "PNG", optimize=True)
+        return buffer.getvalue()
+
+
+def _image_cache() -> Optional[TwoTierCache]:
+    if not CacheConfig.ENABLED:
+        return None
+    return get_cache("images", max_entries=CACHE_MEMORY_ENTRIES)
+
+
+def _normalized(path: str):
+    """(bytes, from_cache) of the normalized image."""
+    cache = _image_cache()
+    key = make_key("image_prep", file_digest(path), settings()) if cache else None
+    if cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return base64.b64decode(cached), True
+
+    data = normalize_bytes(path)
+    if cache:
+        cache.set(key, base64.b64encode(data).decode("ascii"))  # wartości cache muszą być JSON-em
+    return data, False
+
+
+def check_upload_size(size: int, name: str) -> None:
+    """Raises ValueError when an upload exceeds ImageConfig.MAX_IMAGE_SIZE_MB_VISION."""
+    limit = ImageConfig.MAX_IMAGE_SIZE_MB_VISION * 1024 * 1024
+    if size > limit:
+        raise ValueError(
+            f"Plik '{name}' ma {size / (1024 * 1024):.1f} MB - limit Read API to "
+            f"{ImageConfig.MAX_IMAGE_SIZE_MB_VISION} MB."
+        )
+
+
+def prepare_upload(path: str) -> PreparedUpload:
+    """
+    Bytes to send to the Read API for `path`: the normalized image when that is
+    enabled and smaller, otherwise the file as is.
+
+    Raises:
+        ValueError: The upload is larger than ImageConfig.MAX_IMAGE_SIZE_MB_VISION.
+    """
+    with span("ocr.prepare") as prep_span:
+        original = os.path.getsize(path)
+        prepared = None
+
+        if applies_to(path) and _pillow_available():
+            try:
+                data, cached = _normalized(path)
+                if len(data) < original:
+                    prepared = PreparedUpload(data, original, normalized=True, cached=cached)
+            except Exception as e:
+                logger.warning(f"⚠️ Normalizacja obrazu nie powiodła się ({e}) - wysyłam oryginał.")
+
+        if prepared is None:
+            with open(path, "rb") as f:
+                prepared = PreparedUpload(f.read(), original)
+
+        prep_span.set(
+            bytes_in=original,
+            bytes_out=len(prepared.data),
+            bytes_saved=prepared.bytes_saved,
+            normalized=prepared.normalized,
+            cache_hit=prepared.cached,
+        )
+        if prepared.normalized:
+            logger.info(
+                f"   Obraz znormalizowany: {original / 1024:.0f} KB -> {len(prepared.data) / 1024:.0f} KB "
+                f"(zaoszczędzono {prepared.bytes_saved / 1024:.0f} KB)"
+            )
+
+        check_upload_size(len(prepared.data), os.path.basename(path))
+        return prepared
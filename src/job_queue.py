@@ -0,0 +1,366 @@
+"""
+job_queue.py
+Durable job queue in a local SQLite file (survives restarts of the app and workers).
+
+Workers lease jobs for JobQueueConfig.LEASE_SECONDS and renew the lease while they
+work; a job whose lease ran out (worker crashed) is handed out again. Every pipeline
+stage (OCR, interpretation, summaries) is checkpointed as soon as it finishes, so a
+retried job continues after its last finished stage. Attempts that failed on transport,
+rate-limit or lease errors are retried with exponential backoff up to
+JobQueueConfig.MAX_ATTEMPTS; deterministic failures (no text in the document, an
+unusable answer, a missing file) fail the job at once.
+
+Usage:
+    python -m src.job_queue enqueue data/ --mode combined
+    python -m src.job_queue worker --workers 4 [--drain]
+    python -m src.job_queue status [JOB_ID]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from .batch import RESULT_FIELDS, find_reports
+from .config import JobQueueConfig
+from .pipeline import StageFailed, analyze_report_file_staged_async
+from .ratelimit import is_transient
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    mode TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    error TEXT,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job_id TEXT NOT NULL REFERENCES jobs (id),
+    stage TEXT NOT NULL,
+    output TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (job_id, stage)
+);
+"""
+
+
+class LeaseLost(Exception):
+    """The job's lease ran out and another worker took it over."""
+
+
+class QueuedJob:
+    """A leased job: its row plus the checkpoints of earlier attempts."""
+
+    def __init__(self, row: sqlite3.Row, checkpoints: Dict[str, dict]):
+        self.id = row["id"]
+        self.path = row["path"]
+        self.mode = row["mode"]
+        self.attempts = row["attempts"]
+        self.max_attempts = row["max_attempts"]
+        self.checkpoints = checkpoints
+
+
+class JobQueue:
+    """
+    Jobs and stage checkpoints in SQLite. Every method opens its own connection,
+    so one queue object can be shared by threads and worker processes.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or JobQueueConfig.DB_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")  # czytelnicy nie blokują workerów
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")  # zapis od początku - dwóch workerów nie weźmie tego samego
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def enqueue(self, path: str, mode: Optional[str] = None, max_attempts: Optional[int] = None) -> str:
+        return self.enqueue_many([path], mode, max_attempts)[0]
+
+    def enqueue_many(
+        self, paths: Iterable[str], mode: Optional[str] = None, max_attempts: Optional[int] = None
+    ) -> List[str]:
+        """Adds jobs for `paths`; returns their ids."""
+        now = time.time()
+        attempts = max_attempts or JobQueueConfig.MAX_ATTEMPTS
+        rows = [(uuid.uuid4().hex, os.path.abspath(path), mode, QUEUED, attempts, now, now, now) for path in paths]
+        with self._transaction() as db:
+            db.executemany(
+                "INSERT INTO jobs (id, path, mode, status, max_attempts, available_at, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return [row[0] for row in rows]
+
+    def lease(self, owner: str, lease_seconds: Optional[float] = None) -> Optional[QueuedJob]:
+        """
+        Takes the oldest ready job (queued, or leased with an expired lease) for `owner`.
+        Returns None when there is nothing to do.
+        """
+        now = time.time()
+        lease_seconds = lease_seconds or JobQueueConfig.LEASE_SECONDS
+        with self._transaction() as db:
+            while True:
+                row = db.execute(
+                    "SELECT * FROM jobs WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_expires < ?)"
+                    " ORDER BY available_at LIMIT 1",
+                    (QUEUED, now, LEASED, now),
+                ).fetchone()
+                if row is None:
+                    return None
+                if row["status"] == LEASED and row["attempts"] >= row["max_attempts"]:
+                    # Worker padł przy ostatniej próbie - nie ponawiamy w nieskończoność, szukamy dalej
+                    db.execute(
+                        "UPDATE jobs SET status = ?, lease_owner = NULL, error = ?, updated_at = ? WHERE id = ?",
+                        (FAILED, row["error"] or "Lease expired on the last attempt.", now, row["id"]),
+                    )
+                    continue
+                break
+            db.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?,"
+                " updated_at = ? WHERE id = ?",
+                (LEASED, owner, now + lease_seconds, now, row["id"]),
+            )
+            checkpoints = {
+                stage: json.loads(output)
+                for stage, output in db.execute(
+                    "SELECT stage, output FROM checkpoints WHERE job_id = ?", (row["id"],)
+                )
+            }
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        return QueuedJob(row, checkpoints)
+
+    def renew(self, job_id: str, owner: str, lease_seconds: Optional[float] = None) -> bool:
+        """Extends the lease; False when the job is no longer leased by `owner`."""
+        lease_seconds = lease_seconds or JobQueueConfig.LEASE_SECONDS
+        return self._update_leased(job_id, owner, "lease_expires = ?", time.time() + lease_seconds)
+
+    def checkpoint(self, job_id: str, owner: str, stage: str, output: dict) -> bool:
+        """
+        Stores the output of a finished stage; False (nothing stored) when the job is no
+        longer leased by `owner`, so a worker whose lease ran out cannot overwrite the
+        checkpoints of the worker that took the job over.
+        """
+        with self._transaction() as db:
+            cursor = db.execute(
+                "INSERT OR REPLACE INTO checkpoints (job_id, stage, output, created_at)"
+                " SELECT id, ?, ?, ? FROM jobs WHERE id = ? AND status = ? AND lease_owner = ?",
+                (stage, json.dumps(output, ensure_ascii=False), time.time(), job_id, LEASED, owner),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, owner: str, result: dict) -> bool:
+        """Marks the job done with its result; False when the lease was lost meanwhile."""
+        return self._update_leased(
+            job_id,
+            owner,
+            "status = ?, result = ?, error = NULL, lease_owner = NULL",
+            DONE,
+            json.dumps(result, ensure_ascii=False),
+        )
+
+    def fail(self, job_id: str, owner: str, error: str, retry: bool = True) -> Optional[str]:
+        """
+        Records a failed attempt: the job is queued again after a backoff, or marked
+        failed after its last attempt (or right away when `retry` is False, e.g. for a
+        document without text). Returns the new status (None if the lease was lost).
+        """
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = ? AND lease_owner = ?",
+                (job_id, LEASED, owner),
+            ).fetchone()
+            if row is None:
+                return None
+            status = QUEUED if retry and row["attempts"] < row["max_attempts"] else FAILED
+            backoff = JobQueueConfig.RETRY_BACKOFF_SECONDS * 2 ** (row["attempts"] - 1)
+            db.execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_owner = NULL, updated_at = ?"
+                " WHERE id = ?",
+                (status, error, now + backoff, now, job_id),
+            )
+        return status
+
+    def _update_leased(self, job_id: str, owner: str, assignments: str, *values) -> bool:
+        with self._transaction() as db:
+            cursor = db.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                (*values, time.time(), job_id, LEASED, owner),
+            )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """The job as a dict (result decoded, finished stages listed), or None."""
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            stages = [stage for (stage,) in db.execute("SELECT stage FROM checkpoints WHERE job_id = ?", (job_id,))]
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["checkpoints"] = stages
+        return job
+
+    def stats(self) -> dict:
+        """Number of jobs per status."""
+        with self._connect() as db:
+            counts = dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in (QUEUED, LEASED, DONE, FAILED)}
+
+
+def _retryable(error: Exception) -> bool:
+    """Only transport, rate-limit and lease errors are retried; another attempt would fail the same way."""
+    if isinstance(error, StageFailed):
+        return error.retryable
+    return isinstance(error, LeaseLost) or is_transient(error)
+
+
+async def _keep_lease(queue: JobQueue, job: QueuedJob, owner: str, lease_seconds: float) -> None:
+    while True:
+        await asyncio.sleep(lease_seconds / 3)
+        if not await asyncio.to_thread(queue.renew, job.id, owner, lease_seconds):
+            print(f"⚠️ [Queue] Lease of job {job.id} lost.")
+            return
+
+
+async def process_job(queue: JobQueue, job: QueuedJob, owner: str, lease_seconds: Optional[float] = None) -> str:
+    """Runs one leased job from its last checkpoint; returns its new status."""
+    lease_seconds = lease_seconds or JobQueueConfig.LEASE_SECONDS
+    print(f"[Queue] {owner}: job {job.id} attempt {job.attempts}/{job.max_attempts} ({job.path})")
+
+    def on_stage(stage: str, output: dict) -> None:
+        if not queue.checkpoint(job.id, owner, stage, output):
+            raise LeaseLost(f"lease of job {job.id} lost before stage '{stage}' was stored")
+
+    keeper = asyncio.ensure_future(_keep_lease(queue, job, owner, lease_seconds))
+    try:
+        result = await analyze_report_file_staged_async(job.path, job.mode, job.checkpoints, on_stage)
+    except Exception as e:
+        retry = _retryable(e)
+        print(f"❗ [Queue] Job {job.id} failed{'' if retry else ' (not retried)'}: {e}")
+        status = await asyncio.to_thread(queue.fail, job.id, owner, str(e) or type(e).__name__, retry)
+    else:
+        done = await asyncio.to_thread(queue.complete, job.id, owner, dict(zip(RESULT_FIELDS, result)))
+        status = DONE if done else None
+    finally:
+        keeper.cancel()
+    return status or "lease lost"
+
+
+async def run_workers(
+    queue: JobQueue, workers: int = 2, drain: bool = False, lease_seconds: Optional[float] = None
+) -> None:
+    """
+    Runs `workers` concurrent workers pulling jobs from `queue`. With `drain` they
+    stop once no job is ready; otherwise they poll for new jobs forever.
+    """
+    host = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def worker(number: int):
+        owner = f"{host}/{number}"
+        while True:
+            job = await asyncio.to_thread(queue.lease, owner, lease_seconds)
+            if job is None:
+                if drain:
+                    return
+                await asyncio.sleep(JobQueueConfig.POLL_SECONDS)
+                continue
+            status = await process_job(queue, job, owner, lease_seconds)
+            print(f"[Queue] {owner}: job {job.id} -> {status}")
+
+    await asyncio.gather(*(worker(number) for number in range(max(1, workers))))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Durable job queue for report analysis.")
+    parser.add_argument("--db", help="SQLite file (default: JOB_QUEUE_DB)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Add files (or every report in directories) to the queue")
+    enqueue.add_argument("paths", nargs="+")
+    enqueue.add_argument("--mode", choices=("three_call", "combined"), help="Pipeline mode (default: PIPELINE_MODE)")
+    enqueue.add_argument("--max-attempts", type=int, help="Attempts per job (default: JOB_QUEUE_MAX_ATTEMPTS)")
+
+    worker = commands.add_parser("worker", help="Process queued jobs")
+    worker.add_argument("-w", "--workers", type=int, default=2, help="Jobs processed concurrently")
+    worker.add_argument("--drain", action="store_true", help="Exit when no job is ready")
+
+    status = commands.add_parser("status", help="Job counts, or one job with its result")
+    status.add_argument("job_id", nargs="?")
+
+    args = parser.parse_args(argv)
+    queue = JobQueue(args.db)
+
+    if args.command == "enqueue":
+        files = []
+        for path in args.paths:
+            files.extend(find_reports(path) if os.path.isdir(path) else [path])
+        missing = [path for path in files if not os.path.isfile(path)]
+        if missing:
+            print(f"❗ Pliki nie istnieją: {', '.join(missing)}")
+            return 2
+        ids = queue.enqueue_many(files, args.mode, args.max_attempts)
+        print(f"[Queue] {len(ids)} jobs queued.")
+        for path, job_id in zip(files, ids):
+            print(f"{job_id}  {path}")
+        return 0
+
+    if args.command == "worker":
+        asyncio.run(run_workers(queue, args.workers, drain=args.drain))
+        print(json.dumps(queue.stats(), indent=2))
+        return 0
+
+    if args.job_id:
+        job = queue.get(args.job_id)
+        if job is None:
+            print(f"❗ Nie ma zadania {args.job_id}.")
+            return 1
+        print(json.dumps(job, indent=2, ensure_ascii=False))
+    else:
+        print(json.dumps(queue.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+jobs.py
+Asynchronous analysis jobs behind the HTTP API (api.py).
+
+    manager = get_job_manager()
+    job = manager.submit(store_upload("report.pdf", fileobj))
+    manager.get(job.id).status      # queued -> running -> done / failed
+    manager.get(job.id).result      # the five pipeline fields once done
+
+Jobs run on the shared background loop (src/aio.py) with at most JobConfig.WORKERS
+documents in flight. A submission that would put more than JobConfig.MAX_QUEUED jobs
+in the queue is rejected with QueueFull. Finished jobs stay available for polling
+until JobConfig.RETENTION newer ones have finished; then they are forgotten together
+with their uploaded file.
+"""
+
+import asyncio
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import BinaryIO, Iterable, List, Optional
+
+from .aio import get_background_loop, run_sync
+from .batch import RESULT_FIELDS, SUPPORTED_EXTENSIONS, process_one
+from .config import JobConfig
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFull(Exception):
+    """The job queue has no room for the submission."""
+
+
+def store_upload(filename: str, fileobj: BinaryIO, upload_dir: Optional[str] = None) -> str:
+    """
+    Saves an uploaded document into its own directory under JobConfig.UPLOAD_DIR.
+
+    The original file name is kept (the pipeline recognises the type by its extension).
+
+    Raises:
+        ValueError: The file type is not supported.
+    """
+    name = os.path.basename(filename or "")
+    if not name.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise ValueError(f"Unsupported file '{name}', expected one of {SUPPORTED_EXTENSIONS}.")
+    directory = os.path.join(upload_dir or JobConfig.UPLOAD_DIR, uuid.uuid4().hex)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(fileobj, out)
+    return path
+
+
+class Job:
+    """One submitted document and, once finished, its result."""
+
+    def __init__(self, path: str, mode: Optional[str] = None, owns_file: bool = False):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.mode = mode
+        self.owns_file = owns_file  # przesłany plik usuwamy razem z zadaniem
+        self.status = QUEUED
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.elapsed_ms: Optional[float] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.failed_stage: Optional[str] = None  # etap potoku, który zwrócił błąd
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def as_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "file": os.path.basename(self.path),
+            "mode": self.mode,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_ms": self.elapsed_ms,
+            "error": self.error,
+            "failed_stage": self.failed_stage,
+        }
+
+
+class JobManager:
+    """In-memory job table plus a bounded pool of worker tasks on the background loop."""
+
+    def __init__(self, workers: int = 4, max_queued: int = 1000, retention: int = 1000):
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.retention = retention
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._finished: deque = deque()
+        self._queued = 0
+        self._lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def submit(self, path: str, mode: Optional[str] = None, owns_file: bool = False) -> Job:
+        """Queues one document; raises QueueFull when the queue is full."""
+        return self.submit_many([path], mode, owns_file)[0]
+
+    def submit_many(self, paths: Iterable[str], mode: Optional[str] = None, owns_file: bool = False) -> List[Job]:
+        """Queues all documents or none of them (QueueFull)."""
+        jobs = [Job(path, mode, owns_file) for path in paths]
+        with self._lock:
+            if self._queued + len(jobs) > self.max_queued:
+                raise QueueFull(f"Job queue is full ({self._queued} waiting, limit {self.max_queued}).")
+            self._queued += len(jobs)
+            for job in jobs:
+                self._jobs[job.id] = job
+        loop = get_background_loop()
+        for job in jobs:
+            loop.call_soon_threadsafe(self._enqueue, job)
+        return jobs
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    # --- pętla w tle -------------------------------------------------------------
+
+    def _enqueue(self, job: Job) -> None:
+        # Kolejka i workery powstają na pętli w tle przy pierwszym zadaniu
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self._queue.put_nowait(job)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            with self._lock:
+                self._queued -= 1
+                job.status = RUNNING
+                job.started_at = time.time()
+            try:
+                record = await process_one(job.path, job.mode)  # błędy trafiają do rekordu
+            except asyncio.CancelledError:
+                self._complete(job, {"status": "error", "error": "Job was cancelled."})
+                raise
+            self._complete(job, record)
+
+    def _complete(self, job: Job, record: dict) -> None:
+        # process_one marks every stage error answer (OCR, interpretation, summaries) as
+        # "error", so only a fully successful analysis becomes DONE and serves a result
+        with self._lock:
+            if record.get("status") == "ok":
+                job.status = DONE
+                job.result = {name: record.get(name) for name in RESULT_FIELDS}
+                # Ścieżka podglądu jest ścieżką na serwerze - klient dostaje samą nazwę
+                if job.result.get("preview"):
+                    job.result["preview"] = os.path.basename(job.result["preview"])
+            else:
+                job.status = FAILED
+                job.error = record.get("error") or "Analysis failed."
+                job.failed_stage = record.get("stage")
+            job.finished_at = time.time()
+            job.elapsed_ms = record.get("elapsed_ms")
+            self._finished.append(job.id)
+            expired = []
+            while len(self._finished) > self.retention:
+                expired.append(self._jobs.pop(self._finished.popleft(), None))
+        for old in expired:
+            if old is not None and old.owns_file:
+                shutil.rmtree(os.path.dirname(old.path), ignore_errors=True)
+
+    def close(self) -> None:
+        """Stops the workers; jobs still queued are not run."""
+        if self._tasks:
+            run_sync(self._stop_workers())
+
+    async def _stop_workers(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return {"workers": self.workers, "max_queued": self.max_queued, **counts}
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Process-wide job manager configured from JobConfig."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(JobConfig.WORKERS, JobConfig.MAX_QUEUED, JobConfig.RETENTION)
+        return _manager
@@ -0,0 +1,288 @@
+"""
+llm.py
+Shared helper for the chat-completion stages (interpret, summary, short_summary, combined).
+
+Requests go to a CompletionBackend (Azure OpenAI by default, see src/backends.py).
+Responses are memoized in a two-tier cache keyed on the full prompt (all messages),
+the model/deployment name, temperature, max_tokens and the backend, so a chart we
+have already seen does not cost another round trip.
+"""
+
+import logging
+from typing import AsyncIterator, Optional
+
+from .backends import CompletionBackend
+from .cancellation import check_cancelled
+from .cache import TwoTierCache, get_cache, make_key
+from .config import AzureConfig, LLMCacheConfig, TokenBudgetConfig
+from .ratelimit import get_limiter
+from .text_compaction import compact_text, estimate_tokens
+from .tracing import annotate, bind, span, start_span
+
+logger = logging.getLogger(__name__)
+
+
+class AzureOpenAIBackend(CompletionBackend):
+    """
+    Azure OpenAI chat completions through the shared, pooled clients (ClientRegistry).
+    Requests queue in the process-wide "openai" rate limiter (RPM / TPM, see src/ratelimit.py).
+    """
+
+    name = "azure"
+
+    def complete(self, stage: str, request: dict) -> Optional[str]:
+        client = AzureConfig.get_openai_client()
+        response = get_limiter("openai").call(
+            client.chat.completions.create, amounts=_rate_amounts(request), **request
+        )
+        _annotate_usage(response)
+        return response.choices[0].message.content
+
+    async def complete_async(self, stage: str, request: dict) -> Optional[str]:
+        client = AzureConfig.get_async_openai_client()
+        response = await get_limiter("openai").call_async(
+            client.chat.completions.create, amounts=_rate_amounts(request), **request
+        )
+        _annotate_usage(response)
+        return response.choices[0].message.content
+
+    async def stream_async(self, stage: str, request: dict) -> AsyncIterator[str]:
+        client = AzureConfig.get_async_openai_client()
+        # The concurrency slot is held until the stream is consumed or abandoned
+        async with get_limiter("openai").stream_async(
+            client.chat.completions.create, amounts=_rate_amounts(request), stream=True, **request
+        ) as stream:
+            try:
+                async for chunk in stream:
+                    # Azure sends chunks without choices (e.g. content filter results) - skip them
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        yield delta
+            finally:
+                await stream.close()  # an abandoned stream releases its connection
+
+
+def _rate_amounts(request: dict) -> dict:
+    # Azure liczy do TPM szacunek promptu + max_tokens, zanim model cokolwiek wygeneruje
+    prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in request["messages"])
+    return {"requests": 1, "tokens": prompt_tokens + int(request.get("max_tokens") or 0)}
+
+
+def fit_input(stage: str, text: str) -> str:
+    """
+    Compacts the data part of a stage prompt (duplicate / noise lines, whitespace)
+    and cuts it to TokenBudgetConfig.STAGE_BUDGETS[stage], numeric lines first.
+
+    Only OCR text (TokenBudgetConfig.OCR_INPUT_STAGES) is filtered; the summaries get
+    the model's markdown interpretation, which is only cut to the budget.
+    """
+    if not TokenBudgetConfig.COMPACTION_ENABLED or not text:
+        return text
+
+    with span("compact", stage=stage) as compact_span:
+        compacted, stats = compact_text(
+            text, TokenBudgetConfig.STAGE_BUDGETS.get(stage), clean=stage in TokenBudgetConfig.OCR_INPUT_STAGES
+        )
+        compact_span.set(**stats)
+        if stats["tokens_after"] != stats["tokens_before"]:
+            omitted = f", {stats['omitted']} lines over budget" if stats["omitted"] else ""
+            logger.info(f"   [{stage}] tokens: {stats['tokens_before']} -> {stats['tokens_after']}{omitted}")
+        return compacted
+
+
+def _stage_cache(stage: str) -> Optional[TwoTierCache]:
+    """Response cache for a stage, or None if caching is off for it."""
+    if not LLMCacheConfig.ENABLED or stage in LLMCacheConfig.DISABLED_STAGES:
+        return None
+    return get_cache("llm", persistent=LLMCacheConfig.PERSISTENT)
+
+
+def completion_cache_key(
+    messages: list,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    response_format: Optional[dict] = None,
+    backend: str = "azure",
+) -> str:
+    """Cache key of a chat completion request."""
+    return make_key("chat", messages, model, temperature, max_tokens, response_format, backend)
+
+
+def chat_completion(
+    backend: CompletionBackend,
+    stage: str,
+    messages: list,
+    *,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    response_format: Optional[dict] = None,
+) -> Optional[str]:
+    """
+    Sends a chat completion request (or answers it from cache).
+
+    Args:
+        backend (CompletionBackend): Backend used on cache miss (see get_completion_backend).
+        stage (str): Pipeline stage name, used for the per-stage cache opt-out.
+        messages (list): Full list of chat messages (system + user prompt).
+        model (str): Model or deployment name.
+        temperature (float): Sampling temperature.
+        max_tokens (int): Completion token limit.
+        response_format (dict, optional): e.g. {"type": "json_object"} for structured output.
+
+    Returns:
+        str | None: Message content of the first choice (None if the model returned nothing).
+
+    Raises:
+        Exception: Any error raised by the backend is propagated to the caller.
+    """
+    request = _request(messages, model, temperature, max_tokens, response_format)
+    cache, key = _lookup_setup(backend, stage, request)
+    with _llm_span(backend, stage, request) as llm_span:
+        if cache:
+            cached = cache.get(key)
+            if cached is not None:
+                logger.info(f"[LLM] Cache hit for stage '{stage}'.")
+                llm_span.set(cache_hit=True)
+                return cached
+
+        check_cancelled()  # nie wysyłamy zapytania za przerwany przebieg
+        content = backend.complete(stage, request)
+
+    if cache and content:
+        cache.set(key, content)  # puste odpowiedzi nie trafiają do cache
+
+    return content
+
+
+async def chat_completion_async(
+    backend: CompletionBackend,
+    stage: str,
+    messages: list,
+    *,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    response_format: Optional[dict] = None,
+) -> Optional[str]:
+    """
+    Async variant of chat_completion; same cache.
+    """
+    request = _request(messages, model, temperature, max_tokens, response_format)
+    cache, key = _lookup_setup(backend, stage, request)
+    with _llm_span(backend, stage, request) as llm_span:
+        if cache:
+            cached = cache.get(key)
+            if cached is not None:
+                logger.info(f"[LLM] Cache hit for stage '{stage}'.")
+                llm_span.set(cache_hit=True)
+                return cached
+
+        check_cancelled()
+        content = await backend.complete_async(stage, request)
+
+    if cache and content:
+        cache.set(key, content)
+
+    return content
+
+
+async def stream_chat_completion_async(
+    backend: CompletionBackend,
+    stage: str,
+    messages: list,
+    *,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of chat_completion_async (stream=True).
+
+    Yields the content accumulated so far every time new tokens arrive. A cache hit
+    yields the whole cached answer once; the complete streamed answer is cached.
+    """
+    request = _request(messages, model, temperature, max_tokens)
+    cache, key = _lookup_setup(backend, stage, request)
+    # Span nie może obejmować `yield` w bloku `with` - kończymy go ręcznie (patrz tracing.py)
+    llm_span = start_span(f"llm.{stage}", **_llm_attributes(backend, stage, request, streaming=True))
+    error = None
+    try:
+        if cache:
+            cached = cache.get(key)
+            if cached is not None:
+                logger.info(f"[LLM] Cache hit for stage '{stage}'.")
+                llm_span.set(cache_hit=True)
+                yield cached
+                return
+
+        check_cancelled()
+        content = ""
+        chunks = 0
+        async for delta in bind(backend.stream_async(stage, request), llm_span):
+            check_cancelled()  # przerywa strumień - aclose() zamyka połączenie z usługą
+            if not chunks:
+                llm_span.set(time_to_first_token_ms=llm_span.elapsed_ms())
+            chunks += 1
+            content += delta
+            yield content
+        llm_span.set(chunks=chunks)
+
+        if cache and content:
+            cache.set(key, content)
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        llm_span.end(error)
+
+
+def _llm_attributes(backend: CompletionBackend, stage: str, request: dict, streaming: bool = False) -> dict:
+    return {
+        "stage": stage,
+        "backend": backend.name,
+        "model": request["model"],
+        "max_tokens": request["max_tokens"],
+        "streaming": streaming,
+        "cache_hit": False,
+    }
+
+
+def _llm_span(backend: CompletionBackend, stage: str, request: dict):
+    return span(f"llm.{stage}", **_llm_attributes(backend, stage, request))
+
+
+def _annotate_usage(response) -> None:
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        annotate(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+
+
+def _request(messages, model, temperature, max_tokens, response_format=None) -> dict:
+    request = {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
+    if response_format:
+        request["response_format"] = response_format
+    return request
+
+
+def _lookup_setup(backend: CompletionBackend, stage: str, request: dict):
+    cache = _stage_cache(stage)
+    key = None
+    if cache:
+        key = completion_cache_key(
+            request["messages"],
+            request["model"],
+            request["temperature"],
+            request["max_tokens"],
+            request.get("response_format"),
+            backend.name,
+        )
+    return cache, key
@@ -1,24 +1,70 @@
 """
 modul_ocr.py
 Moduł do ekstrakcji tekstu z plików PNG i PDF przy użyciu OCRProcessor (Azure Read API).
+Backend OCR jest wymienny (OCR_BACKEND=azure|replay, patrz src/backends.py).
 """
 
+import asyncio
+import contextvars
+import io
+import logging
 import os  # Operacje na plikach i ścieżkach
-from azure.core.exceptions import HttpResponseError  # Obsługa błędów z Azure OCR API
-import time
-from typing import Any
-from azure.cognitiveservices.vision.computervision.models import OperationStatusCodes
-from src.config import AzureConfig
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, List, Optional, Tuple
+from src.backends import (
+    BackendError,
+    OCRBackend,
+    OCRError,
+    OCRFailedError,
+    PageChunk,
+    get_ocr_backend,
+)
+from src.config import AzureConfig, CacheConfig, OCRConfig
+from src.cache import file_digest, get_cache, make_key
+from src.polling import (
+    PollPolicy,
+    PollTimeoutError,
+    parse_retry_after,
+    poll_until_done,
+    poll_until_done_async,
+)
+from src.image_prep import applies_to as image_prep_applies, check_upload_size, prepare_upload
+from src.image_prep import settings as image_prep_settings
+from src.pdf_utils import extract_text_layer, sparse_pages, split_pdf
+from src.cancellation import check_cancelled, current_token
+from src.ratelimit import RateLimitedError, get_limiter, is_transient
+from src.tracing import span
 
+logger = logging.getLogger(__name__)
 
-def get_text_from_file(plik: Any) -> str:
+# Parametry Read API, od których zależy wynik - wchodzą do klucza cache
+OCR_PARAMS = {"api": "read", "model_version": "latest", "reading_order": "basic"}
+
+# Endpoint REST Read API (ta sama wersja, której używa ComputerVisionClient 0.9.0)
+READ_API_PATH = "vision/v3.2/read/analyze"
+
+# Koszt jednego wywołania Read API w limiterze "vision" (src/ratelimit.py)
+VISION_TRANSACTION = {"transactions": 1}
+
+# Wynik udanego OCR, który nie rozpoznał żadnego tekstu
+NO_TEXT_RESULT = "OCR sukces, ale brak tekstu."
+
+# Wynik, gdy Read API zakończyło operację statusem "failed"
+OCR_FAILED_RESULT = "Błąd rozpoznawania tekstu przez Azure."
+
+
+def _ocr_cache_key(plik: str, backend: str = "azure") -> str:
     """
-    Ekstrakcja tekstu z pliku PNG lub PDF przy użyciu Azure Computer Vision Read API.
-    :param plik: Ścieżka do pliku lokalnego (PNG lub PDF).
-    :return: Rozpoznany tekst jako string (lub pusty string w przypadku błędu).
+    Klucz cache: hash zawartości pliku + parametry OCR + backend (nazwa pliku nie ma znaczenia).
+    Przy normalizacji obrazów dochodzą jej parametry (inny obraz = potencjalnie inny tekst).
     """
-    client = AzureConfig.get_computer_vision_client()
+    if image_prep_applies(plik):
+        return make_key("ocr", file_digest(plik), OCR_PARAMS, backend, image_prep_settings())
+    return make_key("ocr", file_digest(plik), OCR_PARAMS, backend)
 
+
+def _validate_file(plik: Any) -> None:
     if not os.path.isfile(plik):
         raise FileNotFoundError(
             f"Plik '{plik}' nie istnieje."
@@ -30,13 +76,61 @@ def get_text_from_file(plik: Any) -> str:
             "Obsługiwane formaty: PNG, JPG, JPEG, PDF."
         )  # Walidacja rozszerzenia
 
-    try:
-        # Otwieramy plik w trybie binarnym
-        with open(plik, "rb") as f:
-            print(f"Rozpoczynam OCR dla pliku: {plik} ---")
-            # Wywołanie Read API dla strumienia pliku
 
-            read_response: Any = client.read_in_stream(f, raw=True)
+def _log_poll_stats(poll_stats, poll_span) -> None:
+    stats = poll_stats.as_dict()
+    poll_span.set(
+        poll_count=stats["polls"],
+        waited_ms=stats["waited_ms"],
+        retry_after_honoured=stats["retry_after_honoured"],
+    )
+    logger.info(f"   OCR gotowy po {stats['polls']} zapytaniach o status ({stats['elapsed_ms']} ms)")
+
+
+def _finish_text(text_results: list, cache, cache_key) -> str:
+    """
+    Skleja linie tekstu w wynik i zapisuje udane rozpoznanie w cache.
+    """
+    final_text = "\n".join(text_results)
+    if not final_text:
+        return NO_TEXT_RESULT
+    if cache:
+        cache.set(cache_key, final_text)  # cache'ujemy tylko udane rozpoznania
+    return final_text
+
+
+class AzureReadBackend(OCRBackend):
+    """
+    Azure Computer Vision Read API.
+    Wywołania synchroniczne idą przez ComputerVisionClient (msrest), a asynchroniczne
+    bezpośrednio przez REST Read API (httpx.AsyncClient, patrz config.py),
+    bo msrest nie wspiera asyncio.
+    """
+
+    name = "azure"
+
+    def read_lines(self, plik: str) -> List[str]:
+        # Bajty do wysłania: oryginał albo znormalizowany obraz (patrz src/image_prep.py)
+        prepared = prepare_upload(plik)
+        return self._read_stream(io.BytesIO(prepared.data))
+
+    def read_chunk_lines(self, chunk: PageChunk) -> List[str]:
+        check_upload_size(len(chunk.data), f"{os.path.basename(chunk.source)} ({chunk.label})")
+        return self._read_stream(io.BytesIO(chunk.data))
+
+    def _read_stream(self, stream: BinaryIO) -> List[str]:
+        client = AzureConfig.get_computer_vision_client()
+
+        # Każde wywołanie Read API (upload i każdy poll) przechodzi przez limiter "vision"
+        vision = get_limiter("vision")
+
+        def upload():
+            stream.seek(0)  # ponowienie po 429 wysyła plik od początku
+            return client.read_in_stream(stream, raw=True)
+
+        with span("ocr.upload", api="sdk"):
+            # Wywołanie Read API dla strumienia pliku
+            read_response: Any = vision.call(upload, amounts=VISION_TRANSACTION)
             headers = read_response.headers
 
             # Pobieramy wartość bezpiecznie metodą .get()
@@ -44,35 +138,384 @@ def get_text_from_file(plik: Any) -> str:
 
         # Jeśli Azure nie zwrócił lokalizacji operacji (co byłoby dziwne, ale możliwe przy błędzie)
         if not operation_location:
-            print("⚠️ Błąd Azure: Brak nagłówka Operation-Location.")
-            return ""
+            raise OCRError("Brak nagłówka Operation-Location.")
         operation_id = operation_location.split("/")[-1]  # Wyciągnięcie ID operacji
 
-        # Polling na wynik
-        while True:
-            read_result: Any = client.get_read_result(operation_id)
-            if read_result.status not in ["notStarted", "running"]:
-                break
-            time.sleep(1)
+        # Polling na wynik (backoff + Retry-After + deadline, patrz src/polling.py)
+        def fetch():
+            raw_result: Any = vision.call(
+                client.get_read_result, operation_id, raw=True, amounts=VISION_TRANSACTION
+            )
+            return raw_result.output, parse_retry_after(raw_result.response.headers)
 
-        # 6. Przetwarzanie wyniku - ZAMIAST processor._process_read_result
-        if read_result.status == OperationStatusCodes.succeeded:
+        with span("ocr.poll") as poll_span:
+            read_result, poll_stats = poll_until_done(
+                fetch,
+                lambda result: result.status not in ["notStarted", "running"],
+                PollPolicy.from_config(OCRConfig),
+                cancel=current_token(),  # przerwany przebieg nie odpytuje dalej Azure
+            )
+            _log_poll_stats(poll_stats, poll_span)
+
+        # Przetwarzanie wyniku - ZAMIAST processor._process_read_result
+        # SDK jest już załadowany przez klienta - import tutaj nie spowalnia startu
+        from azure.cognitiveservices.vision.computervision.models import OperationStatusCodes
+
+        if read_result.status != OperationStatusCodes.succeeded:
+            raise OCRFailedError(f"Status operacji: {read_result.status}")
+
+        with span("ocr.parse") as parse_span:
             text_results = []
+            pages = 0
             if read_result.analyze_result and read_result.analyze_result.read_results:
                 for text_result in read_result.analyze_result.read_results:
+                    pages += 1
                     for line in text_result.lines:
                         text_results.append(line.text)
+            parse_span.set(page_count=pages, lines=len(text_results))
+        return text_results
 
-            final_text = "\n".join(text_results)
-            return final_text if final_text else "OCR sukces, ale brak tekstu."
-        else:
-            return "Błąd rozpoznawania tekstu przez Azure."
-    except HttpResponseError as e:
-        print(f"✗ Błąd OCR: {e.message}")  # Obsługa błędów Azure
-        return ""
+    async def read_lines_async(self, plik: str) -> List[str]:
+        # Odczyt i normalizacja w wątku, żeby nie blokować pętli zdarzeń
+        prepared = await asyncio.to_thread(prepare_upload, plik)
+        return await self._read_bytes_async(prepared.data)
+
+    async def read_chunk_lines_async(self, chunk: PageChunk) -> List[str]:
+        check_upload_size(len(chunk.data), f"{os.path.basename(chunk.source)} ({chunk.label})")
+        return await self._read_bytes_async(chunk.data)
+
+    async def _read_bytes_async(self, data: bytes) -> List[str]:
+        client = AzureConfig.get_async_vision_http_client()
+        vision = get_limiter("vision")
+
+        async def upload():
+            response = await client.post(
+                READ_API_PATH,
+                params={"model-version": "latest", "readingOrder": "basic"},
+                content=data,
+                headers={"Content-Type": "application/octet-stream"},
+            )
+            response.raise_for_status()
+            return response
+
+        with span("ocr.upload", api="rest", bytes=len(data)):
+            response = await vision.call_async(upload, amounts=VISION_TRANSACTION)
+
+        operation_location = response.headers.get("Operation-Location")
+        if not operation_location:
+            raise OCRError("Brak nagłówka Operation-Location.")
+
+        # Polling na wynik - asyncio.sleep zwalnia pętlę dla innych dokumentów
+        async def get_result():
+            poll_response = await client.get(operation_location)
+            poll_response.raise_for_status()
+            return poll_response
+
+        async def fetch():
+            poll_response = await vision.call_async(get_result, amounts=VISION_TRANSACTION)
+            return poll_response.json(), parse_retry_after(poll_response.headers)
+
+        with span("ocr.poll") as poll_span:
+            read_result, poll_stats = await poll_until_done_async(
+                fetch,
+                lambda result: result.get("status") not in ["notStarted", "running"],
+                PollPolicy.from_config(OCRConfig),
+                cancel=current_token(),
+            )
+            _log_poll_stats(poll_stats, poll_span)
+
+        if read_result.get("status") != "succeeded":
+            raise OCRFailedError(f"Status operacji: {read_result.get('status')}")
+
+        with span("ocr.parse") as parse_span:
+            text_results = []
+            analyze_result = read_result.get("analyzeResult") or {}
+            read_results = analyze_result.get("readResults") or []
+            for text_result in read_results:
+                for line in text_result.get("lines") or []:
+                    text_results.append(line["text"])
+            parse_span.set(page_count=len(read_results), lines=len(text_results))
+        return text_results
+
+
+def _page_chunks(plik: str) -> List[PageChunk]:
+    """
+    Kawałki wielostronicowego PDF-a do równoległego OCR (pusta lista = cały plik naraz).
+    """
+    if not OCRConfig.PDF_SPLIT_PAGES or not plik.lower().endswith(".pdf"):
+        return []
+    try:
+        return split_pdf(plik, OCRConfig.PDF_PAGES_PER_CHUNK)
     except Exception as e:
-        print(f"✗ Nieoczekiwany błąd: {e}")  # Obsługa innych błędów
-        return ""
+        logger.warning(f"⚠️ Nie udało się podzielić PDF na strony ({e}) - OCR całego pliku.")
+        return []
+
+
+def _merge_chunks(chunks: List[PageChunk], results: list) -> Tuple[List[str], List[str]]:
+    """
+    Skleja linie kawałków w kolejności stron.
+    Błąd jednego kawałka nie przekreśla pozostałych - jest tylko raportowany.
+    Zwraca (linie, opisy_nieudanych_kawałków); gdy nie udał się żaden, rzuca pierwszy błąd.
+    """
+    text_results: List[str] = []
+    failed: List[str] = []
+    errors = []
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"⚠️ OCR: {chunk.label} z {chunk.total_pages} - błąd: {result}")
+            failed.append(chunk.label)
+            errors.append(result)
+        else:
+            text_results.extend(result)
+    if len(errors) == len(chunks):
+        raise errors[0]
+    return text_results, failed
+
+
+def _read_chunks(backend: OCRBackend, chunks: List[PageChunk]) -> Tuple[List[str], List[str]]:
+    """Kawałki PDF-a równolegle w wątkach (najwyżej PDF_MAX_CONCURRENT_CHUNKS naraz)."""
+
+    def read(chunk: PageChunk):
+        check_cancelled()  # JobCancelled nie jest łapany niżej - przerywa cały OCR
+        with span("ocr.chunk", first_page=chunk.first_page, last_page=chunk.last_page) as chunk_span:
+            try:
+                return backend.read_chunk_lines(chunk)
+            except Exception as e:
+                chunk_span.fail(e)
+                return e
+
+    workers = max(1, min(OCRConfig.PDF_MAX_CONCURRENT_CHUNKS, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr-chunk") as pool:
+        # copy_context: spany kawałków trafiają pod span "ocr" mimo innego wątku
+        futures = [pool.submit(contextvars.copy_context().run, read, chunk) for chunk in chunks]
+        results = [future.result() for future in futures]
+    return _merge_chunks(chunks, results)
+
+
+async def _read_chunks_async(backend: OCRBackend, chunks: List[PageChunk]) -> Tuple[List[str], List[str]]:
+    """Asynchroniczna wersja _read_chunks (semafor zamiast puli wątków)."""
+    semaphore = asyncio.Semaphore(max(1, OCRConfig.PDF_MAX_CONCURRENT_CHUNKS))
+
+    async def read(chunk: PageChunk):
+        async with semaphore:
+            check_cancelled()
+            with span("ocr.chunk", first_page=chunk.first_page, last_page=chunk.last_page) as chunk_span:
+                try:
+                    return await backend.read_chunk_lines_async(chunk)
+                except Exception as e:
+                    chunk_span.fail(e)
+                    return e
+
+    results = await asyncio.gather(*(read(chunk) for chunk in chunks))
+    return _merge_chunks(chunks, results)
+
+
+def _ocr_span(plik: str, backend: OCRBackend):
+    """Span całego etapu OCR (czas, rozmiar pliku, backend, trafienie w cache)."""
+    return span(
+        "ocr",
+        file=os.path.basename(plik),
+        file_size_bytes=os.path.getsize(plik),
+        backend=backend.name,
+        cache_hit=False,
+    )
+
+
+def _is_error(e: Exception, module: str, name: str) -> bool:
+    # Bez importu SDK: jeśli moduł nie jest załadowany, wyjątek nie może z niego pochodzić
+    error_type = getattr(sys.modules.get(module), name, None)
+    return error_type is not None and isinstance(e, error_type)
+
+
+def _error_result(e: Exception) -> str:
+    """
+    Zamienia wyjątek backendu OCR na wynik zwracany przez get_text_from_file.
+    """
+    if isinstance(e, OCRFailedError):
+        return OCR_FAILED_RESULT
+    if isinstance(e, OCRError):
+        logger.error(f"⚠️ Błąd Azure: {e}")
+    elif isinstance(e, RateLimitedError):
+        logger.error(f"✗ Azure OCR odrzuca żądania (429) mimo ponowień: {e}")
+    elif isinstance(e, BackendError):
+        logger.error(f"✗ Błąd backendu OCR: {e}")
+    elif isinstance(e, PollTimeoutError):
+        logger.error(f"✗ Przekroczono czas oczekiwania na OCR: {e}")
+    elif _is_error(e, "azure.core.exceptions", "HttpResponseError"):
+        logger.error(f"✗ Błąd OCR: {e.message}")  # Obsługa błędów Azure
+    elif _is_error(e, "httpx", "HTTPStatusError"):
+        logger.error(f"✗ Błąd OCR: {e.response.status_code} {e.response.text}")
+    else:
+        logger.error(f"✗ Nieoczekiwany błąd: {e}")  # Obsługa innych błędów
+    return ""
+
+
+def _text_layer(plik: str, cache=None, cache_key: Optional[str] = None) -> Optional[List[str]]:
+    """
+    Linie z warstwy tekstowej PDF-a (szybka ścieżka bez zdalnego OCR).
+    None, gdy warstwy brak, jest zbyt uboga albo strona zawiera obraz (np. wykres
+    wklejony jako obrazek - jego wartości nie są w warstwie tekstowej).
+
+    Decyzja (linie albo [] = "użyj OCR") trafia do cache OCR pod kluczem pochodnym od
+    `cache_key`, więc ten sam PDF nie jest parsowany przy każdym wgraniu.
+    """
+    if not OCRConfig.PDF_TEXT_LAYER or not plik.lower().endswith(".pdf"):
+        return None
+    layer_key = None
+    if cache:
+        layer_key = make_key(
+            "text_layer", cache_key, OCRConfig.PDF_TEXT_LAYER_MIN_CHARS_PER_PAGE, OCRConfig.PDF_TEXT_LAYER_MIN_IMAGE_PX
+        )
+        cached = cache.get(layer_key)
+        if cached is not None:
+            return cached or None
+
+    lines = _read_text_layer(plik)
+    if cache and lines is not None:
+        cache.set(layer_key, lines)
+    return lines or None
+
+
+def _read_text_layer(plik: str) -> Optional[List[str]]:
+    # None = brak pypdf / nieczytelny PDF (bez zapisu w cache), [] = warstwa nie wystarcza
+    layer = extract_text_layer(plik, OCRConfig.PDF_TEXT_LAYER_MIN_IMAGE_PX)
+    if layer is None:
+        return None
+    pages = layer.pages
+    sparse = sparse_pages(pages, OCRConfig.PDF_TEXT_LAYER_MIN_CHARS_PER_PAGE)
+    if len(sparse) == len(pages) and not any(page.strip() for page in pages):
+        return []  # skan / obraz bez warstwy tekstowej
+    if sparse:
+        logger.info(f"   Warstwa tekstowa PDF zbyt uboga (strony: {sparse}) - używam OCR.")
+        return []
+    if layer.image_pages:
+        logger.info(f"   PDF zawiera obrazy (strony: {layer.image_pages}) - używam OCR.")
+        return []
+    return [line.strip() for page in pages for line in page.splitlines() if line.strip()]
+
+
+def _ocr_result(text: str, source: str, **details: Any) -> dict:
+    return {"text": text, "source": source, **details}
+
+
+def get_ocr_result(plik: Any) -> dict:
+    """
+    Ekstrakcja tekstu z pliku PNG lub PDF wraz z informacją, którą ścieżką powstał.
+
+    Kolejność: cache -> warstwa tekstowa PDF (lokalnie, bez sieci) -> backend OCR
+    (domyślnie Azure Computer Vision Read API, patrz src/backends.py).
+    Wyniki OCR są cache'owane po hashu zawartości pliku (patrz src/cache.py),
+    więc ponowne wgranie tego samego pliku nie wywołuje Azure.
+    :param plik: Ścieżka do pliku lokalnego (PNG lub PDF).
+    :return: {"text": str, "source": "cache" | "text_layer" | "ocr", "backend": str, ...}
+             (text jest pustym stringiem w przypadku błędu, wtedy jest też "error" i "retryable" -
+             czy kolejna próba ma sens, patrz ratelimit.is_transient).
+    """
+    _validate_file(plik)
+    backend = get_ocr_backend()
+
+    with _ocr_span(plik, backend) as ocr_span:
+        cache = get_cache("ocr") if CacheConfig.ENABLED else None
+        cache_key = _ocr_cache_key(plik, backend.name) if cache else None
+        if cache:
+            cached_text = cache.get(cache_key)
+            ocr_span.set(cache_hit=cached_text is not None)
+            if cached_text is not None:
+                logger.info(f"✓ OCR z cache dla pliku: {plik}")
+                ocr_span.set(source="cache")
+                return _ocr_result(cached_text, "cache", backend=backend.name)
+
+        text_layer = _text_layer(plik, cache, cache_key)
+        if text_layer:
+            logger.info(f"✓ Tekst z warstwy tekstowej PDF: {plik}")
+            ocr_span.set(source="text_layer", lines=len(text_layer))
+            return _ocr_result("\n".join(text_layer), "text_layer", backend="local")
+
+        ocr_span.set(source="ocr")
+        check_cancelled()
+        try:
+            logger.info(f"Rozpoczynam OCR dla pliku: {plik} ---")
+            chunks = _page_chunks(plik)
+            failed: List[str] = []
+            if chunks:
+                ocr_span.set(page_count=chunks[-1].last_page, chunks=len(chunks))
+                text_results, failed = _read_chunks(backend, chunks)
+            else:
+                text_results = backend.read_lines(plik)
+            ocr_span.set(lines=len(text_results), failed_chunks=failed)
+            # Niepełny wynik (część stron się nie udała) nie trafia do cache
+            text = _finish_text(text_results, None if failed else cache, cache_key)
+            return _ocr_result(text, "ocr", backend=backend.name, failed_chunks=failed)
+        except Exception as e:
+            ocr_span.fail(e)
+            return _ocr_result(
+                _error_result(e), "ocr", backend=backend.name, error=str(e), retryable=is_transient(e)
+            )
+
+
+def get_text_from_file(plik: Any) -> str:
+    """
+    Ekstrakcja tekstu z pliku PNG lub PDF (patrz get_ocr_result).
+    :param plik: Ścieżka do pliku lokalnego (PNG lub PDF).
+    :return: Rozpoznany tekst jako string (lub pusty string w przypadku błędu).
+    """
+    return get_ocr_result(plik)["text"]
+
+
+async def get_ocr_result_async(plik: Any) -> dict:
+    """
+    Asynchroniczna wersja get_ocr_result (ten sam backend OCR i cache).
+    """
+    _validate_file(plik)
+    backend = get_ocr_backend()
+
+    with _ocr_span(plik, backend) as ocr_span:
+        cache = get_cache("ocr") if CacheConfig.ENABLED else None
+        # Hashowanie i odczyt pliku w wątku, żeby nie blokować pętli zdarzeń
+        cache_key = await asyncio.to_thread(_ocr_cache_key, plik, backend.name) if cache else None
+        if cache:
+            cached_text = cache.get(cache_key)
+            ocr_span.set(cache_hit=cached_text is not None)
+            if cached_text is not None:
+                logger.info(f"✓ OCR z cache dla pliku: {plik}")
+                ocr_span.set(source="cache")
+                return _ocr_result(cached_text, "cache", backend=backend.name)
+
+        text_layer = await asyncio.to_thread(_text_layer, plik, cache, cache_key)
+        if text_layer:
+            logger.info(f"✓ Tekst z warstwy tekstowej PDF: {plik}")
+            ocr_span.set(source="text_layer", lines=len(text_layer))
+            return _ocr_result("\n".join(text_layer), "text_layer", backend="local")
+
+        ocr_span.set(source="ocr")
+        check_cancelled()
+        try:
+            logger.info(f"Rozpoczynam OCR dla pliku: {plik} ---")
+            chunks = await asyncio.to_thread(_page_chunks, plik)
+            failed: List[str] = []
+            if chunks:
+                ocr_span.set(page_count=chunks[-1].last_page, chunks=len(chunks))
+                text_results, failed = await _read_chunks_async(backend, chunks)
+            else:
+                text_results = await backend.read_lines_async(plik)
+            ocr_span.set(lines=len(text_results), failed_chunks=failed)
+            # Niepełny wynik (część stron się nie udała) nie trafia do cache
+            text = _finish_text(text_results, None if failed else cache, cache_key)
+            return _ocr_result(text, "ocr", backend=backend.name, failed_chunks=failed)
+        except Exception as e:
+            ocr_span.fail(e)
+            return _ocr_result(
+                _error_result(e), "ocr", backend=backend.name, error=str(e), retryable=is_transient(e)
+            )
+
+
+async def get_text_from_file_async(plik: Any) -> str:
+    """
+    Asynchroniczna wersja get_text_from_file.
+    :param plik: Ścieżka do pliku lokalnego (PNG lub PDF).
+    :return: Rozpoznany tekst jako string (lub pusty string w przypadku błędu).
+    """
+    return (await get_ocr_result_async(plik))["text"]
 
 
 if __name__ == "__main__":
@@ -12,6 +12,12 @@ import json  # Technicznie: zapis i odczyt danych w formacie JSON
 # który mogą odczytać zarówno ludzie jak i inne programy
 # JSON to uniwersalny format danych - jak esperanto dla komputerów!
 
+from collections import deque  # Technicznie: lista z limitem długości (najstarsze wypadają)
+
+# To jest "taśma z ograniczoną długością"
+# Dlaczego to mamy? Przy długich przebiegach z zapisem na bieżąco (JsonlSink)
+# w pamięci trzymamy tylko ostatnie wyniki - starsze są już bezpiecznie na dysku
+
 import time  # Technicznie: pozwala mierzyć czas i robić przerwy w działaniu programu
 
 # To jest "stoper i budzik"
@@ -38,6 +44,7 @@ from datetime import datetime  # Technicznie: operacje na dacie i czasie
 
 from config import (
     AzureConfig,
+    OCRConfig,
 )  # Technicznie: konfiguracja połączenia z Azure Computer Vision
 
 # To jest "książka telefoniczna i klucze do Azure"
@@ -45,6 +52,32 @@ from config import (
 # - GDZIE jest nasza usługa OCR (adres)
 # - JAK się zalogować (klucz API)
 # AzureConfig bezpiecznie przechowuje te tajemnice
+# OCRConfig mówi jak często pytać o wynik OCR
+
+from polling import (
+    PollPolicy,
+    PollTimeoutError,
+    parse_retry_after,
+    poll_until_done,
+)  # Wspólny silnik pollingu (backoff, Retry-After, deadline)
+
+# To jest "inteligentny budzik"
+# Dlaczego to mamy? Żeby modul_ocr.py i ta klasa czekały na wynik OCR tak samo
+
+from text_compaction import (
+    NOISE_PUNCTUATION_RATIO,
+    collapse_whitespace,
+    punctuation_ratio,
+)  # Wspólne heurystyki jakości tekstu (te same czyszczą tekst OCR przed wysłaniem do LLM)
+
+from ocr_sink import (
+    JsonlSink,
+    write_text_export,
+)  # Zapis wyników na bieżąco: JSON Lines (opcjonalnie gzip) i pliki .txt po każdym wyniku
+
+from ocr_results import (
+    OCRResult,
+)  # Zwięzły wynik OCR (strony/linie ze __slots__, ramki i pewności w tablicach)
 
 from azure.cognitiveservices.vision.computervision.models import (
     OperationStatusCodes,
@@ -77,7 +110,13 @@ class OCRProcessor:
     # OCR = Optical Character Recognition = "Rozpoznawanie znaków optycznych"
     # To jak skaner w drukarce, ale inteligentny - potrafi przeczytać tekst z każdego zdjęcia!
 
-    def __init__(self):
+    def __init__(self, sink=None, keep_results=None):
+        """
+        sink (JsonlSink, optional): every result is appended to it as soon as it is processed.
+        keep_results (int, optional): with a sink, keep only this many latest results in
+            self.results (older ones are already on disk; 0 keeps none); None keeps all of them.
+            The caller owns the sink and closes it (save_results does not).
+        """
         print("\n=== Initializing OCR Processor ===")
         # To jest "procedura uruchomienia procesora OCR"
         # Informujemy użytkownika że system startuje
@@ -87,10 +126,25 @@ class OCRProcessor:
         # To jest połączenie z chmurą Microsoft, które pozwala nam czytać tekst z obrazów
         # Bez tego nie moglibyśmy w ogóle używać OCR!
 
-        self.results = []
+        self.last_poll_stats = None
+        # Statystyki ostatniego pollingu (ile zapytań o status, ile czekaliśmy)
+
+        self.sink = sink
+        # "Archiwista na bieżąco" - jeśli jest, każdy wynik od razu trafia na dysk
+        # Awaria w połowie długiego przebiegu nie zabiera wszystkiego ze sobą
+
+        if keep_results is not None and sink is None:
+            raise ValueError("keep_results requires a sink - dropped results would be lost.")
+        # Bez zapisu na bieżąco nie możemy wyrzucać wyników z pamięci - przepadłyby!
+
+        self.results = deque(maxlen=keep_results) if keep_results is not None else []
         # Tworzymy pustą "teczkę na wyniki"
         # Tu będziemy zbierać wszystkie rozpoznane teksty
         # To jak pudełko na dokumenty - każde rozpoznanie tekstu trafi na osobną kartkę
+        # Z keep_results teczka ma ograniczoną pojemność - najstarsze kartki wypadają
+
+        self.processed_count = 0
+        # Ile wyników przetworzyliśmy w sumie (także tych, które już wypadły z teczki)
 
     def extract_text_from_url(self, image_url, description="", language=None):
         """Extract text from image URL using Read API (async pattern)"""
@@ -162,10 +216,18 @@ class OCRProcessor:
                 processed_result = self._process_read_result(
                     result, image_url, description, language, elapsed_time
                 )
+                processed_result["poll_count"] = self.last_poll_stats.polls
+                # Ile razy pytaliśmy Azure "Gotowe?" zanim dostaliśmy wynik
                 # PRZETWARZAMY SUROWY WYNIK!
                 # Azure dał nam masę danych, teraz je rozpakowujemy i porządkujemy
                 # To jak rozpakowywanie paczki - sortujemy zawartość na półki
 
+                self.processed_count += 1
+                if self.sink is not None:
+                    self.sink.write(processed_result, self.processed_count)
+                # NAJPIERW ZAPIS NA DYSK (jeśli mamy sink) - jedna linia JSON na wynik
+                # Dopiero potem wynik może kiedyś wypaść z ograniczonej teczki
+
                 self.results.append(processed_result)
                 # Dodajemy wynik do naszej "teczki"
                 # To jak dołożenie kolejnego dokumentu do segregatora
@@ -218,254 +280,82 @@ class OCRProcessor:
             return None
             # Znowu zwracamy "nic"
 
-    def _poll_for_result(self, operation_id, max_attempts=30, poll_interval=1):
-        """Poll for Read operation result"""
+    def _poll_for_result(self, operation_id, policy=None):
+        """Poll for Read operation result (shared polling engine, see polling.py)"""
         # To jest "cierpliwy czekacz"
         # OCR działa w tle i może trwać kilka sekund
-        # Ta funkcja sprawdza co sekundę: "Gotowe? Gotowe? Gotowe?"
-        # To jak sprawdzanie czy pranie w pralce się skończyło - zaglądamy co chwilę
+        # Pierwsze pytanie zadajemy szybko (małe obrazki są gotowe w ułamku sekundy),
+        # potem czekamy coraz dłużej (backoff z losowym "jitterem"),
+        # słuchamy nagłówka Retry-After od Azure i mamy twardy limit czasu (deadline)
+        # To jak sprawdzanie pralki: na początku często, potem coraz rzadziej
 
         print("   Polling for results...", end="", flush=True)
         # Informujemy że zaczynamy czekać
         # end="" = nie rób nowej linii (będziemy dodawać kropki)
-        # flush=True = wyświetl natychmiast (nie czekaj)
-        # To pozwoli nam pokazać animację: "Polling for results..."
-
-        for attempt in range(max_attempts):
-            # PĘTLA CZEKANIA!
-            # Będziemy próbować max 30 razy
-            # attempt = numer próby (0, 1, 2, ... 29)
-            # To jak odliczanie: "Próba 1, próba 2, próba 3..."
-
-            try:
-                result: Any = self.client.get_read_result(operation_id)
-                # PYTAMY AZURE: "Czy już gotowe?"
-                # Wysyłamy numer operacji i pytamy o status
-                # To jak sprawdzenie statusu przesyłki: "Gdzie jest moja paczka?"
-
-                if result.status == OperationStatusCodes.succeeded:
-                    # Sprawdzamy: "Czy status to SUKCES?"
-                    # OperationStatusCodes.succeeded = kod oznaczający że się udało
-
-                    print(" ✓ Succeeded")
-                    # Wypisujemy że się udało! (z nowej linii, kończymy animację)
 
-                    return result
-                    # ZWRACAMY WYNIK! Koniec czekania!
-                    # To jak odebranie gotowej pizzy
-
-                elif result.status == OperationStatusCodes.failed:
-                    # Sprawdzamy: "Czy status to PORAŻKA?"
-                    # OCR się nie udał (obraz nieczytelny, błąd, itp.)
-
-                    print(" ✗ Failed")
-                    # Informujemy o porażce
+        def fetch():
+            # PYTAMY AZURE: "Czy już gotowe?"
+            # raw=True = dostajemy też nagłówki odpowiedzi (Retry-After)
+            raw_result: Any = self.client.get_read_result(operation_id, raw=True)
+            if raw_result.output.status not in [
+                OperationStatusCodes.succeeded,
+                OperationStatusCodes.failed,
+            ]:
+                print(".", end="", flush=True)
+                # Kropka = jeszcze pracuje (status "running")
+            return raw_result.output, parse_retry_after(raw_result.response.headers)
 
-                    return None
-                    # Zwracamy "nic" bo nie ma wyniku
-                    # To jak powiadomienie "Przepraszamy, nie udało się dostarczyć paczki"
+        try:
+            result, stats = poll_until_done(
+                fetch,
+                lambda r: r.status
+                in [OperationStatusCodes.succeeded, OperationStatusCodes.failed],
+                policy or PollPolicy.from_config(OCRConfig),
+            )
+            self.last_poll_stats = stats
+            # Zapamiętujemy ile razy pytaliśmy - trafi do wyniku jako "poll_count"
+
+        except PollTimeoutError as e:
+            self.last_poll_stats = e.stats
+            print(f" ✗ Timeout ({e.stats.polls} polls)")
+            # TIMEOUT - za długo czekaliśmy!
+            # To jak gdy pizza nie przyszła po godzinie - coś jest nie tak
+            return None
 
-                print(".", end="", flush=True)
-                # Jeśli ani sukces ani porażka (status = "running")
-                # Wypisujemy kropkę żeby pokazać że czekamy
-                # To daje animację: "Polling for results..."
-
-                time.sleep(poll_interval)
-                # CZEKAMY 1 SEKUNDĘ!
-                # time.sleep(1) = zatrzymaj program na 1 sekundę
-                # Nie pytamy Azure co milisekundę żeby nie spamować
-                # To jak odczekanie minuty przed ponownym zadzwonieniem
-
-            except Exception as e:
-                # ŁAPIEMY BŁĘDY podczas sprawdzania
-                print(f" ✗ Error polling: {str(e)}")
-                return None
-                # Coś poszło nie tak podczas sprawdzania statusu
+        except Exception as e:
+            # ŁAPIEMY BŁĘDY podczas sprawdzania
+            print(f" ✗ Error polling: {str(e)}")
+            return None
 
-        print(" ✗ Timeout")
-        # Jeśli wyszliśmy z pętli (30 prób się skończyło) i nie było sukcesu
-        # To TIMEOUT - za długo czekaliśmy!
-        # To jak gdy pizza nie przyszła po godzinie - coś jest nie tak
+        if result.status == OperationStatusCodes.succeeded:
+            print(f" ✓ Succeeded ({stats.polls} polls)")
+            return result
+            # ZWRACAMY WYNIK! Koniec czekania!
 
+        print(" ✗ Failed")
+        # OCR się nie udał (obraz nieczytelny, błąd, itp.)
         return None
-        # Zwracamy "nic" bo nie udało się w czasie
 
     def _process_read_result(
         self, result, image_url, description, language, elapsed_time
     ):
-        """Process and structure Read API results"""
+        """Process and structure Read API results (compact OCRResult, see ocr_results.py)"""
         # To jest "organizator wyników"
         # Azure daje nam masę danych w skomplikowanej formie
-        # Ta funkcja wszystko rozpakuje i uporządkuje w czytelną strukturę
+        # Ta funkcja wszystko rozpakuje i uporządkuje w zwięzłą strukturę
         # To jak sortowanie zakupów po powrocie ze sklepu - wszystko na swoje miejsce!
 
-        processed = {
-            "timestamp": datetime.now().isoformat(),
-            "image_url": image_url,
-            "description": description,
-            "language": language or "auto-detected",
-            "processing_time_ms": round(elapsed_time * 1000, 2),
-            "pages": [],
-            "full_text": "",
-            "statistics": {},
-        }
-        # Tworzymy "pusty szablon raportu"
-        # To jak formularz do wypełnienia - już wiemy jakie pola mamy, teraz je wypełnimy:
-        # - timestamp: kiedy to rozpoznaliśmy
-        # - image_url: skąd był obraz
-        # - description: opis dokumentu
-        # - language: język tekstu
-        # - processing_time_ms: ile to trwało (w milisekundach!)
-        # - pages: lista stron (będziemy wypełniać)
-        # - full_text: cały tekst w jednym kawałku
-        # - statistics: statystyki (ile linii, słów, itp.)
-
-        if not result.analyze_result or not result.analyze_result.read_results:
-            # Sprawdzamy: "Czy są jakieś wyniki?"
-            # Jeśli nie ma wyniku lub wyniku OCR - zwracamy pusty szablon
-            # To jak otwarcie pustej koperty
-            return processed
-
-        all_text = []
-        # Pusta lista gdzie będziemy zbierać CAŁY TEKST
-        # Każda linia tekstu trafi tutaj
-        # To jak koszyk - będziemy wrzucać do niego wszystkie zdania
-
-        total_lines = 0
-        # Licznik linii - zaczynamy od zera
-        # To jak licznik kilometrów w samochodzie
-
-        total_words = 0
-        # Licznik słów - też od zera
-        # Będziemy zliczać każde słowo które OCR rozpoznał
-
-        # Process each page
-        for page_num, page in enumerate(result.analyze_result.read_results, 1):
-            # PĘTLA PRZEZ WSZYSTKIE STRONY!
-            # enumerate(..., 1) = numeruj od 1 (strona 1, 2, 3...)
-            # page_num = numer strony
-            # page = dane tej strony
-            # Niektóre dokumenty mają wiele stron (jak PDF)
-            # To jak czytanie książki - strona po stronie
-
-            page_data = {
-                "page_number": page_num,
-                "width": getattr(page, "width", 0),
-                "height": getattr(page, "height", 0),
-                "unit": getattr(page, "unit", "pixel"),
-                "angle": getattr(page, "angle", 0),
-                "lines": [],
-            }
-            # Tworzymy "notatkę o stronie"
-            # Zapisujemy:
-            # - page_number: którą stroną jest
-            # - width/height: wymiary strony
-            # - unit: jednostka wymiarów (pixele, cale, cm)
-            # - angle: czy strona jest obrócona? (0° = prosto, 90° = w bok)
-            # - lines: lista linii tekstu (wypełnimy za chwilę)
-            # getattr(..., 0) = weź wartość, jeśli nie ma daj 0
-            # To jak mierzenie kartki papieru przed pisaniem
-
-            # Process each line
-            if hasattr(page, "lines") and page.lines:
-                # Sprawdzamy: "Czy na tej stronie są jakieś linie tekstu?"
-                # hasattr = sprawdź czy obiekt ma to pole
-                # To jak pytanie: "Czy ta strona ma jakiś tekst czy jest pusta?"
-
-                for line in page.lines:
-                    # PĘTLA PRZEZ WSZYSTKIE LINIE!
-                    # Każda linia to jeden wiersz tekstu (jak w notatniku)
-                    # line = dane jednej linii
-
-                    line_data = {
-                        "text": line.text,
-                        "bounding_box": getattr(line, "bounding_box", []),
-                        "words": [],
-                    }
-                    # Tworzymy "notatkę o linii"
-                    # - text: co jest napisane w tej linii
-                    # - bounding_box: współrzędne gdzie jest ta linia (ramka wokół tekstu)
-                    # - words: lista słów (zaraz wypełnimy)
-                    # To jak zakreślaczem - oznaczamy gdzie dokładnie jest tekst
-
-                    # Process words with confidence scores
-                    if hasattr(line, "words") and line.words:
-                        # Sprawdzamy: "Czy ta linia ma pojedyncze słowa?"
-                        # Czasem linia jest podzielona na słowa z osobnymi wynikami
-
-                        line_data["words"] = [
-                            {
-                                "text": word.text,
-                                "confidence": round(
-                                    getattr(word, "confidence", 1.0), 3
-                                ),
-                                "bounding_box": getattr(word, "bounding_box", []),
-                            }
-                            for word in line.words
-                        ]
-                        # ROZPAKOWUJEMY WSZYSTKIE SŁOWA!
-                        # Dla każdego słowa w linii tworzymy notatkę:
-                        # - text: jakie to słowo ("kot", "pies", "dom")
-                        # - confidence: jak OCR jest pewny? (0.0 - 1.0, czyli 0% - 100%)
-                        # - bounding_box: gdzie dokładnie jest to słowo
-                        # confidence pokazuje czy OCR jest pewny czy zgaduje
-                        # Przykład: "confidence": 0.987 = OCR jest w 98.7% pewien że to słowo jest dobre
-                        # To jak sprawdzian - każde słowo dostaje ocenę pewności!
-
-                        total_words += len(line.words)
-                        # DODAJEMY DO LICZNIKA!
-                        # len(line.words) = ile słów ma ta linia
-                        # Dodajemy to do całkowitej sumy
-                        # Przykład: miałem 10 słów, ta linia ma 5 → teraz mam 15
-
-                    page_data["lines"].append(line_data)
-                    # Dodajemy linię do listy linii strony
-                    # To jak dopisywanie kolejnego wiersza do notatnika
-
-                    all_text.append(line.text)
-                    # Dodajemy tekst linii do całego tekstu
-                    # To jak zbieranie zdań do esseju
-
-                    total_lines += 1
-                    # Zwiększamy licznik linii o 1
-                    # total_lines++ w innych językach
-
-            processed["pages"].append(page_data)
-            # Dodajemy całą stronę do listy stron
-            # To jak dołożenie kolejnej kartki do teczki
-
-        # Compile statistics
-        processed["full_text"] = "\n".join(all_text)
-        # SKLEJAMY CAŁY TEKST!
-        # '\n'.join() = połącz wszystkie linie znakiem nowej linii
-        # all_text to lista linii: ["Ala", "ma", "kota"]
-        # Po join: "Ala\nma\nkota" (każda linia w nowej linii)
-        # To jak przepisanie notatek z karteczek do jednego zeszytu
-
-        processed["statistics"] = {
-            "total_pages": len(processed["pages"]),
-            "total_lines": total_lines,
-            "total_words": total_words,
-            "total_characters": len(processed["full_text"]),
-            "avg_words_per_line": (
-                round(total_words / total_lines, 2) if total_lines > 0 else 0
-            ),
-        }
-        # TWORZYMY STATYSTYKI!
-        # To jest "raport z liczenia"
-        # - total_pages: ile stron przeczytaliśmy
-        # - total_lines: ile linii tekstu
-        # - total_words: ile słów (policzone wcześniej)
-        # - total_characters: ile znaków (liter, spacji, kropek)
-        # - avg_words_per_line: średnia słów na linię
-        # Przykład: 100 słów ÷ 20 linii = 5 słów na linię
-        # if total_lines > 0 = zabezpieczenie przed dzieleniem przez zero!
-        # To jak podsumowanie wypracowania: "Napisałeś 500 słów w 25 zdaniach"
-
-        return processed
-        # ZWRACAMY KOMPLETNY RAPORT!
-        # Wszystkie dane uporządkowane i gotowe do użycia
-        # To jak oddanie wypełnionego formularza
+        return OCRResult.from_read_result(
+            result, image_url, description, language, elapsed_time
+        )
+        # ZWRACAMY ZWIĘZŁY RAPORT!
+        # Zamiast słownika dla każdej strony, linii i słowa:
+        # - strony i linie to małe obiekty z __slots__ (bez __dict__ na każdy obiekt)
+        # - ramki (bounding boxy) i pewności słów leżą w płaskich tablicach array
+        # - słowniki słów powstają dopiero gdy ktoś o nie zapyta (line.words)
+        # result["full_text"] i result["statistics"] działają jak w słowniku
+        # result.to_dict() daje pełny, zagnieżdżony słownik (np. do zapisu JSON)
+        # To jak trzymanie notatek w segregatorze zamiast tysiąca luźnych karteczek
 
     def _print_extraction_summary(self, result):
         """Print readable summary of extraction results"""
@@ -555,9 +445,9 @@ class OCRProcessor:
             validation["issues"].append("Excessive whitespace detected")
             # Dodajemy uwagę o nadmiarowych spacjach
 
-            validation["cleaned_text"] = re.sub(r"\s+", " ", text)
+            validation["cleaned_text"] = collapse_whitespace(text)
             # CZYŚCIMY TEKST!
-            # re.sub(r'\s+', ' ', text) = zamień każdy ciąg białych znaków na JEDNĄ spację
+            # collapse_whitespace = re.sub(r'\s+', ' ', text) = zamień każdy ciąg białych znaków na JEDNĄ spację
             # \s+ = jeden lub więcej białych znaków (spacje, taby, newline)
             # Przykład: "Ala  ma   kota" → "Ala ma kota"
             # To jak używanie korektora - poprawiamy formatowanie
@@ -576,13 +466,13 @@ class OCRProcessor:
             # Uwaga: są nietypowe znaki - sprawdź czy to celowe
             # (check if expected) = może to być normalne jeśli tekst nie jest po angielsku
 
-        if len(re.findall(r"[^\w\s]", text)) / max(len(text), 1) > 0.3:
+        if punctuation_ratio(text) > NOISE_PUNCTUATION_RATIO:
             # Sprawdzamy: "Czy jest ZA DUŻO znaków interpunkcyjnych?"
-            # re.findall(r'[^\w\s]', text) = znajdź wszystkie znaki które NIE są literami ani spacjami
+            # punctuation_ratio: re.findall(r'[^\w\s]', text) = znajdź wszystkie znaki które NIE są literami ani spacjami
             # [^\w\s] = nie litera, nie cyfra, nie spacja (czyli: .,!?@#$ itp.)
             # len(...) / max(len(text), 1) = procent znaków interpunkcyjnych
             # max(..., 1) = zabezpieczenie przed dzieleniem przez 0
-            # > 0.3 = więcej niż 30%
+            # > NOISE_PUNCTUATION_RATIO (0.3) = więcej niż 30%
             # Jeśli 30%+ tekstu to dziwne znaki, prawdopodobnie OCR się pomylił
             # To jak sprawdzenie czy dokument nie jest przypadkiem zaszyfrowany lub pełen śmieci
 
@@ -673,6 +563,23 @@ class OCRProcessor:
         # Żeby móc je później przeczytać, przeanalizować lub przekazać komuś
         # Jak zapisywanie raportu Word - dane przetrwają zamknięcie programu!
 
+        summary = {
+            "task": "Task 2: OCR Text Extraction",
+            "timestamp": datetime.now().isoformat(),
+            "total_documents_processed": self.processed_count,
+        }
+        # Nagłówek pliku wyników - ten sam w obu przypadkach (z sinkiem i bez)
+
+        if self.sink is not None:
+            summary["results_file"] = self.sink.path
+            with open(filename, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2, ensure_ascii=False)
+            print(f"\n✓ Results were saved incrementally to: {self.sink.path} (summary: {filename})")
+            return filename
+        # Z sinkiem wszystko JUŻ jest na dysku (linia po linii) - nie budujemy
+        # gigantycznego słownika, zapisujemy tylko nagłówek ze ścieżką do pliku JSONL
+        # Sinka NIE zamykamy - należy do tego, kto go utworzył (można dalej przetwarzać)
+
         with open(filename, "w", encoding="utf-8") as f:
             # Otwieramy plik do ZAPISU
             # 'w' = write (pisz, nadpisz jeśli istnieje)
@@ -681,12 +588,7 @@ class OCRProcessor:
             # with = automatycznie zamknie plik (bezpieczne!)
 
             json.dump(
-                {
-                    "task": "Task 2: OCR Text Extraction",
-                    "timestamp": datetime.now().isoformat(),
-                    "total_documents_processed": len(self.results),
-                    "results": self.results,
-                },
+                {**summary, "results": [result.to_dict() for result in self.results]},
                 f,
                 indent=2,
                 ensure_ascii=False,
@@ -697,7 +599,7 @@ class OCRProcessor:
             # - task: nazwa zadania
             # - timestamp: kiedy zapisaliśmy (TERAZ)
             # - total_documents_processed: ile dokumentów rozpoznaliśmy
-            # - results: pełna lista wszystkich wyników
+            # - results: pełna lista wszystkich wyników (to_dict() rozwija zwięzły wynik w słownik)
             # indent=2 = wcięcia (ładnie czytelnie)
             # ensure_ascii=False = polskie znaki OK
 
@@ -717,57 +619,24 @@ class OCRProcessor:
         print("\n--- Exporting text files ---")
         # Nagłówek informacyjny
 
-        for i, result in enumerate(self.results, 1):
+        if self.sink is not None and self.sink.export_text:
+            print("   Text files were exported after each result.")
+            return
+        # Sink z eksportem tekstu zapisał już każdy plik .txt od razu - nie powtarzamy
+
+        first = self.processed_count - len(self.results) + 1
+        # Numer pierwszego wyniku w teczce (starsze mogły już z niej wypaść)
+
+        for i, result in enumerate(self.results, first):
             # PĘTLA PRZEZ WSZYSTKIE WYNIKI!
             # Każdy dokument dostanie swój własny plik .txt
             # i = numer dokumentu (1, 2, 3...)
 
-            # Create safe filename
-            safe_desc = re.sub(r"[^\w\s-]", "", result["description"])
-            # CZYŚCIMY OPIS żeby zrobić bezpieczną nazwę pliku!
-            # re.sub(r'[^\w\s-]', '', ...) = usuń wszystko co NIE jest:
-            # - \w = literą/cyfrą
-            # - \s = spacją
-            # - - = myślnikiem
-            # Przykład: "Text (v2.0)!" → "Text v20"
-            # Dlaczego? Bo nazwy plików nie mogą mieć znaków: / \ : * ? " < > |
-            # To jak przygotowanie tekstu na tablicę rejestracyjną - tylko proste znaki!
-
-            safe_desc = re.sub(r"[\s]+", "_", safe_desc)
-            # Zamieniamy SPACJE na PODKREŚLNIKI
-            # r'[\s]+' = jedna lub więcej spacji
-            # Przykład: "Printed English Text" → "Printed_English_Text"
-            # Dlaczego? Bo spacje w nazwach plików są problematyczne (trzeba używać "")
-            # To jak zastępowanie spacji myślnikami w URL-ach
-
-            filename = f"ocr_output_{i}_{safe_desc}.txt"
-            # Składamy PEŁNĄ NAZWĘ PLIKU
-            # Format: ocr_output_NUMER_OPIS.txt
+            filename = write_text_export(result, i)
+            # ZAPISUJEMY PLIK (ocr_sink.write_text_export - ten sam format co przy zapisie na bieżąco)
+            # Nazwa: ocr_output_NUMER_OPIS.txt, opis bez znaków specjalnych
             # Przykład: "ocr_output_1_Printed_English_Text.txt"
-            # To daje nam unikalne, opisowe nazwy dla każdego pliku
-
-            with open(filename, "w", encoding="utf-8") as f:
-                # Otwieramy plik do zapisu
-                # encoding='utf-8' = polskie znaki będą działać
-
-                f.write(f"OCR Extraction Results\n")
-                f.write(f"Source: {result['description']}\n")
-                f.write(f"Language: {result['language']}\n")
-                f.write(f"Timestamp: {result['timestamp']}\n")
-                f.write(f"\n{'='*70}\n\n")
-                # Piszemy NAGŁÓWEK pliku
-                # To informacje o dokumencie:
-                # - Tytuł
-                # - Skąd pochodzi
-                # - Jaki język
-                # - Kiedy rozpoznane
-                # - Linia oddzielająca (70 znaków "=")
-                # To jak strona tytułowa raportu
-
-                f.write(result["full_text"])
-                # Piszemy CAŁY ROZPOZNANY TEKST!
-                # To jest główna treść pliku
-                # To jak skopiowanie treści z jednego dokumentu do drugiego
+            # W środku: nagłówek (źródło, język, czas) i cały rozpoznany tekst
 
             print(f"   ✓ Exported: {filename}")
             # Informujemy że zapisaliśmy plik
@@ -0,0 +1,225 @@
+"""
+ocr_results.py
+Compact representation of Read API results (OCRProcessor in ocr_processor.py).
+
+Instead of nested dicts per page, line and word, a result keeps
+    - pages and lines as __slots__ objects,
+    - all bounding boxes in flat array('d') buffers (8 coordinates per box),
+    - word texts in one list and word confidences in an array('f'),
+and builds the word-level dicts only when they are asked for:
+
+    result = OCRResult.from_read_result(read_result, image_url="...", ...)
+    result["full_text"]                 # what most callers need
+    result.pages[0].lines[3].words      # word dicts, built on access
+    result.to_dict()                    # the full nested dict shape (save_results)
+
+Like polling.py, this module has no project imports, so ocr_processor.py (run as a
+script) can use it.
+"""
+
+import math
+from array import array
+from datetime import datetime
+from typing import Any, List, Optional
+
+# Read API bounding boxes are 4 corner points: x1, y1, ..., x4, y4
+BOX_SIZE = 8
+
+_MISSING = float("nan")
+
+
+def _append_box(buffer: array, box: Any) -> None:
+    # Brak ramki (albo nietypowa) zapisujemy jako NaN - odczyt da wtedy None, jak w SDK
+    if box and len(box) == BOX_SIZE:
+        buffer.extend(box)
+    else:
+        buffer.extend([_MISSING] * BOX_SIZE)
+
+
+def _box(buffer: array, index: int) -> Optional[list]:
+    start = index * BOX_SIZE
+    values = buffer[start : start + BOX_SIZE]
+    return None if math.isnan(values[0]) else list(values)
+
+
+class OCRLine:
+    """One recognised line; bounding box and words live in the result's buffers."""
+
+    __slots__ = ("_result", "_index", "text", "_word_start", "_word_end")
+
+    def __init__(self, result: "OCRResult", index: int, text: str, word_start: int, word_end: int):
+        self._result = result
+        self._index = index
+        self.text = text
+        self._word_start = word_start
+        self._word_end = word_end
+
+    @property
+    def bounding_box(self) -> Optional[list]:
+        return _box(self._result._line_boxes, self._index)
+
+    @property
+    def word_count(self) -> int:
+        return self._word_end - self._word_start
+
+    @property
+    def words(self) -> List[dict]:
+        """Word dicts (text, confidence rounded to 3 places, bounding_box), built on access."""
+        result = self._result
+        return [
+            {
+                "text": result._word_texts[i],
+                "confidence": round(result._word_confidences[i], 3),
+                "bounding_box": _box(result._word_boxes, i),
+            }
+            for i in range(self._word_start, self._word_end)
+        ]
+
+    def to_dict(self) -> dict:
+        return {"text": self.text, "bounding_box": self.bounding_box, "words": self.words}
+
+
+class OCRPage:
+    """One page of a result."""
+
+    __slots__ = ("page_number", "width", "height", "unit", "angle", "lines")
+
+    def __init__(self, page_number: int, width: float, height: float, unit: str, angle: float):
+        self.page_number = page_number
+        self.width = width
+        self.height = height
+        self.unit = unit
+        self.angle = angle
+        self.lines: List[OCRLine] = []
+
+    def to_dict(self) -> dict:
+        return {
+            "page_number": self.page_number,
+            "width": self.width,
+            "height": self.height,
+            "unit": self.unit,
+            "angle": self.angle,
+            "lines": [line.to_dict() for line in self.lines],
+        }
+
+
+class OCRResult:
+    """
+    Result of one Read API call. Top-level fields are readable (and writable) like a
+    dict - result["full_text"], result["statistics"] - as the dict results were.
+    """
+
+    __slots__ = (
+        "timestamp",
+        "image_url",
+        "description",
+        "language",
+        "processing_time_ms",
+        "poll_count",
+        "pages",
+        "full_text",
+        "statistics",
+        "_line_boxes",
+        "_word_texts",
+        "_word_confidences",
+        "_word_boxes",
+    )
+
+    # Kolejność pól w to_dict() (jak w dawnym słowniku wyniku)
+    FIELDS = (
+        "timestamp",
+        "image_url",
+        "description",
+        "language",
+        "processing_time_ms",
+        "pages",
+        "full_text",
+        "statistics",
+        "poll_count",
+    )
+
+    def __init__(self, image_url: str, description: str = "", language: Optional[str] = None, elapsed_time: float = 0.0):
+        self.timestamp = datetime.now().isoformat()
+        self.image_url = image_url
+        self.description = description
+        self.language = language or "auto-detected"
+        self.processing_time_ms = round(elapsed_time * 1000, 2)
+        self.poll_count: Optional[int] = None
+        self.pages: List[OCRPage] = []
+        self.full_text = ""
+        self.statistics: dict = {}
+        self._line_boxes = array("d")
+        self._word_texts: List[str] = []
+        self._word_confidences = array("f")
+        self._word_boxes = array("d")
+
+    @classmethod
+    def from_read_result(cls, read_result: Any, image_url: str, description: str = "",
+                         language: Optional[str] = None, elapsed_time: float = 0.0) -> "OCRResult":
+        """Builds the result from a Read API response (analyze_result.read_results)."""
+        result = cls(image_url, description, language, elapsed_time)
+        analyze_result = getattr(read_result, "analyze_result", None)
+        if analyze_result and analyze_result.read_results:
+            for page_number, page in enumerate(analyze_result.read_results, 1):
+                result.add_page(page_number, page)
+        result.finish()
+        return result
+
+    def add_page(self, page_number: int, page: Any) -> OCRPage:
+        ocr_page = OCRPage(
+            page_number,
+            getattr(page, "width", 0),
+            getattr(page, "height", 0),
+            getattr(page, "unit", "pixel"),
+            getattr(page, "angle", 0),
+        )
+        for line in getattr(page, "lines", None) or []:
+            word_start = len(self._word_texts)
+            for word in getattr(line, "words", None) or []:
+                self._word_texts.append(word.text)
+                self._word_confidences.append(getattr(word, "confidence", 1.0))
+                _append_box(self._word_boxes, getattr(word, "bounding_box", None))
+            index = len(self._line_boxes) // BOX_SIZE
+            _append_box(self._line_boxes, getattr(line, "bounding_box", None))
+            ocr_page.lines.append(OCRLine(self, index, line.text, word_start, len(self._word_texts)))
+        self.pages.append(ocr_page)
+        return ocr_page
+
+    def finish(self) -> None:
+        """Joins the full text and computes the statistics."""
+        self.full_text = "\n".join(line.text for page in self.pages for line in page.lines)
+        total_lines = len(self._line_boxes) // BOX_SIZE
+        total_words = len(self._word_texts)
+        self.statistics = {
+            "total_pages": len(self.pages),
+            "total_lines": total_lines,
+            "total_words": total_words,
+            "total_characters": len(self.full_text),
+            "avg_words_per_line": round(total_words / total_lines, 2) if total_lines > 0 else 0,
+        }
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        if key == "pages":
+            return [page.to_dict() for page in self.pages]
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.FIELDS or key == "pages":
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self, include_pages: bool = True) -> dict:
+        """The nested dict shape of the result (pages, lines and words included)."""
+        fields = self.FIELDS if include_pages else tuple(f for f in self.FIELDS if f != "pages")
+        data = {field: self[field] for field in fields}
+        if data.get("poll_count") is None:
+            data.pop("poll_count", None)
+        return data
@@ -0,0 +1,89 @@
+"""
+ocr_sink.py
+Incremental output of OCRProcessor results (ocr_processor.py).
+
+Every result is appended as one compact JSON line as soon as it is processed
+(optionally gzip-compressed) and, if enabled, its text is exported to its own .txt
+file right away - a crash loses at most the result in progress:
+
+    sink = JsonlSink("ocr_results.jsonl.gz", export_text=True)
+    processor = OCRProcessor(sink=sink, keep_results=10)   # keep only the last 10 in memory
+    ...
+    sink.close()
+
+Like polling.py, this module has no project imports, so ocr_processor.py (run as a
+script) can use it.
+"""
+
+import gzip
+import json
+import os
+import re
+from typing import Any, Optional
+
+
+def text_export_filename(index: int, description: str) -> str:
+    """ocr_output_<index>_<description without special characters>.txt"""
+    safe_desc = re.sub(r"[^\w\s-]", "", description or "")
+    safe_desc = re.sub(r"[\s]+", "_", safe_desc)
+    return f"ocr_output_{index}_{safe_desc}.txt"
+
+
+def write_text_export(result: Any, index: int, directory: str = "") -> str:
+    """Writes the text of one result with its header; returns the file path."""
+    path = os.path.join(directory, text_export_filename(index, result["description"]))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("OCR Extraction Results\n")
+        f.write(f"Source: {result['description']}\n")
+        f.write(f"Language: {result['language']}\n")
+        f.write(f"Timestamp: {result['timestamp']}\n")
+        f.write(f"\n{'=' * 70}\n\n")
+        f.write(result["full_text"])
+    return path
+
+
+class JsonlSink:
+    """
+    Appends results to a JSON Lines file (gzip when the name ends with .gz or
+    compress=True) and optionally exports each result's text to `text_dir`.
+    """
+
+    def __init__(
+        self,
+        path: str = "ocr_results.jsonl",
+        compress: Optional[bool] = None,
+        export_text: bool = False,
+        text_dir: str = "",
+    ):
+        self.path = path
+        self.compress = path.endswith(".gz") if compress is None else compress
+        self.export_text = export_text
+        self.text_dir = text_dir
+        self.written = 0
+        if text_dir:
+            os.makedirs(text_dir, exist_ok=True)
+        # Dopisujemy - kolejne uruchomienie nie kasuje wcześniejszych wyników
+        if self.compress:
+            self._file = gzip.open(path, "at", encoding="utf-8")
+        else:
+            self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, result: Any, index: int) -> None:
+        """Appends one result (OCRResult or dict) and flushes it to disk."""
+        data = result.to_dict() if hasattr(result, "to_dict") else result
+        self._file.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n")
+        # gzip: flush() kończy blok (Z_SYNC_FLUSH), więc zapisane linie da się odczytać po awarii
+        self._file.flush()
+        self.written += 1
+        if self.export_text:
+            write_text_export(result, index, self.text_dir)
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self) -> "JsonlSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,129 @@
+"""
+pdf_utils.py
+Local PDF helpers used before remote OCR (page splitting, embedded text layer).
+
+pypdf is an optional dependency: without it PDFs are simply sent to OCR whole.
+It is imported on first use, not when the pipeline is imported.
+"""
+
+import io
+import logging
+import threading
+from typing import List, Optional
+
+from .backends import PageChunk
+
+logger = logging.getLogger(__name__)
+
+PdfReader = PdfWriter = None  # pypdf, importowany przy pierwszym użyciu
+_checked = False
+_import_lock = threading.Lock()
+
+
+def pypdf_available() -> bool:
+    """True when pypdf is installed (imports it on the first call); warns once otherwise."""
+    global PdfReader, PdfWriter, _checked
+    if not _checked:
+        with _import_lock:
+            if not _checked:  # inny wątek mógł właśnie skończyć import
+                try:
+                    from pypdf import PdfReader, PdfWriter
+                except ImportError:  # opcjonalna zależność (pip install pypdf)
+                    logger.warning(
+                        "⚠️ pypdf nie jest zainstalowany - PDF trafia do zdalnego OCR bez lokalnego przetwarzania."
+                    )
+                _checked = True  # dopiero po imporcie, inaczej inne wątki widzą PdfReader = None
+    return PdfReader is not None
+
+
+def split_pdf(path: str, pages_per_chunk: int = 1) -> List[PageChunk]:
+    """
+    Cuts a PDF into chunks of `pages_per_chunk` pages (each chunk is a standalone PDF).
+
+    Returns:
+        list: PageChunk objects in page order; empty when pypdf is missing
+            or the document fits into a single chunk (nothing to split).
+    """
+    if not pypdf_available():
+        return []
+
+    reader = PdfReader(path)
+    total = len(reader.pages)
+    pages_per_chunk = max(1, pages_per_chunk)
+    if total <= pages_per_chunk:
+        return []
+
+    chunks = []
+    for start in range(0, total, pages_per_chunk):
+        end = min(start + pages_per_chunk, total)
+        writer = PdfWriter()
+        for index in range(start, end):
+            writer.add_page(reader.pages[index])
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        chunks.append(PageChunk(path, buffer.getvalue(), start + 1, end, total))
+    return chunks
+
+
+class TextLayer:
+    """Embedded text of a PDF: one string per page plus the pages that also draw an image."""
+
+    __slots__ = ("pages", "image_pages")
+
+    def __init__(self, pages: List[str], image_pages: List[int]):
+        self.pages = pages
+        self.image_pages = image_pages  # numery od 1
+
+
+def extract_text_layer(path: str, min_image_side_px: int = 1) -> Optional[TextLayer]:
+    """
+    Text of every page from the PDF's embedded text layer (in page order), and the
+    numbers of pages with an embedded image of at least `min_image_side_px` on both
+    sides (e.g. a chart pasted as a picture - its values are not in the text layer).
+
+    Returns:
+        TextLayer | None: None when pypdf is missing or the PDF cannot be read
+            (e.g. encrypted) - the caller falls back to remote OCR.
+    """
+    if not pypdf_available():
+        return None
+    try:
+        reader = PdfReader(path)
+        if reader.is_encrypted:
+            return None
+        pages, image_pages = [], []
+        for number, page in enumerate(reader.pages, start=1):
+            pages.append(page.extract_text() or "")
+            if _has_image(page.get("/Resources"), min_image_side_px):
+                image_pages.append(number)
+        return TextLayer(pages, image_pages)
+    except Exception as e:
+        logger.warning(f"⚠️ Nie udało się odczytać warstwy tekstowej PDF: {e}")
+        return None
+
+
+def _has_image(resources, min_side_px: int, depth: int = 0) -> bool:
+    # Tylko słowniki zasobów (bez dekodowania obrazów); obrazy mogą siedzieć w formularzach (Form XObject)
+    if resources is None or depth > 3:
+        return False
+    xobjects = resources.get_object().get("/XObject")
+    if xobjects is None:
+        return False
+    for xobject in xobjects.get_object().values():
+        xobject = xobject.get_object()
+        subtype = xobject.get("/Subtype")
+        if subtype == "/Image":
+            if min(int(xobject.get("/Width", 0)), int(xobject.get("/Height", 0))) >= min_side_px:
+                return True
+        elif subtype == "/Form" and _has_image(xobject.get("/Resources"), min_side_px, depth + 1):
+            return True
+    return False
+
+
+def sparse_pages(pages: List[str], min_chars_per_page: int) -> List[int]:
+    """Numbers (from 1) of pages with fewer than `min_chars_per_page` non-blank characters."""
+    return [
+        number
+        for number, text in enumerate(pages, start=1)
+        if sum(1 for char in text if not char.isspace()) < min_chars_per_page
+    ]
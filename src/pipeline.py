@@ -1,17 +1,73 @@
 from typing import Any
+import asyncio
+import logging
 import os
 
-from .modul_ocr import get_text_from_file
-from .data_interpreter import interpret
-from .summarizer import create_summary, create_short_summary
+from .aio import FlightAbandoned, SingleFlight, iterate_sync, merge_async_iterators, run_sync
+from .backends import get_completion_backend, get_ocr_backend
+from .cache import file_digest, make_key
+from .cancellation import JobCancelled, bind_token, cancellable, check_cancelled, session_jobs, use_token
+from .config import PipelineConfig
+from .tracing import bind, span, start_span, use_span
+from .combined_analyzer import analyze_combined_async
+from .modul_ocr import NO_TEXT_RESULT, OCR_FAILED_RESULT, get_ocr_result_async
+from .data_interpreter import (
+    EMPTY_ANSWER as INTERPRET_EMPTY,
+    ERROR_MESSAGE as INTERPRET_ERROR,
+    interpret_async,
+    interpret_stream_async,
+)
+from .summarizer import (
+    CALL_ERROR_PREFIXES as SUMMARY_CALL_ERRORS,
+    ERROR_PREFIXES as SUMMARY_ERRORS,
+    create_summary_async,
+    create_short_summary_async,
+    create_summary_stream_async,
+    create_short_summary_stream_async,
+)
 
+logger = logging.getLogger(__name__)
 
-def analyze_report_file(report_file: Any) -> tuple:
+# Value of the "extracted text" field when the pipeline failed
+PROCESSING_ERROR = "Processing Error"
+
+# Text field of a run whose OCR produced nothing (the LLM stages got this sentence)
+NO_TEXT_EXTRACTED = "No text could be extracted from the file."
+
+# Short description shown when a run was cancelled (superseded by a newer upload)
+RUN_CANCELLED = "Analysis cancelled - a newer request replaced it."
+
+# Checkpointed stages of analyze_report_file_staged_async, per mode
+STAGES = {"three_call": ("ocr", "interpret", "summaries"), "combined": ("ocr", "combined")}
+
+# Identical documents analysed at the same time (double submit, live=True) share one run
+_flights = SingleFlight()
+
+
+class StageFailed(Exception):
+    """
+    A stage returned its error answer instead of a result (see analyze_report_file_staged_async).
+    `retryable` is False when another attempt would fail the same way (no text, unusable answer).
+    """
+
+    def __init__(self, stage: str, message: str, retryable: bool = False):
+        super().__init__(f"{stage}: {message}")
+        self.stage = stage
+        self.retryable = retryable
+
+
+def analyze_report_file(report_file: Any, mode: str = None, session: str = None) -> tuple:
     """
     Executes the full analysis pipeline on uploaded file.
 
+    Blocking wrapper around analyze_report_file_async(): the coroutine runs on the shared
+    background event loop (see src/aio.py), so clients and connections are reused.
+
     Args:
         report_file(gr.File): The file object uploaded by the user via the Gradio interface.
+        mode(str, optional): "three_call" or "combined" (defaults to PipelineConfig.MODE).
+        session(str, optional): UI session id; a new document in the same session cancels
+            the session's previous run (see src/cancellation.py).
 
     Returns:
         tuple: A 5-tuple of strings, in the following order, which corresponds to the 'outputs' in app.py:
@@ -25,62 +81,420 @@ def analyze_report_file(report_file: Any) -> tuple:
         Exception: Catches and logs any exceptions from the sub-modules,returning user-friendly error messages to
             all UI fields.
     """
+    return run_sync(analyze_report_file_async(report_file, mode, session))
+
+
+def analyze_report_file_stream(report_file: Any, mode: str = None, session: str = None):
+    """
+    Generator version of analyze_report_file for the Gradio UI.
+
+    Yields the same 5-tuple as analyze_report_file, filled in progressively: preview first,
+    then the extracted text, then the key insights token by token, then both summaries
+    as they stream in. The last tuple yielded is the final result.
+
+    A cancelled run (superseded in the same `session`) stops without yielding anything more.
+    """
+    yield from iterate_sync(analyze_report_file_stream_async(report_file, mode, session))
+
+
+def _check_mode(mode: str) -> str:
+    mode = (mode or PipelineConfig.MODE).lower()
+    if mode not in PipelineConfig.MODES:
+        raise ValueError(f"Unknown pipeline mode '{mode}', expected one of {PipelineConfig.MODES}.")
+    return mode
+
+
+def _preview_path(report_file: Any):
+    """Image preview for the UI: the image itself, or the PDF icon."""
+    # Gradio may hand over a file object (.name) or a plain path (batch CLI)
+    path = report_file if isinstance(report_file, str) else getattr(report_file, "name", "")
+    filename = path.lower()
+
+    if filename.endswith((".png", ".jpg", ".jpeg")):
+        return path
+
+    if filename.endswith(".pdf"):
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        icon_path = os.path.join(base_dir, "assets", "pdf_icon.png")
+
+        if os.path.exists(icon_path):
+            return icon_path
+        logger.warning(f"File not found error: assets/pdf_icon.png!")
+
+    return None
+
+
+def _pipeline_attributes(report_file: Any, mode: str) -> dict:
+    path = report_file if isinstance(report_file, str) else getattr(report_file, "name", "")
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = None
+    return {"file": os.path.basename(path), "file_size_bytes": size, "mode": mode}
+
+
+async def _flight_key(report_file: Any, mode: str):
+    """
+    Single-flight key: content hash + file type + mode + backends (None = do not coalesce).
+    """
+    if not PipelineConfig.COALESCE:
+        return None
+    path = report_file if isinstance(report_file, str) else getattr(report_file, "name", "")
+    try:
+        digest = await asyncio.to_thread(file_digest, path)
+    except OSError:
+        return None
+    return make_key(
+        "pipeline",
+        digest,
+        os.path.splitext(path)[1].lower(),
+        mode,
+        get_ocr_backend().name,
+        get_completion_backend().name,
+    )
+
+
+def coalescing_stats() -> dict:
+    """Single-flight counters of the pipeline (runs led / callers that waited for one)."""
+    return _flights.stats()
+
+
+async def _analyze_three_call(text: str) -> tuple:
+    """Interpretation, then both summaries concurrently (3 chat completions)."""
+    # 2 Interpretation
+    key_insights = await interpret_async(text)
+    if not key_insights:
+        key_insights = "Failed to generate key insights from the text."
+
+    # Summary - short and long summaries only depend on key_insights, so run them concurrently
+    short_desc, conclusion = await asyncio.gather(
+        create_short_summary_async(key_insights),
+        create_summary_async(key_insights),
+    )
+    return key_insights, short_desc, conclusion
+
+
+async def _analyze_combined(text: str) -> tuple:
+    """Single chat completion; falls back to the three-call path if the answer is unusable."""
+    try:
+        combined = await analyze_combined_async(text)
+    except Exception as e:
+        logger.warning(f"[Pipeline] Combined call failed: {e}")
+        combined = None
+    if combined is None:
+        logger.warning("[Pipeline] Combined answer unusable, falling back to three calls.")
+        return await _analyze_three_call(text)
+    return combined
+
+
+async def _extract_text(report_file: Any, root) -> str:
+    # Which path produced the text (cache / text_layer / ocr) is recorded on the pipeline span
+    ocr = await get_ocr_result_async(report_file)
+    root.set(ocr_source=ocr["source"])
+    return ocr["text"]
+
+
+def _start_job(session: str, key: str):
+    """Cancellation token of a new run; in a UI session it supersedes the previous run."""
+    return session_jobs.start(session, key) if session else None
+
+
+def _clear(session: str) -> None:
+    logger.info("[Pipeline] Action CLEAR detected.")
+    if session and session_jobs.cancel(session, "cleared"):
+        logger.info("[Pipeline] Run of the session cancelled.")
+
+
+async def analyze_report_file_async(report_file: Any, mode: str = None, session: str = None) -> tuple:
+    """
+    Asyncio version of analyze_report_file (same arguments and 5-tuple result).
+
+    In "combined" mode the key insights and both summaries come from a single chat
+    completion (fewer round trips and input tokens); "three_call" is the default.
+
+    OCR polling and all LLM calls are awaited instead of blocking a thread, and the
+    short and long summaries run concurrently, so one event loop can keep many
+    documents in flight.
+
+    A document whose identical copy (same content and mode) is already being analysed
+    is not processed again: the call waits for the run in flight and shares its result.
+
+    Within a `session`, a call for a different document cancels the previous run: its
+    OCR polling and LLM calls stop and it returns RUN_CANCELLED.
+    """
 
     if report_file is None:
-        print("[Pipeline] Action CLEAR detected.")
+        _clear(session)
         return None, "", "", "", ""
 
-    print("--- [Pipeline] Analysis started... ---")
+    mode = _check_mode(mode)
+    image_preview_path = _preview_path(report_file) if report_file else None
 
-    image_preview_path = None
+    key = await _flight_key(report_file, mode)
+    token = _start_job(session, key)
+    try:
+        with use_token(token):
+            if key is None:
+                fields = await cancellable(_analyze(report_file, mode))
+            else:
+                if _flights.pending(key) is not None:
+                    logger.info("[Pipeline] Same document already in progress - waiting for its result.")
+                fields = await cancellable(_flights.run(key, lambda: cancellable(_analyze(report_file, mode))))
+    except JobCancelled as e:
+        logger.info(f"[Pipeline] Run cancelled: {e}")
+        fields = RUN_CANCELLED, "", "", ""
+    finally:
+        if token is not None:
+            session_jobs.finish(session, token)
+    return (image_preview_path, *fields)
 
-    if report_file:
 
-        filename = getattr(report_file, "name", "").lower()
+async def _analyze(report_file: Any, mode: str) -> tuple:
+    """
+    OCR, interpretation and summaries of one document.
+    Returns (short_desc, key_insights, conclusion, text) - the fields shared by coalesced calls.
+    """
+    logger.info(f"--- [Pipeline] Analysis started ({mode})... ---")
 
-        if filename.endswith((".png", ".jpg", ".jpeg")):
-            image_preview_path = report_file.name
+    # Timings of every step are recorded as nested spans (OCR, LLM calls), see src/tracing.py
+    with span("pipeline", **_pipeline_attributes(report_file, mode)) as root:
+        try:
+            # 1 OCR (or the PDF text layer)
+            text = await _extract_text(report_file, root)
+            if not text:
+                text = NO_TEXT_EXTRACTED
+            check_cancelled()
 
-        elif filename.endswith(".pdf"):
+            # 2-3 Interpretation and summaries
+            if mode == "combined":
+                key_insights, short_desc, conclusion = await _analyze_combined(text)
+            else:
+                key_insights, short_desc, conclusion = await _analyze_three_call(text)
 
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            icon_path = os.path.join(base_dir, "assets", "pdf_icon.png")
+            if not short_desc:
+                short_desc = "No short description available."
+            if not conclusion:
+                conclusion = "No conclusion available."
 
-            if os.path.exists(icon_path):
-                image_preview_path = icon_path
-            else:
-                print(f"File not found error: assets/pdf_icon.png!")
+            return short_desc, key_insights, conclusion, text
+
+        except Exception as e:
+            logger.error(f"[Pipeline] CRITICAL ERROR: {e} !")
+            root.fail(e)
+            error_msg = f"An unexpected error occurred during processing: {str(e)}"
+
+    return error_msg, error_msg, error_msg, PROCESSING_ERROR
+
+
+async def analyze_report_file_stream_async(report_file: Any, mode: str = None, session: str = None):
+    """
+    Async generator behind analyze_report_file_stream (chat completions use stream=True).
+    """
+    if report_file is None:
+        _clear(session)
+        yield None, "", "", "", ""
+        return
+
+    mode = _check_mode(mode)
+    key = await _flight_key(report_file, mode)
+    token = _start_job(session, key)
+    try:
+        # Token jest bieżący w każdym kroku generatora (także w zagnieżdżonych strumieniach)
+        async for update in bind_token(_analyze_stream(report_file, mode, key), token):
+            yield update
+    except JobCancelled as e:
+        logger.info(f"[Pipeline] Run cancelled: {e}")
+    finally:
+        if token is not None:
+            session_jobs.finish(session, token)
+
+
+async def _analyze_stream(report_file: Any, mode: str, key: str):
+    logger.info(f"--- [Pipeline] Streaming analysis started ({mode})... ---")
+
+    image_preview_path = _preview_path(report_file)
+    yield image_preview_path, "", "", "", ""
 
-    err_msg = "Processing Error"
+    # The same document already in progress (double submit): wait for its final result
+    while key is not None and _flights.pending(key) is not None:
+        logger.info("[Pipeline] Same document already in progress - waiting for its result.")
+        try:
+            fields = await cancellable(_flights.follow(_flights.pending(key)))
+        except FlightAbandoned:
+            continue  # tamten strumień przerwano - sprawdzamy ponownie / liczymy sami
+        yield (image_preview_path, *fields)
+        return
+    flight = _flights.lead(key) if key is not None else None
 
+    # A span cannot stay open across `yield` in a `with` block: the root span is made
+    # current only around the awaited steps, streams are iterated with bind()
+    root = start_span("pipeline", streaming=True, **_pipeline_attributes(report_file, mode))
+    error = None
     try:
-        # 1 OCR
-        print("[Pipeline] Step 1: OCR...")
-        text = get_text_from_file(report_file)
+        # 1 OCR (or the PDF text layer)
+        with use_span(root):
+            text = await _extract_text(report_file, root)
         if not text:
-            text = "No text could be extracted from the file."
+            text = NO_TEXT_EXTRACTED
+        check_cancelled()
+        yield image_preview_path, "", "", "", text
 
-        # 2 Interpretation
-        print("[Pipeline] Step 2: Interpretation...")
-        key_insights = interpret(text)
-        if not key_insights:
-            key_insights = "Failed to generate key insights from the text."
+        if mode == "combined":
+            # JSON answer cannot be split before it is complete - one update at the end
+            with use_span(root):
+                key_insights, short_desc, conclusion = await _analyze_combined(text)
+        else:
+            # 2 Interpretation, token by token
+            key_insights = ""
+            async for key_insights in bind(interpret_stream_async(text), root):
+                yield image_preview_path, "", key_insights, "", text
+            if not key_insights:
+                key_insights = "Failed to generate key insights from the text."
+            check_cancelled()
+
+            # 3 Both summaries stream concurrently
+            short_desc, conclusion = "", ""
+            async for name, value in merge_async_iterators(
+                {
+                    "short_desc": bind(create_short_summary_stream_async(key_insights), root),
+                    "conclusion": bind(create_summary_stream_async(key_insights), root),
+                }
+            ):
+                if name == "short_desc":
+                    short_desc = value
+                else:
+                    conclusion = value
+                yield image_preview_path, short_desc, key_insights, conclusion, text
 
-        # Summary
-        print("[Pipeline] Step 3: Generating summaries...")
-        short_desc = create_short_summary(key_insights)
         if not short_desc:
             short_desc = "No short description available."
-        conclusion = create_summary(key_insights)
         if not conclusion:
             conclusion = "No conclusion available."
 
-        print("[Pipeline] Finished successfully.")
-
-        return image_preview_path, short_desc, key_insights, conclusion, text
+        fields = short_desc, key_insights, conclusion, text
+        if flight is not None:
+            flight.set_result(fields)
+        yield (image_preview_path, *fields)
 
     except Exception as e:
-        print(f"[Pipeline] CRITICAL ERROR: {e} !")
+        logger.error(f"[Pipeline] CRITICAL ERROR: {e} !")
+        root.fail(e)
         error_msg = f"An unexpected error occurred during processing: {str(e)}"
+        fields = error_msg, error_msg, error_msg, PROCESSING_ERROR
+        if flight is not None and not flight.done():
+            flight.set_result(fields)
+        yield (image_preview_path, *fields)
+    except BaseException as e:
+        error = e  # np. GeneratorExit, gdy UI przerwie strumień
+        raise
+    finally:
+        root.end(error)
+        if flight is not None and not flight.done():
+            flight.set_exception(FlightAbandoned("Streaming analysis was stopped."))
+
+
+def _check_ocr(ocr: dict) -> str:
+    """Text of an OCR result; StageFailed when OCR failed or found no text (no LLM call then)."""
+    if ocr.get("error"):
+        raise StageFailed("ocr", ocr["error"], retryable=bool(ocr.get("retryable")))
+    if ocr.get("failed_chunks"):
+        raise StageFailed("ocr", f"pages {', '.join(ocr['failed_chunks'])} could not be read", retryable=True)
+    if not ocr.get("text") or ocr["text"] == NO_TEXT_RESULT:
+        raise StageFailed("ocr", NO_TEXT_EXTRACTED)
+    return ocr["text"]
+
+
+def _check_answers(stage: str, key_insights: str = None, *summaries: str) -> None:
+    """StageFailed when the interpretation or a summary is one of the modules' error answers."""
+    if key_insights is not None and (not key_insights or key_insights in (INTERPRET_ERROR, INTERPRET_EMPTY)):
+        # INTERPRET_ERROR = wyjątek przy wywołaniu modelu; pusta odpowiedź powtórzy się przy kolejnej próbie
+        raise StageFailed(stage, "Interpretation failed.", retryable=key_insights == INTERPRET_ERROR)
+    for value in summaries:
+        if value and value.startswith(SUMMARY_ERRORS):  # summarizer zwraca błędy jako tekst
+            raise StageFailed(stage, value, retryable=value.startswith(SUMMARY_CALL_ERRORS))
+
+
+def check_result(result: tuple) -> None:
+    """
+    Raises StageFailed when a 5-tuple of analyze_report_file holds an error answer
+    instead of a result (the same checks as the staged pipeline, as far as the text
+    fields show them).
+    """
+    _, short_desc, key_insights, conclusion, text = result
+    if text == PROCESSING_ERROR:
+        raise StageFailed("pipeline", short_desc)
+    if text in (NO_TEXT_EXTRACTED, NO_TEXT_RESULT, OCR_FAILED_RESULT):
+        raise StageFailed("ocr", text)
+    _check_answers("analysis", key_insights, short_desc, conclusion)
+
+
+async def _run_stage(stage: str, report_file: Any, mode: str, outputs: dict) -> dict:
+    if stage == "ocr":
+        ocr = await get_ocr_result_async(report_file)
+        return {"text": _check_ocr(ocr), "source": ocr["source"]}
+
+    text = outputs["ocr"]["text"]
+    if stage == "interpret":
+        key_insights = await interpret_async(text)
+        _check_answers(stage, key_insights)
+        return {"key_insights": key_insights}
+
+    if stage == "summaries":
+        key_insights = outputs["interpret"]["key_insights"]
+        short_desc, conclusion = await asyncio.gather(
+            create_short_summary_async(key_insights),
+            create_summary_async(key_insights),
+        )
+        _check_answers(stage, None, short_desc, conclusion)
+        return {"short_desc": short_desc, "conclusion": conclusion}
+
+    # Combined może wrócić do trzech wywołań - sprawdzamy wszystkie trzy odpowiedzi
+    key_insights, short_desc, conclusion = await _analyze_combined(text)
+    _check_answers(stage, key_insights, short_desc, conclusion)
+    return {"key_insights": key_insights, "short_desc": short_desc, "conclusion": conclusion}
+
+
+async def analyze_report_file_staged_async(
+    report_file: Any, mode: str = None, checkpoints: dict = None, on_stage=None
+) -> tuple:
+    """
+    Runs the pipeline stage by stage (STAGES[mode]) for the durable job queue.
+
+    Args:
+        report_file: Path of the document.
+        mode (str, optional): "three_call" or "combined" (defaults to PipelineConfig.MODE).
+        checkpoints (dict, optional): {stage: output} of stages finished by an earlier
+            attempt - they are not run again (e.g. no second OCR after a crash).
+        on_stage (callable, optional): on_stage(stage, output) after every stage that ran;
+            called in a worker thread, so it may block (e.g. write to SQLite).
+
+    Returns:
+        tuple: The same 5-tuple as analyze_report_file.
+
+    Raises:
+        StageFailed: A stage produced an error answer (e.stage names it; OCR without any
+            text counts too, so no LLM call is made). Unlike analyze_report_file, errors
+            are raised so the caller can retry the job from its last checkpoint.
+    """
+    mode = _check_mode(mode)
+    outputs = dict(checkpoints or {})
+    with span("pipeline", staged=True, **_pipeline_attributes(report_file, mode)) as root:
+        for stage in STAGES[mode]:
+            if stage in outputs:
+                logger.info(f"[Pipeline] Stage '{stage}' restored from checkpoint.")
+                continue
+            outputs[stage] = await _run_stage(stage, report_file, mode, outputs)
+            if on_stage is not None:
+                await asyncio.to_thread(on_stage, stage, outputs[stage])
+        root.set(ocr_source=outputs["ocr"].get("source"), resumed=sorted(checkpoints or ()))
 
-    return image_preview_path, error_msg, error_msg, error_msg, err_msg
+    fields = {}
+    for stage in STAGES[mode]:
+        fields.update(outputs[stage])
+    return (
+        _preview_path(report_file),
+        fields.get("short_desc") or "No short description available.",
+        fields["key_insights"],
+        fields.get("conclusion") or "No conclusion available.",
+        fields["text"],
+    )
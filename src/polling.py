@@ -0,0 +1,180 @@
+"""
+polling.py
+Shared polling engine for long-running Azure operations (Read API: submit -> poll -> result).
+
+Starts with a short interval (small images are often ready in well under a second),
+backs off exponentially with jitter, honours the service's Retry-After header and
+gives up after an overall deadline. Every run reports how many polls it took.
+
+This module has no imports from the package, so it can also be used by
+ocr_processor.py, which is run as a standalone script.
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Callable, Optional, Tuple
+
+
+class PollTimeoutError(TimeoutError):
+    """Raised when an operation did not finish before the polling deadline."""
+
+    def __init__(self, message: str, stats: "PollStats"):
+        super().__init__(message)
+        self.stats = stats
+
+
+class PollPolicy:
+    """Backoff settings for a single polled operation."""
+
+    def __init__(
+        self,
+        initial_interval: float = 0.25,
+        multiplier: float = 1.5,
+        max_interval: float = 2.0,
+        jitter: float = 0.2,
+        deadline: float = 120.0,
+    ):
+        self.initial_interval = initial_interval
+        self.multiplier = multiplier
+        self.max_interval = max_interval
+        self.jitter = jitter  # +/- fraction of the interval
+        self.deadline = deadline  # seconds for the whole operation
+
+    @classmethod
+    def from_config(cls, config: Any) -> "PollPolicy":
+        """Builds a policy from a settings class with POLL_* attributes (e.g. OCRConfig)."""
+        return cls(
+            initial_interval=config.POLL_INITIAL_INTERVAL_SECONDS,
+            multiplier=config.POLL_MULTIPLIER,
+            max_interval=config.POLL_MAX_INTERVAL_SECONDS,
+            jitter=config.POLL_JITTER,
+            deadline=config.POLL_DEADLINE_SECONDS,
+        )
+
+    def interval(self, attempt: int) -> float:
+        """Backoff interval before poll number `attempt + 1` (without Retry-After)."""
+        base = min(self.initial_interval * (self.multiplier ** attempt), self.max_interval)
+        if self.jitter:
+            base *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(base, 0.0)
+
+
+class PollStats:
+    """What happened while polling one operation."""
+
+    def __init__(self):
+        self.polls = 0
+        self.waited_seconds = 0.0
+        self.elapsed_seconds = 0.0
+        self.retry_after_honoured = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "polls": self.polls,
+            "waited_ms": round(self.waited_seconds * 1000, 2),
+            "elapsed_ms": round(self.elapsed_seconds * 1000, 2),
+            "retry_after_honoured": self.retry_after_honoured,
+        }
+
+
+def parse_retry_after(headers: Any) -> Optional[float]:
+    """Retry-After in seconds (only the delta-seconds form is supported)."""
+    if not headers:
+        return None
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _next_sleep(
+    policy: PollPolicy, stats: PollStats, retry_after: Optional[float], started: float
+) -> float:
+    delay = policy.interval(stats.polls - 1)
+    if retry_after is not None and retry_after > delay:
+        delay = retry_after
+        stats.retry_after_honoured += 1
+
+    remaining = policy.deadline - (time.monotonic() - started)
+    if remaining <= 0:
+        stats.elapsed_seconds = time.monotonic() - started
+        raise PollTimeoutError(
+            f"Operation not finished after {stats.polls} polls "
+            f"({policy.deadline:g} s deadline)",
+            stats,
+        )
+    return min(delay, remaining)
+
+
+def poll_until_done(
+    fetch: Callable[[], Tuple[Any, Optional[float]]],
+    is_done: Callable[[Any], bool],
+    policy: Optional[PollPolicy] = None,
+    cancel: Any = None,
+) -> Tuple[Any, PollStats]:
+    """
+    Calls `fetch` until `is_done(result)` is true.
+
+    Args:
+        fetch: Returns (result, retry_after_seconds or None).
+        is_done: True when the result is final (succeeded or failed).
+        policy (PollPolicy, optional): Backoff settings, defaults to PollPolicy().
+        cancel (optional): Cancellation token (raise_if_cancelled(), wait(seconds)),
+            e.g. cancellation.CancellationToken; checked before every poll.
+
+    Returns:
+        tuple: (final result, PollStats)
+
+    Raises:
+        PollTimeoutError: When the deadline passes before the operation finishes.
+    """
+    policy = policy or PollPolicy()
+    stats = PollStats()
+    started = time.monotonic()
+
+    while True:
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        result, retry_after = fetch()
+        stats.polls += 1
+        if is_done(result):
+            stats.elapsed_seconds = time.monotonic() - started
+            return result, stats
+
+        delay = _next_sleep(policy, stats, retry_after, started)
+        if cancel is not None:
+            cancel.wait(delay)  # anulowanie przerywa czekanie
+        else:
+            time.sleep(delay)
+        stats.waited_seconds += delay
+
+
+async def poll_until_done_async(
+    fetch: Callable[[], Any],
+    is_done: Callable[[Any], bool],
+    policy: Optional[PollPolicy] = None,
+    cancel: Any = None,
+) -> Tuple[Any, PollStats]:
+    """
+    Async variant of poll_until_done; `fetch` is a coroutine function.
+    """
+    policy = policy or PollPolicy()
+    stats = PollStats()
+    started = time.monotonic()
+
+    while True:
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        result, retry_after = await fetch()
+        stats.polls += 1
+        if is_done(result):
+            stats.elapsed_seconds = time.monotonic() - started
+            return result, stats
+
+        delay = _next_sleep(policy, stats, retry_after, started)
+        await asyncio.sleep(delay)
+        stats.waited_seconds += delay
@@ -0,0 +1,435 @@
+"""
+ratelimit.py
+Process-wide rate limiting and concurrency control of the Azure calls.
+
+Every limiter combines
+    - token buckets (e.g. Read API transactions per second, OpenAI requests and
+      tokens per minute) - callers queue until the bucket has capacity,
+    - a concurrency limit adjusted with AIMD: +1 per window of successful calls,
+      halved (at most once per cooldown) when the service answers 429.
+
+    limiter = get_limiter("openai")
+    response = limiter.call(client.chat.completions.create, amounts={"requests": 1, "tokens": 900}, **request)
+
+A 429 pauses the whole limiter for the Retry-After period and the call is retried
+(RateLimitConfig.MAX_RETRIES); other errors pass through. The limiter is the only retry
+layer for 429s: the OpenAI clients are built with max_retries=0 while it is enabled
+(see config._openai_max_retries). Queue depth, wait times and throttling counters are
+available from rate_limit_stats().
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .backends import BackendError, OCRFailedError
+from .cancellation import check_cancelled, current_token
+from .config import RateLimitConfig
+from .polling import parse_retry_after
+
+# How long a 429 pauses the limiter when the response has no Retry-After
+logger = logging.getLogger(__name__)
+
+DEFAULT_THROTTLE_PAUSE_SECONDS = 1.0
+
+# 429s arriving within this window of a decrease count as the same overload
+DECREASE_COOLDOWN_SECONDS = 1.0
+
+# Waiters re-check the cancellation token this often while queued
+CANCEL_CHECK_SECONDS = 0.1
+
+
+class RateLimitedError(BackendError):
+    """The service kept answering 429 after all retries."""
+
+
+class TokenBucket:
+    """
+    `rate` units per second, bursts up to `capacity`.
+
+    Callers reserve units up front (the balance may go negative) and sleep until
+    their reservation is covered, so waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Takes `amount` units; returns how many seconds to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= min(amount, self.capacity)  # większe żądanie i tak musi przejść
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+
+class RateLimiter:
+    """Token buckets plus an AIMD concurrency limit for one service."""
+
+    def __init__(
+        self,
+        name: str,
+        buckets: Optional[Dict[str, TokenBucket]] = None,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_retries: int = 3,
+        window: int = 1000,
+    ):
+        self.name = name
+        self.buckets = buckets or {}
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.limit = float(max_concurrency)
+        self._in_flight = 0
+        self._waiting = 0
+        self._last_decrease = 0.0
+        self._paused_until = 0.0  # po 429 nikt nie wywołuje usługi do tego momentu
+        self._cond = threading.Condition()
+        self._async_waiters: deque = deque()  # (pętla, future) korutyn czekających na slot
+        self._waits_ms: deque = deque(maxlen=window)
+        self.calls = 0
+        self.throttled = 0
+        self.rejected = 0
+
+    # --- sloty współbieżności -------------------------------------------------
+
+    def _try_take_slot(self) -> bool:
+        if self._in_flight < max(int(self.limit), self.min_concurrency):
+            self._in_flight += 1
+            return True
+        return False
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._notify_all()
+
+    def _notify_all(self) -> None:
+        # Wywoływane pod self._cond: budzi wątki i korutyny (także z innych pętli)
+        self._cond.notify_all()
+        while self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                pass  # pętla czekającego już zamknięta
+
+    async def _wait_for_slot(self) -> None:
+        token = current_token()
+        while True:
+            with self._cond:
+                if self._try_take_slot():
+                    return
+                loop = asyncio.get_running_loop()
+                waiter = loop.create_future()
+                entry = (loop, waiter)
+                self._async_waiters.append(entry)
+            try:
+                check_cancelled()
+                # Bez odpytywania: budzi nas zwolnienie slotu (albo co chwilę kontrola tokenu)
+                await asyncio.wait({waiter}, timeout=CANCEL_CHECK_SECONDS if token is not None else None)
+            finally:
+                if not waiter.done():
+                    with self._cond:
+                        if entry in self._async_waiters:
+                            self._async_waiters.remove(entry)
+
+    def _reserve(self, amounts: Dict[str, float]) -> float:
+        waits = [self.buckets[k].reserve(v) for k, v in amounts.items() if k in self.buckets]
+        with self._cond:
+            paused = self._paused_until - time.monotonic()
+        return max(waits + [paused, 0.0])
+
+    def _record_wait(self, started: float) -> None:
+        with self._cond:
+            self._waiting -= 1
+            self._waits_ms.append((time.monotonic() - started) * 1000)
+            self.calls += 1
+
+    @contextmanager
+    def acquire(self, **amounts: float):
+        """Blocks until a slot and the bucket amounts (e.g. requests=1, tokens=500) are free."""
+        started = time.monotonic()
+        token = current_token()
+        try:
+            with self._cond:
+                self._waiting += 1
+                while not self._try_take_slot():
+                    check_cancelled()  # przerwany przebieg opuszcza kolejkę
+                    self._cond.wait(CANCEL_CHECK_SECONDS if token is not None else None)
+        except BaseException:
+            self._record_wait(started)
+            raise
+        try:
+            delay = self._reserve(amounts)
+            if token is not None:
+                token.wait(delay)
+                token.raise_if_cancelled()
+            else:
+                time.sleep(delay)
+        except BaseException:
+            self._release_slot()
+            raise
+        finally:
+            self._record_wait(started)
+        try:
+            yield
+        finally:
+            self._release_slot()
+
+    @asynccontextmanager
+    async def acquire_async(self, **amounts: float):
+        """
+        acquire() for coroutines: waits for a released slot and then sleeps until the
+        buckets cover the amounts, without blocking the loop.
+        """
+        started = time.monotonic()
+        with self._cond:
+            self._waiting += 1
+        try:
+            await self._wait_for_slot()
+            try:
+                await asyncio.sleep(self._reserve(amounts))
+                check_cancelled()
+            except BaseException:
+                self._release_slot()
+                raise
+        finally:
+            self._record_wait(started)
+        try:
+            yield
+        finally:
+            self._release_slot()
+
+    # --- AIMD -------------------------------------------------------------------
+
+    def on_success(self) -> None:
+        with self._cond:
+            # Addytywny wzrost: ~ +1 na każde `limit` udanych wywołań
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / max(self.limit, 1.0))
+            self._notify_all()
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        pause = retry_after if retry_after is not None else DEFAULT_THROTTLE_PAUSE_SECONDS
+        with self._cond:
+            self.throttled += 1
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + pause)
+            if now - self._last_decrease >= DECREASE_COOLDOWN_SECONDS:
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+                self._last_decrease = now
+        logger.warning(
+            f"⚠️ {self.name}: 429 od usługi - limit współbieżności {self.limit:.1f}, pauza {pause:.1f} s"
+        )
+
+    def _throttled(self, error: BaseException, attempt: int) -> None:
+        self.on_throttle(throttle_retry_after(error))
+        if attempt >= self.max_retries:
+            with self._cond:
+                self.rejected += 1
+            raise RateLimitedError(f"{self.name}: throttled (429) after {attempt + 1} attempts.") from error
+
+    def call(self, fn: Callable[..., Any], *args: Any, amounts: Optional[dict] = None, **kwargs: Any) -> Any:
+        """Runs fn(*args, **kwargs) within the limits; 429 answers are retried."""
+        for attempt in range(self.max_retries + 1):
+            with self.acquire(**(amounts or {})):
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    if not is_throttled(e):
+                        raise
+                    self._throttled(e, attempt)  # ponowienie czeka w acquire() na koniec pauzy
+                else:
+                    self.on_success()
+                    return result
+
+    async def call_async(
+        self, fn: Callable[..., Awaitable[Any]], *args: Any, amounts: Optional[dict] = None, **kwargs: Any
+    ) -> Any:
+        """call() for coroutine functions."""
+        for attempt in range(self.max_retries + 1):
+            async with self.acquire_async(**(amounts or {})):
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as e:
+                    if not is_throttled(e):
+                        raise
+                    self._throttled(e, attempt)
+                else:
+                    self.on_success()
+                    return result
+
+    @asynccontextmanager
+    async def stream_async(
+        self, fn: Callable[..., Awaitable[Any]], *args: Any, amounts: Optional[dict] = None, **kwargs: Any
+    ):
+        """
+        call_async() for streaming responses: the slot stays taken until the block exits
+        (the stream was consumed or abandoned), not only until fn() returns.
+
+            async with limiter.stream_async(client.chat.completions.create, stream=True, **request) as stream:
+                async for chunk in stream: ...
+        """
+        for attempt in range(self.max_retries + 1):
+            async with self.acquire_async(**(amounts or {})):
+                try:
+                    stream = await fn(*args, **kwargs)
+                except Exception as e:
+                    if not is_throttled(e):
+                        raise
+                    self._throttled(e, attempt)
+                    continue
+                yield stream
+                self.on_success()
+                return
+
+    def stats(self) -> dict:
+        with self._cond:
+            waits = sorted(self._waits_ms)
+            stats = {
+                "name": self.name,
+                "concurrency_limit": round(self.limit, 2),
+                "in_flight": self._in_flight,
+                "queue_depth": self._waiting,
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "rejected": self.rejected,
+            }
+        if waits:
+            stats.update(
+                wait_mean_ms=round(sum(waits) / len(waits), 2),
+                wait_p95_ms=round(waits[min(int(round(0.95 * (len(waits) - 1))), len(waits) - 1)], 2),
+                wait_max_ms=round(waits[-1], 2),
+            )
+        return stats
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+# Answers worth another attempt (timeouts, throttling, server errors)
+TRANSIENT_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+# Connection / timeout errors of the SDKs (they do not derive from ConnectionError)
+_TRANSPORT_ERRORS = (
+    ("openai", "APIConnectionError"),
+    ("httpx", "TransportError"),
+    ("azure.core.exceptions", "ServiceRequestError"),
+    ("azure.core.exceptions", "ServiceResponseError"),
+    ("requests", "ConnectionError"),
+)
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    # openai.APIStatusError ma status_code, httpx.HTTPStatusError / msrest - response.status_code
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_throttled(error: BaseException) -> bool:
+    """True for 429 Too Many Requests answers (OpenAI SDK, httpx and msrest errors)."""
+    return _status_code(error) == 429
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    True for errors a later attempt may not hit: backend and rate-limit errors, timeouts,
+    connection errors and 408 / 429 / 5xx answers. Invalid input, a document the OCR
+    could not read (OCRFailedError) and programming errors are not transient.
+    """
+    if isinstance(error, OCRFailedError):
+        return False
+    if isinstance(error, (BackendError, ConnectionError, TimeoutError)):
+        return True
+    status = _status_code(error)
+    if status is not None:
+        return status in TRANSIENT_STATUS_CODES
+    # Bez importu SDK: jeśli moduł nie jest załadowany, wyjątek nie może z niego pochodzić
+    return any(
+        isinstance(error, error_type)
+        for error_type in (getattr(sys.modules.get(module), name, None) for module, name in _TRANSPORT_ERRORS)
+        if error_type is not None
+    )
+
+
+def throttle_retry_after(error: BaseException) -> Optional[float]:
+    """Retry-After of a 429 error, if the service sent one."""
+    return parse_retry_after(getattr(getattr(error, "response", None), "headers", None))
+
+
+class _Unlimited(RateLimiter):
+    """Stand-in when RateLimitConfig.ENABLED is off: calls go straight through."""
+
+    def call(self, fn, *args, amounts=None, **kwargs):
+        return fn(*args, **kwargs)
+
+    async def call_async(self, fn, *args, amounts=None, **kwargs):
+        return await fn(*args, **kwargs)
+
+    @asynccontextmanager
+    async def stream_async(self, fn, *args, amounts=None, **kwargs):
+        yield await fn(*args, **kwargs)
+
+
+def _bucket(per_second: float, burst_seconds: float) -> Optional[TokenBucket]:
+    return TokenBucket(per_second, per_second * burst_seconds) if per_second > 0 else None
+
+
+def _build(name: str) -> RateLimiter:
+    if not RateLimitConfig.ENABLED:
+        return _Unlimited(name)
+    if name == "vision":
+        buckets = {"transactions": _bucket(RateLimitConfig.VISION_TPS, 1)}
+        max_concurrency = RateLimitConfig.VISION_MAX_CONCURRENCY
+    elif name == "openai":
+        # Azure OpenAI rozlicza limity minutowe w oknach ~10 s (RPM/6, TPM/6)
+        buckets = {
+            "requests": _bucket(RateLimitConfig.OPENAI_RPM / 60, 10),
+            "tokens": _bucket(RateLimitConfig.OPENAI_TPM / 60, 10),
+        }
+        max_concurrency = RateLimitConfig.OPENAI_MAX_CONCURRENCY
+    else:
+        raise ValueError(f"Unknown rate limiter '{name}'.")
+    return RateLimiter(
+        name,
+        {key: bucket for key, bucket in buckets.items() if bucket is not None},
+        max_concurrency=max_concurrency,
+        min_concurrency=RateLimitConfig.MIN_CONCURRENCY,
+        max_retries=RateLimitConfig.MAX_RETRIES,
+        window=RateLimitConfig.WAIT_WINDOW,
+    )
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str) -> RateLimiter:
+    """Process-wide limiter of a service: "vision" (Read API) or "openai"."""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _limiters[name] = _build(name)
+        return limiter
+
+
+def rate_limit_stats() -> Dict[str, dict]:
+    """Stats of every limiter created so far."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
@@ -0,0 +1,314 @@
+"""
+replay.py
+Offline stand-ins for the Azure services (OCR_BACKEND=replay, LLM_BACKEND=replay).
+
+Both backends answer from the recordings stored in data/:
+    <name>_ocr_result.txt  - OCR text of <name>.png / <name>.pdf
+    <name>.txt             - description of the chart, used as the model answer
+                             (and as OCR text when there is no _ocr_result.txt)
+
+Latency and failures are injected according to ReplayConfig, so the pipeline can be
+load-tested and benchmarked without live services or their quotas.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from .backends import BackendError, CompletionBackend, OCRBackend, PageChunk
+from .cache import file_digest
+from .chart_extract import extract
+from .text_compaction import collapse_whitespace, compact_text
+from .config import ReplayConfig
+from .tracing import annotate
+
+DOCUMENT_EXTENSIONS = (".png", ".pdf", ".jpg", ".jpeg")
+OCR_SUFFIX = "_ocr_result.txt"
+
+# Prompts are matched on this many leading characters of a recording
+# (answers replayed into the next stage may have been truncated)
+MATCH_CHARS = 200
+
+# Answer for prompts that do not contain any recording
+NO_RECORDING_ANSWER = "Replay backend: no recorded answer for this input."
+
+
+class FaultInjector:
+    """Samples the simulated latency and decides which calls fail."""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter: float = 0.2,
+        error_rate: float = 0.0,
+        seed: Optional[str] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()  # random.Random nie jest współdzielony bezpiecznie między wątkami
+
+    def delay(self) -> float:
+        """Latency of one call in seconds."""
+        if self.latency_ms <= 0:
+            return 0.0
+        with self._lock:
+            factor = 1 + self._random.uniform(-self.jitter, self.jitter) if self.jitter else 1
+        return max(self.latency_ms * factor, 0.0) / 1000
+
+    def check(self, what: str) -> None:
+        """Raises BackendError for the configured fraction of calls."""
+        if self.error_rate <= 0:
+            return
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+        if failed:
+            raise BackendError(f"Injected {what} failure (replay error rate {self.error_rate:g}).")
+
+
+class Recordings:
+    """Index of the recordings in a data directory (built once, on first use)."""
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._by_digest: Dict[str, str] = {}  # hash dokumentu -> nazwa nagrania
+        self._ocr: Dict[str, str] = {}
+        self._answers: Dict[str, str] = {}
+        self._sources: Dict[str, List[str]] = {}  # formy nagrania, w jakich trafia do promptów
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            if not os.path.isdir(self.data_dir):
+                raise BackendError(f"Replay data directory '{self.data_dir}' does not exist.")
+
+            names = sorted(os.listdir(self.data_dir))
+            for name in names:
+                path = os.path.join(self.data_dir, name)
+                stem, ext = os.path.splitext(name)
+                if name.endswith(OCR_SUFFIX):
+                    self._ocr[name[: -len(OCR_SUFFIX)]] = _read_text(path)
+                elif ext.lower() == ".txt":
+                    self._answers[stem] = _read_text(path)
+                elif ext.lower() in DOCUMENT_EXTENSIONS:
+                    self._by_digest[file_digest(path)] = stem
+
+            # Bez zapisanego wyniku OCR używamy opisu wykresu jako tekstu
+            for stem, answer in self._answers.items():
+                self._ocr.setdefault(stem, answer)
+            for stem, answer in self._answers.items():
+                self._sources[stem] = _prompt_forms(self._ocr[stem]) + _prompt_forms(answer)
+            self._loaded = True
+
+    def ocr_text(self, path: str) -> str:
+        """Recorded OCR text of a document, matched by content (then by file name)."""
+        self._load()
+        stem = self._by_digest.get(file_digest(path))
+        if stem is None:
+            wanted = os.path.splitext(os.path.basename(path))[0].lower()
+            stem = next((s for s in self._ocr if s.lower() == wanted), None)
+        if stem is None or stem not in self._ocr:
+            raise BackendError(f"No OCR recording for '{os.path.basename(path)}'.")
+        return self._ocr[stem]
+
+    def answer_for(self, prompt: str) -> Optional[str]:
+        """
+        Recorded answer for a prompt: the recording whose OCR text or description
+        appears in the prompt (the longest match wins). Recordings are also matched
+        compacted (text_compaction.py) and as the chart_extract table, the way the
+        stages send them; whitespace is ignored.
+        """
+        self._load()
+        prompt = collapse_whitespace(prompt)
+        best: Tuple[int, Optional[str]] = (0, None)
+        for stem, answer in self._answers.items():
+            for source in self._sources[stem]:
+                if source and len(source) > best[0] and source in prompt:
+                    best = (len(source), answer)
+        return best[1]
+
+
+class ReplayOCRBackend(OCRBackend):
+    """Returns the recorded OCR text of a document after the simulated latency."""
+
+    name = "replay"
+
+    def __init__(self, recordings: Recordings, faults: FaultInjector):
+        self.recordings = recordings
+        self.faults = faults
+
+    @classmethod
+    def from_config(cls) -> "ReplayOCRBackend":
+        return cls(
+            shared_recordings(),
+            FaultInjector(
+                ReplayConfig.OCR_LATENCY_MS,
+                ReplayConfig.LATENCY_JITTER,
+                ReplayConfig.OCR_ERROR_RATE,
+                ReplayConfig.SEED,
+            ),
+        )
+
+    def read_lines(self, path: str) -> List[str]:
+        time.sleep(self.faults.delay())
+        self.faults.check("OCR")
+        return self.recordings.ocr_text(path).splitlines()
+
+    async def read_lines_async(self, path: str) -> List[str]:
+        await asyncio.sleep(self.faults.delay())
+        self.faults.check("OCR")
+        # Hashowanie pliku w wątku, żeby nie blokować pętli zdarzeń
+        text = await asyncio.to_thread(self.recordings.ocr_text, path)
+        return text.splitlines()
+
+    def read_chunk_lines(self, chunk: PageChunk) -> List[str]:
+        time.sleep(self.faults.delay())
+        self.faults.check("OCR")
+        return _chunk_slice(self.recordings.ocr_text(chunk.source).splitlines(), chunk)
+
+    async def read_chunk_lines_async(self, chunk: PageChunk) -> List[str]:
+        await asyncio.sleep(self.faults.delay())
+        self.faults.check("OCR")
+        text = await asyncio.to_thread(self.recordings.ocr_text, chunk.source)
+        return _chunk_slice(text.splitlines(), chunk)
+
+
+class ReplayCompletionBackend(CompletionBackend):
+    """
+    Answers chat requests with the recorded chart description.
+
+    The description is shaped per stage (one sentence for short_summary, a JSON
+    object for combined) and truncated to roughly max_tokens.
+    """
+
+    name = "replay"
+
+    def __init__(self, recordings: Recordings, faults: FaultInjector, tokens_per_second: float = 0.0):
+        self.recordings = recordings
+        self.faults = faults
+        self.tokens_per_second = tokens_per_second
+
+    @classmethod
+    def from_config(cls) -> "ReplayCompletionBackend":
+        return cls(
+            shared_recordings(),
+            FaultInjector(
+                ReplayConfig.LLM_LATENCY_MS,
+                ReplayConfig.LATENCY_JITTER,
+                ReplayConfig.LLM_ERROR_RATE,
+                ReplayConfig.SEED,
+            ),
+            ReplayConfig.LLM_TOKENS_PER_SECOND,
+        )
+
+    def _answer(self, stage: str, request: dict) -> str:
+        prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+        recorded = self.recordings.answer_for(prompt) or NO_RECORDING_ANSWER
+        limit = int(request.get("max_tokens") or 0) * 4  # ~4 znaki na token
+        content = self._shape(stage, recorded, limit)
+        # Szacunkowe liczby tokenów (~4 znaki na token), jak usage z Azure OpenAI
+        annotate(
+            prompt_tokens=len(prompt) // 4,
+            completion_tokens=len(content) // 4,
+            tokens_estimated=True,
+        )
+        return content
+
+    @staticmethod
+    def _shape(stage: str, recorded: str, limit: int) -> str:
+        if stage == "short_summary":
+            return _truncate(_first_sentence(recorded), limit)
+        if stage == "combined":
+            return json.dumps(
+                {
+                    "key_insights": recorded.strip(),
+                    "short_description": _first_sentence(recorded),
+                    "conclusion": recorded.strip(),
+                },
+                ensure_ascii=False,
+            )
+        return _truncate(recorded.strip(), limit)
+
+    def _generation_seconds(self, content: str) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return len(content.split()) / self.tokens_per_second
+
+    def complete(self, stage: str, request: dict) -> Optional[str]:
+        time.sleep(self.faults.delay())
+        self.faults.check("LLM")
+        content = self._answer(stage, request)
+        time.sleep(self._generation_seconds(content))
+        return content
+
+    async def complete_async(self, stage: str, request: dict) -> Optional[str]:
+        await asyncio.sleep(self.faults.delay())
+        self.faults.check("LLM")
+        content = self._answer(stage, request)
+        await asyncio.sleep(self._generation_seconds(content))
+        return content
+
+    async def stream_async(self, stage: str, request: dict) -> AsyncIterator[str]:
+        await asyncio.sleep(self.faults.delay())  # czas do pierwszego tokenu
+        self.faults.check("LLM")
+        content = self._answer(stage, request)
+        if self.tokens_per_second <= 0:
+            yield content
+            return
+        for word in re.findall(r"\S+\s*", content):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            yield word
+
+
+_recordings: Dict[str, Recordings] = {}
+_recordings_lock = threading.Lock()
+
+
+def shared_recordings(data_dir: Optional[str] = None) -> Recordings:
+    """Process-wide recordings index of `data_dir` (default: ReplayConfig.DATA_DIR)."""
+    # OCR i LLM korzystają z jednego indeksu (jedno hashowanie plików z data/)
+    data_dir = data_dir or ReplayConfig.DATA_DIR
+    with _recordings_lock:
+        recordings = _recordings.get(data_dir)
+        if recordings is None:
+            recordings = _recordings[data_dir] = Recordings(data_dir)
+        return recordings
+
+
+def _chunk_slice(lines: List[str], chunk: PageChunk) -> List[str]:
+    # Nagranie obejmuje cały dokument - kawałek dostaje proporcjonalną część linii
+    start = len(lines) * (chunk.first_page - 1) // chunk.total_pages
+    end = len(lines) * chunk.last_page // chunk.total_pages
+    return lines[start:end]
+
+
+def _prompt_forms(text: str) -> List[str]:
+    compacted = compact_text(text)[0]
+    forms = (text, compacted, extract(compacted).render())
+    return [collapse_whitespace(form).strip()[:MATCH_CHARS] for form in forms]
+
+
+def _read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def _first_sentence(text: str) -> str:
+    text = " ".join(text.split())
+    match = re.search(r"(.+?[.!?])(\s|$)", text)
+    return match.group(1) if match else text
+
+
+def _truncate(text: str, limit: int) -> str:
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0]
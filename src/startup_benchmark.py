@@ -0,0 +1,184 @@
+"""
+startup_benchmark.py
+Cold start benchmark: how long importing the pipeline takes (CLI runs, batch workers
+and test collection all pay it).
+
+Every run starts a fresh interpreter with `python -X importtime -c "import src.pipeline"`
+and reads the cumulative import time of the module from its report, plus the time
+spent per top-level package (e.g. azure, openai, pypdf) - a heavy SDK that sneaks
+back into the import path shows up there. One warm-up run fills the bytecode cache.
+
+Results are written as JSON and can be appended to a history file to track startup
+over time; pass a previous result file with --baseline to flag regressions (exit code 1).
+
+Usage:
+    python -m src.startup_benchmark --runs 7 --history startup_history.jsonl
+    python -m src.startup_benchmark --baseline startup_results.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from statistics import median
+from typing import Dict, List, Optional
+
+from .benchmark import _git_commit, percentile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "import time:       412 |       1234 |     src.config"
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+# Packages listed in the report (by import time, slowest first)
+TOP_PACKAGES = 10
+
+
+def parse_importtime(stderr: str, module: str) -> Optional[dict]:
+    """
+    Import time of `module` from a `-X importtime` report (microseconds -> ms).
+
+    Returns:
+        dict | None: {"import_ms": cumulative time of the module, "packages": {top-level
+            package: self time of its modules imported by `module`}}; None when the
+            module does not appear in the report.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            rows.append((int(match.group(1)), int(match.group(2)), len(match.group(3)), match.group(4)))
+
+    for index, (_, cumulative, level, name) in enumerate(rows):
+        if name != module:
+            continue
+        # Moduły importowane przez `module` są wypisane przed nim, z większym wcięciem
+        start = index
+        while start > 0 and rows[start - 1][2] > level:
+            start -= 1
+        packages: Dict[str, float] = defaultdict(float)
+        for self_us, _, _, child in rows[start : index + 1]:
+            packages[child.split(".")[0]] += self_us / 1000
+        return {"import_ms": cumulative / 1000, "packages": dict(packages)}
+    return None
+
+
+def _run(code: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(command, cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+
+
+def measure(module: str, runs: int) -> dict:
+    """Import and wall-clock times of `module` over `runs` fresh interpreters."""
+    _run(f"import {module}")  # rozgrzewka: pliki .pyc w __pycache__
+
+    import_ms, wall_ms, interpreter_ms = [], [], []
+    packages: Dict[str, List[float]] = defaultdict(list)
+    for _ in range(runs):
+        started = time.perf_counter()
+        _run("pass")
+        interpreter_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        _run(f"import {module}")
+        wall_ms.append((time.perf_counter() - started) * 1000)
+
+        parsed = parse_importtime(_run(f"import {module}", importtime=True).stderr, module)
+        if parsed is None:
+            raise RuntimeError(f"'{module}' not found in the -X importtime report.")
+        import_ms.append(parsed["import_ms"])
+        for package, ms in parsed["packages"].items():
+            packages[package].append(ms)
+
+    slowest = sorted(packages.items(), key=lambda item: median(item[1]), reverse=True)[:TOP_PACKAGES]
+    return {
+        "runs": runs,
+        "import_ms_median": round(median(import_ms), 2),
+        "import_ms_p95": round(percentile(import_ms, 95), 2),
+        "import_ms_min": round(min(import_ms), 2),
+        # Cały proces (start interpretera + import), i sam start interpretera dla porównania
+        "wall_ms_median": round(median(wall_ms), 2),
+        "interpreter_ms_median": round(median(interpreter_ms), 2),
+        "packages_ms": {package: round(median(values), 2) for package, values in slowest},
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[dict]:
+    """Modules whose median import time grew by more than `threshold` (0.2 = 20%)."""
+    regressions = []
+    for module, result in current["results"].items():
+        before = baseline.get("results", {}).get(module, {}).get("import_ms_median")
+        if not before:
+            continue
+        change = (result["import_ms_median"] - before) / before
+        if change > threshold:
+            regressions.append(
+                {"module": module, "baseline": before, "current": result["import_ms_median"], "change": round(change, 3)}
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure the import (cold start) time of the pipeline.")
+    parser.add_argument("--modules", default="src.pipeline", help="Comma separated modules to import")
+    parser.add_argument("--runs", type=int, default=7, help="Fresh interpreters per module")
+    parser.add_argument("-o", "--output", default="startup_results.json", help="JSON result file")
+    parser.add_argument("--history", help="JSON Lines file the result is appended to (startup over time)")
+    parser.add_argument("--baseline", help="Previous result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    modules = [m.strip() for m in args.modules.split(",") if m.strip()]
+    results = {}
+    for module in modules:
+        print(f"[Startup] import {module} ({args.runs} runs)...")
+        results[module] = measure(module, max(1, args.runs))
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+    for module, result in results.items():
+        print(
+            f"\n{module}: import {result['import_ms_median']:.1f} ms (p95 {result['import_ms_p95']:.1f}), "
+            f"process {result['wall_ms_median']:.1f} ms (bare interpreter {result['interpreter_ms_median']:.1f})"
+        )
+        for package, ms in result["packages_ms"].items():
+            print(f"   {package:<28}{ms:>9.1f} ms")
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        report["regressions"] = regressions
+        print(f"\n=== Comparison with {args.baseline} (threshold {args.threshold:.0%}) ===")
+        for r in regressions:
+            print(f"⚠️ REGRESSION {r['module']}: import {r['baseline']} -> {r['current']} ms ({r['change']:+.0%})")
+        if not regressions:
+            print("✓ No regressions.")
+        exit_code = 1 if regressions else 0
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.history:
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+    print(f"\n💾 Results saved to {args.output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,16 @@
 # Autor: Basia
 # Moduł odpowiedzialny za tworzenie krótkiego streszczenia na podstawie danych od Oli.
 
-from openai import AzureOpenAI
 from .config import AzureConfig
+from .backends import azure_openai_required, get_completion_backend
+from .llm import chat_completion, chat_completion_async, fit_input, stream_chat_completion_async
+
+# Every error (❌) or invalid-input / empty-answer (⚠️) answer of this module starts with one of these
+ERROR_PREFIXES = ("❌", "⚠️")
+
+# Errors of a failed model call (worth another attempt); the others are invalid input,
+# missing configuration or an empty answer
+CALL_ERROR_PREFIXES = ("❌ Connection error", "❌ Error while generating")
 
 # from modul_interpretacji import zrob_interpretacje
 # nie jestem pewna czy trzeba importować w moim pliku plik od Oli.
@@ -32,73 +40,164 @@ DATA FOR SUMMARY:
     """
     return prompt
 
-def create_summary(interpreted_data: str) -> str:
+
+def _build_short_prompt(interpreted_data: str) -> str:
     """
-    Główna funkcja modułu streszczenia.
-    Waliduje dane od Oli, łączy się z Azure OpenAI i zwraca zwięzłe podsumowanie.
+    Najprostszy możliwy prompt dla krótkiego (1 zdanie) podsumowania.
+    """
+    prompt = f"""
+
+Create a one-sentence short summary describing the main purpouse of the chart.
+Be concise and rely only on the interpretation below.
+
+INTERPRETATION:
+{interpreted_data}
+
+"""
+    return prompt
+
+
+def _messages(prompt: str) -> list:
+    return [
+        {"role": "system", "content": "You are a helpful business assistant."},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def _prepare_summary(interpreted_data: str):
+    """
+    Walidacja + przygotowanie zapytania dla długiego podsumowania.
+    Zwraca (komunikat_błędu, None) albo (None, parametry_zapytania).
     """
     # -------------------------
     # 1. Walidacja danych wejściowych
     # -------------------------
     if not interpreted_data or not isinstance(interpreted_data, str):
-        return "⚠️ Error: The data for summarization is invalid."
+        return "⚠️ Error: The data for summarization is invalid.", None
 
     if len(interpreted_data.strip()) < 10:
-        return "⚠️ Error: The received interpretation is too short."
+        return "⚠️ Error: The received interpretation is too short.", None
+
     # -------------------------
-    # 2. Połączenie z Azure OpenAI
+    # 2. Konfiguracja Azure OpenAI
     # -------------------------
-
     endpoint = AzureConfig.AZURE_OPENAI_ENDPOINT
     api_key = AzureConfig.AZURE_OPENAI_API_KEY
     deployment = AzureConfig.AZURE_OPENAI_DEPLOYMENT_NAME
 
-    if not endpoint or not api_key or not deployment:
-        return "❌ Configuration Error: Missing OpenAI credentials in .env file."
-
-    try:
-        client = AzureOpenAI(
-            azure_endpoint=endpoint,
-            api_key=api_key,
-            api_version=AzureConfig.OPENAI_API_VERSION,
-        )
-
-    except Exception as e:
-
-        return f"❌ Connection error with Azure OpenAI: {e}"
+    if azure_openai_required() and (not endpoint or not api_key or not deployment):
+        return "❌ Configuration Error: Missing OpenAI credentials in .env file.", None
 
     # -------------------------
     # 3. Budowanie promptu
     # -------------------------
+    return None, {
+        "model": deployment,
+        "messages": _messages(_build_prompt(fit_input("summary", interpreted_data))),
+        "max_tokens": 250,
+        "temperature": 0.3,
+    }
+
+
+def _prepare_short_summary(interpreted_data: str):
+    """
+    Walidacja + przygotowanie zapytania dla krótkiego podsumowania.
+    """
+    if not interpreted_data or not isinstance(interpreted_data, str):
+        return "⚠️ Error: The data for short summary is invalid.", None
+
+    endpoint = AzureConfig.OPENAI_ENDPOINT
+    api_key = AzureConfig.OPENAI_API_KEY
+    deployment = AzureConfig.OPENAI_DEPLOYMENT_NAME
+
+    if azure_openai_required() and (not endpoint or not api_key or not deployment):
+        return "❌ Configuration Error: Missing OpenAI credentials.", None
+
+    return None, {
+        "model": deployment,
+        "messages": _messages(_build_short_prompt(fit_input("short_summary", interpreted_data))),
+        "max_tokens": 40,
+        "temperature": 0.2,
+    }
 
-    prompt = _build_prompt(interpreted_data)
+
+def create_summary(interpreted_data: str) -> str:
+    """
+    Główna funkcja modułu streszczenia.
+    Waliduje dane od Oli, łączy się z Azure OpenAI i zwraca zwięzłe podsumowanie.
+    """
+    error, request = _prepare_summary(interpreted_data)
+    if error:
+        return error
+
+    try:
+        backend = get_completion_backend()  # Azure OpenAI (wspólny klient z pulą połączeń) albo replay
+    except Exception as e:
+        return f"❌ Connection error with Azure OpenAI: {e}"
 
     # -------------------------
     # 4. Wywołanie modelu
     # -------------------------
+    try:
+        message_content = chat_completion(backend, "summary", **request)
+    except Exception as e:
+        return f"❌ Error while generating summary: {e}"
+
+    if not message_content:
+        return "⚠️ Warning: Model returned empty summary."
+    return message_content
+
+
+async def create_summary_async(interpreted_data: str) -> str:
+    """
+    Wersja asynchroniczna create_summary (ten sam prompt, backend i cache).
+    """
+    error, request = _prepare_summary(interpreted_data)
+    if error:
+        return error
 
     try:
+        backend = get_completion_backend()
+    except Exception as e:
+        return f"❌ Connection error with Azure OpenAI: {e}"
 
-        response = client.chat.completions.create(
-            model=deployment,
-            messages=[
-                {"role": "system", "content": "You are a helpful business assistant."},
-                {"role": "user", "content": prompt},
-            ],
-            max_tokens=250,
-            temperature=0.3,
-        )
+    try:
+        message_content = await chat_completion_async(backend, "summary", **request)
+    except Exception as e:
+        return f"❌ Error while generating summary: {e}"
 
-        message_content = response.choices[0].message.content
+    if not message_content:
+        return "⚠️ Warning: Model returned empty summary."
+    return message_content
 
-        if not message_content:
-            return "⚠️ Warning: Model returned empty summary."
 
-        return message_content
+async def create_summary_stream_async(interpreted_data: str):
+    """
+    Wersja strumieniowa: zwraca (yield) podsumowanie kawałek po kawałku, w miarę jak
+    model generuje tokeny. Ostatnia wartość to pełne podsumowanie.
+    """
+    error, request = _prepare_summary(interpreted_data)
+    if error:
+        yield error
+        return
 
+    try:
+        backend = get_completion_backend()
     except Exception as e:
+        yield f"❌ Connection error with Azure OpenAI: {e}"
+        return
+
+    message_content = ""
+    try:
+        async for message_content in stream_chat_completion_async(backend, "summary", **request):
+            yield message_content
+    except Exception as e:
+        yield f"❌ Error while generating summary: {e}"
+        return
+
+    if not message_content:
+        yield "⚠️ Warning: Model returned empty summary."
 
-        return f"❌ Error while generating summary: {e}"
 
 # ---------------------------------------------------------
 # NAJPROSTSZA FUNKCJA – SHORT SUMMARY (1 zdanie)
@@ -108,59 +207,64 @@ def create_short_summary(interpreted_data: str) -> str:
     """
     Tworzy bardzo krótkie, jednozdaniowe podsumowanie.
     """
+    error, request = _prepare_short_summary(interpreted_data)
+    if error:
+        return error
 
-    if not interpreted_data or not isinstance(interpreted_data, str):
+    try:
+        backend = get_completion_backend()  # Azure OpenAI (wspólny klient z pulą połączeń) albo replay
+    except Exception as e:
+        return f"❌ Connection error with Azure OpenAI: {e}"
 
-        return "⚠️ Error: The data for short summary is invalid."
+    try:
+        message_content = chat_completion(backend, "short_summary", **request)
+        return message_content if message_content else "No summary generated."
+    except Exception as e:
+        return f"❌ Error while generating short summary: {e}"
 
-    # Połączenie z Azure OpenAI
 
-    endpoint = AzureConfig.OPENAI_ENDPOINT
-    api_key = AzureConfig.OPENAI_API_KEY
-    deployment = AzureConfig.OPENAI_DEPLOYMENT_NAME
-
-    if not endpoint or not api_key or not deployment:
-        return "❌ Configuration Error: Missing OpenAI credentials."
+async def create_short_summary_async(interpreted_data: str) -> str:
+    """
+    Wersja asynchroniczna create_short_summary.
+    """
+    error, request = _prepare_short_summary(interpreted_data)
+    if error:
+        return error
 
     try:
-        client = AzureOpenAI(
-            azure_endpoint=endpoint,
-            api_key=api_key,
-            api_version=AzureConfig.OPENAI_API_VERSION,
-        )
-
+        backend = get_completion_backend()
     except Exception as e:
-
         return f"❌ Connection error with Azure OpenAI: {e}"
 
-    # Najprostszy możliwy prompt
-
-    prompt = f"""
-
-Create a one-sentence short summary describing the main purpouse of the chart.
-Be concise and rely only on the interpretation below.
+    try:
+        message_content = await chat_completion_async(backend, "short_summary", **request)
+        return message_content if message_content else "No summary generated."
+    except Exception as e:
+        return f"❌ Error while generating short summary: {e}"
 
-INTERPRETATION:
-{interpreted_data}
 
-"""
-    # Wywołanie modelu
+async def create_short_summary_stream_async(interpreted_data: str):
+    """
+    Wersja strumieniowa create_short_summary.
+    """
+    error, request = _prepare_short_summary(interpreted_data)
+    if error:
+        yield error
+        return
 
     try:
+        backend = get_completion_backend()
+    except Exception as e:
+        yield f"❌ Connection error with Azure OpenAI: {e}"
+        return
 
-        response = client.chat.completions.create(
-            model=deployment,
-            messages=[
-                {"role": "system", "content": "You are a helpful business assistant."},
-                {"role": "user", "content": prompt},
-            ],
-            max_tokens=40,
-            temperature=0.2,
-        )
-
-        message_content = response.choices[0].message.content
-        return message_content if message_content else "No summary generated."
-
+    message_content = ""
+    try:
+        async for message_content in stream_chat_completion_async(backend, "short_summary", **request):
+            yield message_content
     except Exception as e:
+        yield f"❌ Error while generating short summary: {e}"
+        return
 
-        return f"❌ Error while generating short summary: {e}"
+    if not message_content:
+        yield "No summary generated."
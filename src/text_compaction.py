@@ -0,0 +1,121 @@
+"""
+text_compaction.py
+Compaction of OCR text before it is sent to a model, and token budgeting.
+
+    text, stats = compact_text(ocr_text, max_tokens=3000)
+
+Compaction collapses whitespace, drops noise lines and repeated text lines (legend
+entries are typically recognised twice: once in the legend, once at the chart).
+Lines with numbers are never deduplicated - equal values are real data. If the
+result is still over the budget, lines are kept numeric-first, in reading order.
+
+Text that is not OCR output (e.g. the markdown interpretation the summaries are
+built from) is passed with clean=False: only the token budget is enforced, so its
+headings, separators and repeated bullets are kept.
+
+The noise heuristics are the ones OCRProcessor.validate_text reports on. Like
+polling.py, this module has no project imports, so ocr_processor.py (run as a
+script) can use it too; stage budgets live in TokenBudgetConfig (see src/llm.py).
+"""
+
+import math
+import re
+from typing import List, Optional, Tuple
+
+# Above this share of punctuation characters text is likely OCR noise
+NOISE_PUNCTUATION_RATIO = 0.3
+
+# Rough size of a token in characters (no tokenizer needed for budgeting)
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_MARKER = "[... {omitted} lines omitted to fit the token budget]"
+
+_DIGIT = re.compile(r"\d")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of tokens in `text` (~4 characters per token)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def collapse_whitespace(text: str) -> str:
+    """Replaces every run of whitespace (including newlines) with one space."""
+    return re.sub(r"\s+", " ", text)
+
+
+def punctuation_ratio(text: str) -> float:
+    """Share of characters that are neither word characters nor whitespace."""
+    return len(re.findall(r"[^\w\s]", text)) / max(len(text), 1)
+
+
+def is_noise(line: str) -> bool:
+    """
+    True for lines without any letter or digit ("=", "---") and for text lines
+    that are mostly punctuation. Lines with digits are kept ("11.8%").
+    """
+    if not any(char.isalnum() for char in line):
+        return True
+    return not _DIGIT.search(line) and punctuation_ratio(line) > NOISE_PUNCTUATION_RATIO
+
+
+def _fit(lines: List[str], max_tokens: int) -> Tuple[List[str], int]:
+    """Lines to keep within `max_tokens` (numeric lines first, original order kept)."""
+    ranked = sorted(range(len(lines)), key=lambda i: (not _DIGIT.search(lines[i]), i))
+    budget = max_tokens - estimate_tokens(TRUNCATION_MARKER)
+    keep, used = set(), 0
+    for index in ranked:
+        cost = estimate_tokens(lines[index]) + 1  # +1 za znak nowej linii
+        if used + cost > budget:
+            continue  # krótsza linia dalej może się jeszcze zmieścić
+        keep.add(index)
+        used += cost
+    return [line for i, line in enumerate(lines) if i in keep], len(lines) - len(keep)
+
+
+def compact_text(text: str, max_tokens: Optional[int] = None, clean: bool = True) -> Tuple[str, dict]:
+    """
+    Compacts `text` and fits it into `max_tokens` (no limit when None or <= 0).
+    With clean=False lines are not filtered or rewritten - only the budget applies.
+
+    Returns:
+        tuple: (compacted text, stats) - stats hold tokens_before / tokens_after and
+            the number of duplicate, noise and omitted lines.
+    """
+    stats = {
+        "tokens_before": estimate_tokens(text),
+        "duplicates": 0,
+        "noise": 0,
+        "omitted": 0,
+    }
+
+    if not clean:
+        lines = text.splitlines()
+        if max_tokens and max_tokens > 0 and stats["tokens_before"] > max_tokens:
+            kept, stats["omitted"] = _fit(lines, max_tokens)
+            text = "\n".join(kept + [TRUNCATION_MARKER.format(omitted=stats["omitted"])])
+        stats["tokens_after"] = estimate_tokens(text)
+        return text, stats
+
+    lines, seen = [], set()
+    for raw_line in text.splitlines():
+        line = collapse_whitespace(raw_line).strip()
+        if not line:
+            continue
+        if is_noise(line):
+            stats["noise"] += 1
+            continue
+        if not _DIGIT.search(line):
+            key = line.casefold()
+            if key in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(key)
+        lines.append(line)
+
+    compacted = "\n".join(lines)
+    if max_tokens and max_tokens > 0 and estimate_tokens(compacted) > max_tokens:
+        kept, stats["omitted"] = _fit(lines, max_tokens)
+        compacted = "\n".join(kept + [TRUNCATION_MARKER.format(omitted=stats["omitted"])])
+
+    stats["tokens_after"] = estimate_tokens(compacted)
+    return compacted, stats
@@ -0,0 +1,344 @@
+"""
+tracing.py
+Lightweight tracing of the analysis pipeline (nested spans with timings and attributes).
+
+    with span("ocr", file_size_bytes=1234) as s:
+        ...
+        s.set(poll_count=3)
+
+Finished spans are
+    - aggregated in memory into rolling latency histograms per span name (latency_stats),
+    - optionally appended to a JSONL file (TRACING_JSONL, one handle kept open),
+    - optionally summarized on the console when a root span ends (TRACING_CONSOLE, off by default).
+
+Progress lines of the src.* modules go through `logging` to stdout: INFO and up with
+TRACING_CONSOLE=true, only warnings and errors otherwise.
+
+The current span lives in a ContextVar, so spans nest across awaits and asyncio.gather.
+A `with span(...)` block must not contain a `yield` of an async generator (the next
+step may run in another context); async generators use start_span() / Span.end()
+and iterate nested generators with bind().
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from .config import TracingConfig
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Traces whose root span has not finished yet, kept for the console summary
+MAX_OPEN_TRACES = 1000
+
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation; `attributes` holds anything worth recording about it."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "started_at",
+        "_start",
+        "duration_ms",
+        "status",
+        "error",
+        "_tracer",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes: dict):
+        self._tracer = tracer
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes)
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> "Span":
+        """Adds or overwrites attributes."""
+        self.attributes.update(attributes)
+        return self
+
+    def elapsed_ms(self) -> float:
+        """Time since the span started (ms)."""
+        return round((time.perf_counter() - self._start) * 1000, 3)
+
+    def fail(self, error: Any) -> "Span":
+        """Marks the span as failed without an exception leaving it (e.g. handled errors)."""
+        self.status = "error"
+        self.error = str(error)
+        return self
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """Finishes the span (only the first call counts)."""
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        if error is not None and not isinstance(error, Exception):
+            # GeneratorExit, asyncio.CancelledError, cancellation.JobCancelled
+            self.status = "cancelled"
+        elif error is not None:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"
+        self._tracer._finish(self)
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms or 0.0, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class RollingHistogram:
+    """Latencies of the last `window` spans of one name."""
+
+    def __init__(self, window: int = 1000):
+        self._samples: deque = deque(maxlen=window)
+        self.count = 0  # wszystkie próbki od startu, nie tylko okno
+        self.errors = 0
+
+    def add(self, duration_ms: float, failed: bool = False) -> None:
+        self._samples.append(duration_ms)
+        self.count += 1
+        self.errors += failed
+
+    def snapshot(self) -> dict:
+        samples = sorted(self._samples)
+        if not samples:
+            return {"count": self.count, "errors": self.errors, "window": 0}
+
+        def pct(p: float) -> float:
+            return round(samples[min(int(round(p / 100 * (len(samples) - 1))), len(samples) - 1)], 2)
+
+        buckets: Dict[str, int] = {}
+        index = 0
+        for bound in BUCKETS_MS:
+            n = 0
+            while index < len(samples) and samples[index] <= bound:
+                n += 1
+                index += 1
+            buckets[f"<={bound}"] = n
+        buckets[f">{BUCKETS_MS[-1]}"] = len(samples) - index
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "window": len(samples),
+            "mean_ms": round(sum(samples) / len(samples), 2),
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "max_ms": round(samples[-1], 2),
+            "buckets_ms": buckets,
+        }
+
+
+class Tracer:
+    """Creates spans and collects the finished ones."""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        jsonl_path: Optional[str] = None,
+        window: int = 1000,
+        console: bool = False,
+    ):
+        self.enabled = enabled
+        self.jsonl_path = jsonl_path
+        self.window = window
+        self.console = console
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()  # osobna blokada - zapis na dysk nie wstrzymuje spanów
+        self._file = None
+        self._histograms: Dict[str, RollingHistogram] = {}
+        self._open_traces: Dict[str, List[Span]] = {}  # zakończone dzieci, czekające na korzeń
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        """Starts a span without making it current (parent defaults to the current span)."""
+        return Span(self, name, parent if parent is not None else _current.get(), attributes)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Times the block as a child of the current span."""
+        parent = _current.get()
+        current = self.start_span(name, parent, **attributes)
+        token = _current.set(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.end(e)
+            raise
+        finally:
+            _reset(token, parent)
+            current.end()
+
+    def latency_stats(self) -> Dict[str, dict]:
+        """Rolling latency histogram of every span name seen so far."""
+        with self._lock:
+            return {name: h.snapshot() for name, h in sorted(self._histograms.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._open_traces.clear()
+
+    def close(self) -> None:
+        """Closes the JSONL file (it is reopened by the next finished span)."""
+        with self._file_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _finish(self, span: Span) -> None:
+        if not self.enabled:
+            return
+        root = span.parent_id is None
+        with self._lock:
+            histogram = self._histograms.get(span.name)
+            if histogram is None:
+                histogram = self._histograms[span.name] = RollingHistogram(self.window)
+            histogram.add(span.duration_ms, span.status == "error")
+
+            if root:
+                children = self._open_traces.pop(span.trace_id, [])
+            else:
+                self._open_traces.setdefault(span.trace_id, []).append(span)
+                children = None
+                # Dziecko zakończone po korzeniu (np. anulowany strumień) nie może zostać na zawsze
+                while len(self._open_traces) > MAX_OPEN_TRACES:
+                    self._open_traces.pop(next(iter(self._open_traces)))
+
+        if self.jsonl_path:
+            self._write(json.dumps(span.as_dict(), ensure_ascii=False, default=str) + "\n")
+        if root and self.console:
+            _log_trace(span, children or [])
+
+    def _write(self, line: str) -> None:
+        with self._file_lock:
+            try:
+                if self._file is None:
+                    # Buforowanie liniowe: każdy span trafia na dysk od razu, bez otwierania pliku za każdym razem
+                    self._file = open(self.jsonl_path, "a", encoding="utf-8", buffering=1)
+                self._file.write(line)
+            except OSError as e:
+                logger.warning(f"⚠️ Tracing: nie udało się zapisać spanu: {e}")
+
+
+def _reset(token, parent: Optional[Span]) -> None:
+    try:
+        _current.reset(token)
+    except ValueError:
+        # Token z innego kontekstu (np. zamknięty generator) - przywracamy rodzica ręcznie
+        _current.set(parent)
+
+
+def _log_trace(root: Span, spans: List[Span]) -> None:
+    children = [s for s in spans if s.parent_id == root.span_id]
+    parts = ", ".join(f"{child.name} {child.duration_ms:.0f} ms" for child in children)
+    status = "" if root.status == "ok" else f" [{root.status}]"
+    logger.info(f"[Trace] {root.name} {root.duration_ms:.0f} ms{status}" + (f" ({parts})" if parts else ""))
+
+
+def _configure_console() -> None:
+    """One stdout handler for the "src" loggers, unless the host application configured logging itself."""
+    package = logging.getLogger(__package__)
+    if not package.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        package.addHandler(handler)
+    if package.level == logging.NOTSET:
+        package.setLevel(logging.INFO if TracingConfig.CONSOLE else logging.WARNING)
+
+
+_configure_console()
+
+_tracer = Tracer(
+    enabled=TracingConfig.ENABLED,
+    jsonl_path=TracingConfig.JSONL_PATH or None,
+    window=TracingConfig.HISTOGRAM_WINDOW,
+    console=TracingConfig.CONSOLE,
+)
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, **attributes: Any):
+    """Context manager timing a block as a child of the current span."""
+    return _tracer.span(name, **attributes)
+
+
+def start_span(name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+    """Span for async generators: finish it with Span.end() (e.g. in a finally block)."""
+    return _tracer.start_span(name, parent, **attributes)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def annotate(**attributes: Any) -> None:
+    """Adds attributes to the current span (no-op outside of a span)."""
+    current = _current.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+@contextmanager
+def use_span(current: Span) -> Iterator[Span]:
+    """Makes an already started span current for the block (it is not finished on exit)."""
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+
+
+async def bind(agen: AsyncIterator, parent: Span) -> AsyncIterator:
+    """
+    Iterates an async generator with `parent` as the current span for each of its steps,
+    so spans started inside it are nested correctly.
+    """
+    try:
+        while True:
+            with use_span(parent):
+                try:
+                    value = await agen.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield value
+    finally:
+        await agen.aclose()
+
+
+def latency_stats() -> Dict[str, dict]:
+    """Rolling latency histograms per span name (see Tracer.latency_stats)."""
+    return _tracer.latency_stats()
@@ -0,0 +1,68 @@
+"""
+Shared fixtures: the pipeline runs against the replay backends (src/replay.py) with
+the result caches turned off, so tests need neither Azure nor network access.
+"""
+
+import os
+import shutil
+
+import pytest
+
+from src.backends import set_completion_backend, set_ocr_backend
+from src.config import CacheConfig, LLMCacheConfig, PipelineConfig, ReplayConfig
+from src.replay import FaultInjector, ReplayCompletionBackend, ReplayOCRBackend, shared_recordings
+
+DATA_DIR = ReplayConfig.DATA_DIR
+
+# Two sample reports with recorded OCR text and answers
+SAMPLE_REPORTS = ("Commits.png", "Zwierzaki2.png")
+
+
+class CountingCompletionBackend(ReplayCompletionBackend):
+    """Replay backend that counts the chat requests it receives."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    async def complete_async(self, stage, request):
+        self.calls += 1
+        return await super().complete_async(stage, request)
+
+
+@pytest.fixture(autouse=True)
+def no_caches(monkeypatch):
+    monkeypatch.setattr(CacheConfig, "ENABLED", False)
+    monkeypatch.setattr(LLMCacheConfig, "ENABLED", False)
+    monkeypatch.setattr(PipelineConfig, "COALESCE", False)
+
+
+@pytest.fixture
+def replay():
+    """
+    replay(ocr_error_rate=0.0, llm_error_rate=0.0, ocr_latency_ms=0.0) installs replay backends
+    failing at the given rates and returns the (counting) completion backend.
+    """
+    recordings = shared_recordings(DATA_DIR)
+
+    def install(
+        ocr_error_rate: float = 0.0, llm_error_rate: float = 0.0, ocr_latency_ms: float = 0.0
+    ) -> CountingCompletionBackend:
+        set_ocr_backend(ReplayOCRBackend(recordings, FaultInjector(ocr_latency_ms, error_rate=ocr_error_rate)))
+        llm = CountingCompletionBackend(recordings, FaultInjector(error_rate=llm_error_rate))
+        set_completion_backend(llm)
+        return llm
+
+    yield install
+    set_ocr_backend(None)
+    set_completion_backend(None)
+
+
+@pytest.fixture
+def reports(tmp_path):
+    """Directory with copies of SAMPLE_REPORTS (replay matches documents by content)."""
+    directory = tmp_path / "reports"
+    directory.mkdir()
+    for name in SAMPLE_REPORTS:
+        shutil.copy(os.path.join(DATA_DIR, name), directory / name)
+    return directory
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from src import jobs
+from src.config import JobConfig
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(JobConfig, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    manager = jobs.JobManager(workers=2, max_queued=10, retention=10)
+    monkeypatch.setattr(jobs, "_manager", manager)
+    yield TestClient(api.app)
+    manager.close()
+
+
+def _submit(client, reports, name="Commits.png", **data):
+    with open(reports / name, "rb") as f:
+        response = client.post("/jobs", files={"file": (name, f, "image/png")}, data=data)
+    assert response.status_code == 202
+    return response.json()["job_id"]
+
+
+def _wait(client, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in (jobs.DONE, jobs.FAILED):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_done_serves_result(client, replay, reports):
+    replay()
+    job_id = _submit(client, reports)
+
+    job = _wait(client, job_id)
+    assert job["status"] == jobs.DONE
+    result = client.get(f"/jobs/{job_id}/result")
+    assert result.status_code == 200
+    assert result.json()["preview"] == "Commits.png"
+    assert result.json()["text"]
+
+
+def test_ocr_failure_ends_failed(client, replay, reports):
+    llm = replay(ocr_error_rate=1.0)
+    job_id = _submit(client, reports)
+
+    job = _wait(client, job_id)
+    assert job["status"] == jobs.FAILED
+    assert job["failed_stage"] == "ocr"
+    assert client.get(f"/jobs/{job_id}/result").status_code == 500
+    assert llm.calls == 0
+
+
+@pytest.mark.parametrize("mode, stage", [("three_call", "interpret"), ("combined", "combined")])
+def test_llm_failure_ends_failed(client, replay, reports, mode, stage):
+    replay(llm_error_rate=1.0)
+    job_id = _submit(client, reports, mode=mode)
+
+    job = _wait(client, job_id)
+    assert job["status"] == jobs.FAILED
+    assert job["failed_stage"] == stage
+    body = client.get(f"/jobs/{job_id}/result")
+    assert body.status_code == 500
+    assert "key_insights" not in body.json()
+
+
+def test_rejects_unknown_mode_and_type(client, reports):
+    with open(reports / "Commits.png", "rb") as f:
+        assert client.post("/jobs", files={"file": ("a.txt", f)}).status_code == 400
+    with open(reports / "Commits.png", "rb") as f:
+        response = client.post("/jobs", files={"file": ("a.png", f)}, data={"mode": "fast"})
+    assert response.status_code == 400
+    assert client.get("/jobs/unknown").status_code == 404
+
+
+def test_queue_full_is_503(client, monkeypatch, reports):
+    monkeypatch.setattr(jobs, "_manager", jobs.JobManager(workers=1, max_queued=0))
+    with open(reports / "Commits.png", "rb") as f:
+        assert client.post("/jobs", files={"file": ("a.png", f)}).status_code == 503
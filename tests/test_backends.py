@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from src.backends import CompletionBackend, OCRBackend
+
+
+def test_half_implemented_backends_fail_on_creation():
+    class NoReadLines(OCRBackend):
+        async def read_lines_async(self, path):
+            return []
+
+    class NoComplete(CompletionBackend):
+        async def complete_async(self, stage, request):
+            return ""
+
+    with pytest.raises(TypeError):
+        NoReadLines()
+    with pytest.raises(TypeError):
+        NoComplete()
+
+
+def test_defaults_build_on_the_abstract_methods():
+    class Echo(CompletionBackend):
+        def complete(self, stage, request):
+            return f"{stage}: {request['messages'][-1]['content']}"
+
+    async def collect():
+        return [piece async for piece in Echo().stream_async("summary", {"messages": [{"content": "hi"}]})]
+
+    assert asyncio.run(collect()) == ["summary: hi"]
@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+from src import batch
+
+
+def _records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_successful_run_records_all_fields(replay, reports):
+    replay()
+    record = asyncio.run(batch.process_one(str(reports / "Commits.png")))
+
+    assert record["status"] == "ok"
+    assert "error" not in record
+    assert all(record[name] for name in batch.RESULT_FIELDS)
+
+
+def test_ocr_failure_is_an_error_and_skips_llm_calls(replay, reports):
+    llm = replay(ocr_error_rate=1.0)
+    record = asyncio.run(batch.process_one(str(reports / "Commits.png")))
+
+    assert record["status"] == "error"
+    assert record["stage"] == "ocr"
+    assert "Injected OCR failure" in record["error"]
+    assert llm.calls == 0
+
+
+def test_llm_failure_is_an_error(replay, reports):
+    replay(llm_error_rate=1.0)
+    record = asyncio.run(batch.process_one(str(reports / "Commits.png"), "three_call"))
+
+    assert record["status"] == "error"
+    assert record["stage"] == "interpret"
+
+
+def test_combined_mode_failure_is_an_error(replay, reports):
+    replay(llm_error_rate=1.0)
+    record = asyncio.run(batch.process_one(str(reports / "Commits.png"), "combined"))
+
+    assert record["status"] == "error"
+    assert record["stage"] == "combined"
+
+
+def test_resume_retries_failed_files_only(replay, reports, tmp_path):
+    output = str(tmp_path / "results.jsonl")
+
+    replay(ocr_error_rate=1.0)
+    assert batch.main([str(reports), "-o", output]) == 1
+    assert batch.load_checkpoint(output) == set()
+
+    replay()
+    assert batch.main([str(reports), "-o", output, "--resume"]) == 0
+    assert batch.load_checkpoint(output) == {str(reports / name) for name in ("Commits.png", "Zwierzaki2.png")}
+
+    # Nothing left to do: the third run processes no file
+    assert batch.main([str(reports), "-o", output, "--resume"]) == 0
+    assert [r["status"] for r in _records(output)] == ["error", "error", "ok", "ok"]
+
+
+def test_empty_summary_is_an_error(replay, reports, monkeypatch):
+    llm = replay()
+    answer = llm.complete_async
+
+    async def no_summary(stage, request):
+        return "" if stage == "summary" else await answer(stage, request)
+
+    monkeypatch.setattr(llm, "complete_async", no_summary)
+    record = asyncio.run(batch.process_one(str(reports / "Commits.png"), "three_call"))
+
+    assert record["status"] == "error"
+    assert record["stage"] == "summaries"
+    assert "empty summary" in record["error"]
@@ -0,0 +1,64 @@
+import os
+
+from src.cache import TwoTierCache
+
+
+def _disk_total(cache):
+    return sum(os.path.getsize(path) for path in cache._disk_files())
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = TwoTierCache("test", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = TwoTierCache("test", ttl_seconds=-1, disk_dir=str(tmp_path))
+    cache.set("a", "value")
+
+    assert cache.get("a") is None
+    assert cache.stats()["misses"] == 1
+    assert _disk_total(cache) == 0  # the expired file is removed
+
+
+def test_rewritten_key_is_counted_once(tmp_path):
+    cache = TwoTierCache("test", disk_dir=str(tmp_path))
+    cache.set("first", "x")  # the first write counts what is already on disk
+    for size in (10, 500, 20):
+        cache.set("a", "x" * size)
+
+    assert cache._disk_bytes == _disk_total(cache)
+
+
+def test_disk_tier_evicts_oldest_files_over_the_limit(tmp_path):
+    cache = TwoTierCache("test", max_entries=1, disk_dir=str(tmp_path), max_disk_bytes=1000)
+    for i in range(10):
+        cache.set(f"key{i}", "x" * 200)
+        os.utime(cache._path(f"key{i}"), (i, i))  # deterministic age order
+
+    assert _disk_total(cache) <= 1000
+    assert cache._disk_bytes == _disk_total(cache)
+    assert cache.get("key9") == "x" * 200
+    assert cache.get("key0") is None
+    assert cache.stats()["evictions"] > 0
+
+
+def test_returned_values_are_copies(tmp_path):
+    cache = TwoTierCache("test", disk_dir=str(tmp_path))
+    stored = {"fields": ["a"]}
+    cache.set("key", stored)
+    stored["fields"].append("changed by the writer")
+
+    cache.get("key")["fields"].append("changed by a reader")  # memory hit
+    assert cache.get("key") == {"fields": ["a"]}
+
+    cache._memory.clear()
+    cache.get("key")["fields"].append("changed by a reader")  # disk hit, now also in memory
+    assert cache.get("key") == {"fields": ["a"]}
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+import pytest
+
+from src import pipeline
+from src.cancellation import CancellationToken, JobCancelled, SessionJobs, cancellable, use_token
+from src.config import PipelineConfig
+
+
+def test_new_document_supersedes_the_running_job():
+    jobs = SessionJobs()
+    first = jobs.start("session", "doc-a")
+    second = jobs.start("session", "doc-b")
+
+    assert first.cancelled and first.reason == "superseded by a newer request"
+    assert not second.cancelled
+    assert jobs.running("session") == 1
+
+
+def test_same_document_resubmitted_keeps_every_token():
+    jobs = SessionJobs()
+    first = jobs.start("session", "doc-a")
+    again = jobs.start("session", "doc-a")
+    assert not first.cancelled and not again.cancelled
+    assert jobs.running("session") == 2
+
+    # A, A, B: both runs of A are superseded, not only the latest
+    other = jobs.start("session", "doc-b")
+    assert first.cancelled and again.cancelled
+    assert not other.cancelled
+
+
+def test_clear_cancels_all_jobs_of_the_session_only():
+    jobs = SessionJobs()
+    tokens = [jobs.start("session", "doc-a"), jobs.start("session", "doc-a")]
+    elsewhere = jobs.start("other", "doc-a")
+
+    assert jobs.cancel("session", "cleared")
+    assert all(token.cancelled and token.reason == "cleared" for token in tokens)
+    assert not elsewhere.cancelled
+    assert not jobs.cancel("session")
+
+
+def test_finished_jobs_are_forgotten():
+    jobs = SessionJobs()
+    first = jobs.start("session", "doc-a")
+    second = jobs.start("session", "doc-a")
+
+    jobs.finish("session", first)
+    assert jobs.running("session") == 1
+    jobs.finish("session", second)
+    assert len(jobs) == 0
+    jobs.finish("session", second)  # twice is harmless
+
+
+def test_cancellable_stops_the_await_when_the_token_is_cancelled():
+    token = CancellationToken()
+    stopped = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            stopped.append(True)
+            raise
+
+    async def scenario():
+        with use_token(token):
+            # cancel() comes from another thread, like a UI event
+            threading.Timer(0.02, token.cancel, args=("superseded",)).start()
+            await cancellable(slow())
+
+    with pytest.raises(JobCancelled, match="superseded"):
+        asyncio.run(scenario())
+    assert stopped == [True]
+
+
+def test_cancellable_without_a_token_just_awaits():
+    async def value():
+        return 42
+
+    assert asyncio.run(cancellable(value())) == 42
+
+
+def test_superseded_resubmits_stop_the_run_in_flight(replay, reports, monkeypatch):
+    monkeypatch.setattr(PipelineConfig, "COALESCE", True)
+    llm = replay(ocr_latency_ms=100)
+    commits, animals = str(reports / "Commits.png"), str(reports / "Zwierzaki2.png")
+
+    async def scenario():
+        first = asyncio.ensure_future(pipeline.analyze_report_file_async(commits, "three_call", "session"))
+        await asyncio.sleep(0.01)
+        again = asyncio.ensure_future(pipeline.analyze_report_file_async(commits, "three_call", "session"))
+        await asyncio.sleep(0.01)
+        other = await pipeline.analyze_report_file_async(animals, "three_call", "session")
+        return await first, await again, other
+
+    first, again, other = asyncio.run(scenario())
+    assert first[1] == again[1] == pipeline.RUN_CANCELLED
+    assert other[2]  # key insights of the newer document
+    assert llm.calls == 3  # only the newer document reached the LLM
+    assert len(pipeline.session_jobs) == 0
@@ -0,0 +1,55 @@
+import pytest
+
+from src.chart_extract import extract, fix_digits, normalize_number
+
+SALES = """Sales by quarter (USD)
+Q1    25.OOO
+Q2  31 500
+Q3: 29,8OO_
+Q4 34.200
+(Chart n° 04)"""
+
+
+def test_pairs_units_and_digit_fixes():
+    data = extract(SALES)
+
+    assert data.pairs == [("Q1", "25000"), ("Q2", "31500"), ("Q3", "29800"), ("Q4", "34200")]
+    assert data.units == ["USD"]
+    assert ("25.OOO", "25.000") in data.fixes
+
+
+@pytest.mark.parametrize(
+    "line", ["(Chart n° 04)", "Fig. 2", "Figure 3", "Page 12", "Tabela nr 5", "Wykres 7", "Item # 9", "Week 04"]
+)
+def test_captions_and_numbering_are_not_pairs(line):
+    data = extract(line)
+
+    assert data.pairs == []
+    assert data.text_lines == [" ".join(line.split())]
+
+
+def test_labels_that_merely_start_like_captions_are_data():
+    data = extract("Yes 60%\nNo 40%\nPage views 1200\nTable salt 30%")
+
+    assert data.pairs == [("Yes", "60%"), ("No", "40%"), ("Page views", "1200"), ("Table salt", "30%")]
+    assert data.text_lines == []
+
+
+def test_separate_values_are_listed_in_reading_order():
+    data = extract("EXPENSES\nWeek 1\nFood\n35.3%\nBills\n17.6%\n2023")
+
+    assert data.pairs == [("Week", "1")]
+    assert data.values == ["35.3%", "17.6%"]
+    assert data.years == ["2023"]
+
+
+@pytest.mark.parametrize(
+    "raw, sep, expected",
+    [("31 500", None, "31500"), ("25.000", ".", "25000"), ("12,5", None, "12.5"), ("1.234,5", ".", "1234.5")],
+)
+def test_normalize_number(raw, sep, expected):
+    assert normalize_number(raw, sep) == expected
+
+
+def test_fix_digits_only_touches_numbers():
+    assert fix_digits("Q3 29,8OO Others") == "Q3 29,800 Others"
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from src import cache, image_prep
+from src.config import CacheConfig, ReplayConfig
+
+
+@pytest.fixture
+def image_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(CacheConfig, "ENABLED", True)
+    monkeypatch.setattr(CacheConfig, "DISK_ENABLED", True)
+    monkeypatch.setattr(CacheConfig, "DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(cache, "_caches", {})
+    return tmp_path / "cache" / "images"
+
+
+def test_normalized_image_is_stored_in_the_bounded_cache(image_cache):
+    if not image_prep._pillow_available():
+        pytest.skip("Pillow is not installed")
+    path = os.path.join(ReplayConfig.DATA_DIR, "Commits.png")
+
+    data, cached = image_prep._normalized(path)
+    assert not cached
+    assert image_prep._normalized(path) == (data, True)
+
+    images = cache.get_cache("images")
+    assert images.max_entries == image_prep.CACHE_MEMORY_ENTRIES
+    assert images.max_disk_bytes == CacheConfig.DISK_MAX_MB * 1024 * 1024
+    assert [name for _, _, names in os.walk(image_cache) for name in names][0].endswith(".json")
+
+    # A fresh process reads the image back from the disk tier
+    cache._caches.clear()
+    assert image_prep._normalized(path) == (data, True)
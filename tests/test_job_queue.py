@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import pytest
+
+from src import job_queue
+from src.config import JobQueueConfig
+from src.job_queue import DONE, FAILED, LEASED, QUEUED, JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(JobQueueConfig, "RETRY_BACKOFF_SECONDS", 0.0)
+    return JobQueue(str(tmp_path / "queue.sqlite3"))
+
+
+SHORT_LEASE = 0.02
+
+
+def _expire():
+    time.sleep(SHORT_LEASE * 2)
+
+
+def test_expired_lease_is_handed_to_another_worker(queue):
+    job_id = queue.enqueue("a.png")
+    first = queue.lease("worker-a", lease_seconds=SHORT_LEASE)
+    assert first.id == job_id
+    assert queue.lease("worker-b") is None  # still leased
+
+    _expire()
+    second = queue.lease("worker-b")
+    assert second.id == job_id
+    assert second.attempts == 2
+
+    # The old owner can no longer touch the job or its checkpoints
+    assert not queue.renew(job_id, "worker-a")
+    assert not queue.checkpoint(job_id, "worker-a", "ocr", {"text": "stale"})
+    assert not queue.complete(job_id, "worker-a", {})
+    assert queue.checkpoint(job_id, "worker-b", "ocr", {"text": "fresh"})
+    assert queue.get(job_id)["checkpoints"] == ["ocr"]
+    assert queue.get(job_id)["status"] == LEASED
+
+
+def test_exhausted_expired_job_fails_and_the_next_one_is_leased(queue):
+    exhausted = queue.enqueue("a.png", max_attempts=1)
+    queue.lease("worker-a", lease_seconds=SHORT_LEASE)
+    ready = queue.enqueue("b.png")
+    _expire()
+
+    job = queue.lease("worker-b")
+    assert job is not None and job.id == ready
+    assert queue.get(exhausted)["status"] == FAILED
+    assert queue.get(exhausted)["error"] == "Lease expired on the last attempt."
+
+
+def test_failed_attempt_is_retried_from_its_checkpoint(queue, replay, reports):
+    job_id = queue.enqueue(str(reports / "Commits.png"), mode="three_call")
+
+    replay(llm_error_rate=1.0)
+    job = queue.lease("worker")
+    assert asyncio.run(job_queue.process_job(queue, job, "worker")) == QUEUED
+    assert queue.get(job_id)["checkpoints"] == ["ocr"]
+
+    # OCR would fail now: the retry must take its text from the checkpoint
+    replay(ocr_error_rate=1.0)
+    job = queue.lease("worker")
+    assert set(job.checkpoints) == {"ocr"}
+    assert asyncio.run(job_queue.process_job(queue, job, "worker")) == DONE
+
+    stored = queue.get(job_id)
+    assert stored["attempts"] == 2
+    assert stored["result"]["key_insights"]
+    assert sorted(stored["checkpoints"]) == ["interpret", "ocr", "summaries"]
+
+
+def test_worker_that_lost_its_lease_stops_before_the_next_stage(queue, replay, reports):
+    job_id = queue.enqueue(str(reports / "Commits.png"), mode="three_call")
+    llm = replay()
+    job = queue.lease("worker-a", lease_seconds=SHORT_LEASE)
+    _expire()
+    assert queue.lease("worker-b").id == job_id
+
+    status = asyncio.run(job_queue.process_job(queue, job, "worker-a", lease_seconds=SHORT_LEASE))
+    assert status == "lease lost"
+    assert llm.calls == 0  # OCR checkpoint refused - no LLM call for a job it no longer owns
+    assert queue.get(job_id)["checkpoints"] == []
+    assert queue.get(job_id)["status"] == LEASED
+
+
+def test_missing_file_fails_without_retry(queue, replay, tmp_path):
+    replay()
+    job_id = queue.enqueue(str(tmp_path / "missing.png"))
+
+    job = queue.lease("worker")
+    assert asyncio.run(job_queue.process_job(queue, job, "worker")) == FAILED
+    assert queue.get(job_id)["attempts"] == 1
+
+
+def test_unusable_answer_fails_without_retry(queue, replay, reports, monkeypatch):
+    llm = replay()
+    answer = llm.complete_async
+
+    async def empty_interpretation(stage, request):
+        return "" if stage == "interpret" else await answer(stage, request)
+
+    monkeypatch.setattr(llm, "complete_async", empty_interpretation)
+    job_id = queue.enqueue(str(reports / "Commits.png"), mode="three_call")
+
+    job = queue.lease("worker")
+    assert asyncio.run(job_queue.process_job(queue, job, "worker")) == FAILED
+    assert queue.get(job_id)["error"] == "interpret: Interpretation failed."
+
+
+def test_ocr_transport_error_is_retried(queue, replay, reports):
+    replay(ocr_error_rate=1.0)
+    job_id = queue.enqueue(str(reports / "Commits.png"))
+
+    job = queue.lease("worker")
+    assert asyncio.run(job_queue.process_job(queue, job, "worker")) == QUEUED
+    assert queue.get(job_id)["checkpoints"] == []
@@ -0,0 +1,136 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from ocr_results import OCRResult  # noqa: E402
+
+BOX_A = [1.0, 2.0, 30.0, 2.0, 30.0, 12.0, 1.0, 12.0]
+BOX_B = [0.5, 20.0, 40.5, 20.0, 40.5, 31.25, 0.5, 31.25]
+
+
+def _word(text, confidence, box):
+    return SimpleNamespace(text=text, confidence=confidence, bounding_box=box)
+
+
+def _line(text, box, words):
+    return SimpleNamespace(text=text, bounding_box=box, words=words)
+
+
+def _read_result(pages):
+    return SimpleNamespace(analyze_result=SimpleNamespace(read_results=pages))
+
+
+def _sample():
+    page1 = SimpleNamespace(
+        width=800,
+        height=600,
+        unit="pixel",
+        angle=0.5,
+        lines=[
+            _line("Sales 2024", BOX_A, [_word("Sales", 0.5, BOX_A), _word("2024", 0.25, BOX_B)]),
+            _line("No box", None, [_word("No", 1.0, None), _word("box", 0.75, BOX_A)]),
+        ],
+    )
+    page2 = SimpleNamespace(
+        width=8.5, height=11, unit="inch", angle=0, lines=[_line("End", BOX_B, [_word("End", 0.125, BOX_B)])]
+    )
+    return OCRResult.from_read_result(
+        _read_result([page1, page2]), "https://example.com/a.png", "Sample", None, 0.12345
+    )
+
+
+def test_to_dict_has_the_nested_dict_shape():
+    data = _sample().to_dict()
+
+    assert list(data) == [
+        "timestamp", "image_url", "description", "language", "processing_time_ms", "pages", "full_text", "statistics"
+    ]
+    assert data["language"] == "auto-detected"
+    assert data["processing_time_ms"] == 123.45
+    assert data["full_text"] == "Sales 2024\nNo box\nEnd"
+    assert data["statistics"] == {
+        "total_pages": 2,
+        "total_lines": 3,
+        "total_words": 5,
+        "total_characters": len("Sales 2024\nNo box\nEnd"),
+        "avg_words_per_line": 1.67,
+    }
+    assert data["pages"][0] == {
+        "page_number": 1,
+        "width": 800,
+        "height": 600,
+        "unit": "pixel",
+        "angle": 0.5,
+        "lines": [
+            {
+                "text": "Sales 2024",
+                "bounding_box": BOX_A,
+                "words": [
+                    {"text": "Sales", "confidence": 0.5, "bounding_box": BOX_A},
+                    {"text": "2024", "confidence": 0.25, "bounding_box": BOX_B},
+                ],
+            },
+            {
+                "text": "No box",
+                "bounding_box": None,
+                "words": [
+                    {"text": "No", "confidence": 1.0, "bounding_box": None},
+                    {"text": "box", "confidence": 0.75, "bounding_box": BOX_A},
+                ],
+            },
+        ],
+    }
+    assert data["pages"][1]["lines"] == [
+        {"text": "End", "bounding_box": BOX_B, "words": [{"text": "End", "confidence": 0.125, "bounding_box": BOX_B}]}
+    ]
+
+
+def test_to_dict_survives_a_json_round_trip():
+    result = _sample()
+    result["poll_count"] = 3
+    data = result.to_dict()
+
+    assert json.loads(json.dumps(data)) == data
+    assert data["poll_count"] == 3
+    assert "pages" not in result.to_dict(include_pages=False)
+
+
+def test_confidence_is_rounded_like_the_dict_results():
+    result = OCRResult.from_read_result(
+        _read_result([SimpleNamespace(lines=[_line("x", BOX_A, [_word("x", 0.987654, BOX_A)])])]),
+        "u",
+    )
+    assert result.pages[0].lines[0].words[0]["confidence"] == 0.988
+
+
+def test_dict_like_access():
+    result = _sample()
+
+    assert result["full_text"] == result.full_text
+    assert result.get("poll_count") is None
+    assert result.get("unknown", "default") == "default"
+    with pytest.raises(KeyError):
+        result["unknown"]
+    with pytest.raises(KeyError):
+        result["pages"] = []
+    result["description"] = "Renamed"
+    assert result.to_dict()["description"] == "Renamed"
+
+
+def test_empty_read_result():
+    data = OCRResult.from_read_result(SimpleNamespace(analyze_result=None), "u").to_dict()
+
+    assert data["pages"] == []
+    assert data["full_text"] == ""
+    assert data["statistics"] == {
+        "total_pages": 0,
+        "total_lines": 0,
+        "total_words": 0,
+        "total_characters": 0,
+        "avg_words_per_line": 0,
+    }
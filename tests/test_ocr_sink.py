@@ -0,0 +1,123 @@
+import gzip
+import json
+import os
+import sys
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+# ocr_processor.py runs as a script: its modules are imported from src/ directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import ocr_processor  # noqa: E402
+from ocr_results import OCRResult  # noqa: E402
+from ocr_sink import JsonlSink, text_export_filename  # noqa: E402
+from azure.cognitiveservices.vision.computervision.models import OperationStatusCodes  # noqa: E402
+
+
+def _read_result(text):
+    box = [0.0, 0.0, 10.0, 0.0, 10.0, 5.0, 0.0, 5.0]
+    words = [SimpleNamespace(text=w, confidence=0.9, bounding_box=box) for w in text.split()]
+    line = SimpleNamespace(text=text, bounding_box=box, words=words)
+    page = SimpleNamespace(width=100, height=50, unit="pixel", angle=0, lines=[line])
+    return SimpleNamespace(status=OperationStatusCodes.succeeded, analyze_result=SimpleNamespace(read_results=[page]))
+
+
+def _result(text="Hello world", description="Sample doc"):
+    return OCRResult.from_read_result(_read_result(text), "https://example.com/a.png", description)
+
+
+def _lines(path, opener=open):
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class FakeVisionClient:
+    """Answers read / get_read_result with a recorded result for every URL."""
+
+    def read(self, url, language=None, raw=True):
+        self.url = url
+        return SimpleNamespace(headers={"Operation-Location": f"https://example.com/operations/{len(url)}"})
+
+    def get_read_result(self, operation_id, raw=True):
+        return SimpleNamespace(output=_read_result(f"Text of {self.url}"), response=SimpleNamespace(headers={}))
+
+
+@pytest.fixture
+def processor_factory(monkeypatch):
+    monkeypatch.setattr(ocr_processor.AzureConfig, "get_computer_vision_client", staticmethod(FakeVisionClient))
+    monkeypatch.setattr(ocr_processor.OCRConfig, "POLL_INITIAL_INTERVAL_SECONDS", 0.0)
+    return ocr_processor.OCRProcessor
+
+
+def test_jsonl_sink_appends_one_line_per_result(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    with JsonlSink(path) as sink:
+        sink.write(_result("First line"), 1)
+    with JsonlSink(path) as sink:  # a second run appends
+        sink.write(_result("Second line").to_dict(), 2)
+
+    records = _lines(path)
+    assert [r["full_text"] for r in records] == ["First line", "Second line"]
+    assert records[0] == _result("First line").to_dict() | {"timestamp": records[0]["timestamp"]}
+
+
+def test_jsonl_sink_gzip_is_readable_after_every_write(tmp_path):
+    path = str(tmp_path / "results.jsonl.gz")
+    sink = JsonlSink(path)
+    assert sink.compress
+    sink.write(_result("One"), 1)
+    sink.write(_result("Two"), 2)
+    # Flushed blocks decompress before the stream is finished (e.g. after a crash)
+    with open(path, "rb") as f:
+        partial = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(f.read()).decode("utf-8")
+    assert [json.loads(line)["full_text"] for line in partial.splitlines()] == ["One", "Two"]
+    sink.close()
+    assert [r["full_text"] for r in _lines(path, gzip.open)] == ["One", "Two"]
+    assert sink.written == 2
+
+
+def test_jsonl_sink_exports_text_files(tmp_path):
+    with JsonlSink(str(tmp_path / "r.jsonl"), export_text=True, text_dir=str(tmp_path / "txt")) as sink:
+        sink.write(_result("Exported text", "Printed: text!"), 3)
+
+    exported = tmp_path / "txt" / text_export_filename(3, "Printed: text!")
+    assert exported.name == "ocr_output_3_Printed_text.txt"
+    assert exported.read_text(encoding="utf-8").endswith("Exported text")
+
+
+def test_processor_keeps_sink_open_after_save_results(processor_factory, tmp_path):
+    sink = JsonlSink(str(tmp_path / "r.jsonl"))
+    processor = processor_factory(sink=sink)
+    processor.extract_text_from_url("https://example.com/1.png")
+
+    summary_path = processor.save_results(str(tmp_path / "summary.json"))
+    processor.extract_text_from_url("https://example.com/2.png")  # the sink still accepts results
+    sink.close()
+
+    with open(summary_path, encoding="utf-8") as f:
+        summary = json.load(f)
+    assert summary["task"] == "Task 2: OCR Text Extraction"
+    assert summary["total_documents_processed"] == 1
+    assert summary["results_file"] == sink.path
+    assert len(_lines(sink.path)) == 2
+
+
+def test_processor_keep_results_limits_memory(processor_factory, tmp_path):
+    with JsonlSink(str(tmp_path / "r.jsonl")) as sink:
+        keep_none = processor_factory(sink=sink, keep_results=0)
+        keep_one = processor_factory(sink=sink, keep_results=1)
+        for i in range(3):
+            keep_none.extract_text_from_url(f"https://example.com/{i}.png")
+            keep_one.extract_text_from_url(f"https://example.com/{i}.png")
+
+    assert list(keep_none.results) == []
+    assert [r["full_text"] for r in keep_one.results] == ["Text of https://example.com/2.png"]
+    assert keep_none.processed_count == keep_one.processed_count == 3
+    assert len(_lines(sink.path)) == 6
+
+
+def test_processor_keep_results_requires_sink(processor_factory):
+    with pytest.raises(ValueError):
+        processor_factory(keep_results=5)
@@ -0,0 +1,177 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src import config, ratelimit
+from src.backends import BackendError, OCRFailedError
+from src.config import RateLimitConfig
+from src.ratelimit import RateLimitedError, RateLimiter, TokenBucket
+
+
+class Throttled(Exception):
+    """Looks like an SDK 429 error (status_code + response with headers)."""
+
+    def __init__(self, retry_after="0"):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={"Retry-After": retry_after})
+
+
+@pytest.fixture(autouse=True)
+def no_cooldown(monkeypatch):
+    monkeypatch.setattr(ratelimit, "DECREASE_COOLDOWN_SECONDS", 0.0)
+
+
+def test_throttle_halves_the_limit_down_to_the_minimum():
+    limiter = RateLimiter("test", max_concurrency=8, min_concurrency=2)
+
+    limiter.on_throttle(0)
+    assert limiter.limit == 4
+    limiter.on_throttle(0)
+    limiter.on_throttle(0)
+    assert limiter.limit == 2
+    assert limiter.throttled == 3
+
+
+def test_throttles_within_the_cooldown_count_as_one_decrease(monkeypatch):
+    monkeypatch.setattr(ratelimit, "DECREASE_COOLDOWN_SECONDS", 60.0)
+    limiter = RateLimiter("test", max_concurrency=8)
+
+    limiter.on_throttle(0)
+    limiter.on_throttle(0)
+    assert limiter.limit == 4
+
+
+def test_success_grows_the_limit_additively():
+    limiter = RateLimiter("test", max_concurrency=8)
+    limiter.on_throttle(0)  # 8 -> 4
+
+    for _ in range(4):
+        limiter.on_success()
+    assert 4.9 < limiter.limit < 5.0  # ~ +1 per `limit` successful calls
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.limit == 8
+
+
+def test_call_retries_429_and_gives_up_after_max_retries():
+    limiter = RateLimiter("test", max_concurrency=4, max_retries=2)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise Throttled()
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    assert len(attempts) == 3
+    assert limiter.limit < 4
+
+    def always_throttled():
+        raise Throttled()
+
+    with pytest.raises(RateLimitedError):
+        limiter.call(always_throttled)
+    assert limiter.rejected == 1
+
+
+def test_retry_after_pauses_the_whole_limiter():
+    limiter = RateLimiter("test", max_concurrency=4)
+    limiter.on_throttle(0.2)
+
+    started = time.monotonic()
+    limiter.call(lambda: None)
+    assert time.monotonic() - started >= 0.15
+
+
+def test_token_bucket_reserves_in_arrival_order():
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    assert bucket.reserve(2) == 0
+    assert bucket.reserve(1) == pytest.approx(0.1, abs=0.02)
+    assert bucket.reserve(1) == pytest.approx(0.2, abs=0.02)
+
+
+def test_async_waiter_wakes_when_a_slot_is_released():
+    limiter = RateLimiter("test", max_concurrency=1)
+
+    async def scenario():
+        order = []
+
+        async def holder():
+            async with limiter.acquire_async():
+                order.append("holder")
+                await asyncio.sleep(0.05)
+
+        async def waiter():
+            await asyncio.sleep(0)  # holder takes the slot first
+            async with limiter.acquire_async():
+                order.append("waiter")
+
+        started = time.monotonic()
+        await asyncio.gather(holder(), waiter())
+        return order, time.monotonic() - started
+
+    order, elapsed = asyncio.run(scenario())
+    assert order == ["holder", "waiter"]
+    assert elapsed < 0.5
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_stream_holds_the_slot_until_consumed():
+    limiter = RateLimiter("test", max_concurrency=1)
+
+    async def open_stream():
+        async def chunks():
+            for chunk in ("a", "b"):
+                await asyncio.sleep(0.01)
+                yield chunk
+
+        return chunks()
+
+    async def scenario():
+        async with limiter.stream_async(open_stream) as stream:
+            assert limiter.stats()["in_flight"] == 1
+            received = [chunk async for chunk in stream]
+        return received
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    assert limiter.stats()["in_flight"] == 0
+    assert limiter.calls == 1
+
+
+def test_abandoned_stream_releases_the_slot():
+    limiter = RateLimiter("test", max_concurrency=1)
+
+    async def open_stream():
+        return iter(())
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            async with limiter.stream_async(open_stream):
+                raise RuntimeError("client went away")
+
+    asyncio.run(scenario())
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_openai_sdk_does_not_retry_under_the_limiter(monkeypatch):
+    monkeypatch.setattr(RateLimitConfig, "ENABLED", True)
+    assert config._openai_max_retries() == 0
+    monkeypatch.setattr(RateLimitConfig, "ENABLED", False)
+    assert config._openai_max_retries() == config.HttpConfig.OPENAI_MAX_RETRIES
+
+
+def test_transient_errors():
+    assert ratelimit.is_transient(Throttled())
+    assert ratelimit.is_transient(RateLimitedError("429"))
+    assert ratelimit.is_transient(BackendError("injected"))
+    assert ratelimit.is_transient(TimeoutError())
+    assert ratelimit.is_transient(type("E", (Exception,), {"status_code": 503})())
+    assert not ratelimit.is_transient(OCRFailedError("unreadable"))
+    assert not ratelimit.is_transient(FileNotFoundError("missing.png"))
+    assert not ratelimit.is_transient(ValueError("too large"))
+    assert not ratelimit.is_transient(type("E", (Exception,), {"status_code": 400})())
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from src import pipeline
+from src.aio import SingleFlight
+from src.config import PipelineConfig
+
+
+def test_concurrent_callers_share_one_computation():
+    flights = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def scenario():
+        return await asyncio.gather(*(flights.run("key", compute) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["result"] * 5
+    assert len(calls) == 1
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+
+def test_followers_get_the_leaders_error():
+    flights = SingleFlight()
+
+    async def broken():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        return await asyncio.gather(flights.run("key", broken), flights.run("key", broken), return_exceptions=True)
+
+    assert [str(e) for e in asyncio.run(scenario())] == ["boom", "boom"]
+
+
+def test_follower_recomputes_when_the_leading_computation_is_cancelled():
+    flights = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise asyncio.CancelledError()  # e.g. the leader's run was superseded
+        return "result"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flights.run("key", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.run("key", compute))
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "result"  # the follower led a second computation
+    assert len(calls) == 2
+
+
+def test_identical_documents_are_analysed_once(replay, reports, monkeypatch):
+    monkeypatch.setattr(PipelineConfig, "COALESCE", True)
+    llm = replay()
+    path = str(reports / "Commits.png")
+
+    asyncio.run(pipeline.analyze_report_file_async(path, "three_call"))
+    single_run = llm.calls
+    llm.calls = 0
+
+    async def scenario():
+        return await asyncio.gather(*(pipeline.analyze_report_file_async(path, "three_call") for _ in range(3)))
+
+    results = asyncio.run(scenario())
+    assert llm.calls == single_run
+    assert results[0] == results[1] == results[2]
+    assert results[0][2]  # key insights
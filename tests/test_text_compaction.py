@@ -0,0 +1,79 @@
+from src import llm
+from src.config import TokenBudgetConfig
+from src.text_compaction import (
+    TRUNCATION_MARKER,
+    compact_text,
+    estimate_tokens,
+    is_noise,
+)
+
+MARKDOWN = "**Wnioski:**\n- Sprzedaż rośnie.\n---\n## Podsumowanie\n- Sprzedaż rośnie."
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_noise_and_duplicate_lines_are_dropped():
+    text, stats = compact_text("Shopping\n  Food   items \n=====\nshopping\n11.8%\n11.8%\n.,;:!")
+
+    assert text == "Shopping\nFood items\n11.8%\n11.8%"  # equal values are data, kept
+    assert stats["duplicates"] == 1
+    assert stats["noise"] == 2
+    assert stats["omitted"] == 0
+    assert stats["tokens_after"] == estimate_tokens(text)
+
+
+def test_is_noise_keeps_lines_with_digits():
+    assert is_noise("---")
+    assert is_noise("*(.)* ,")
+    assert not is_noise("(-3.5%)")
+    assert not is_noise("Sales")
+
+
+def test_over_budget_keeps_numeric_lines_first_in_reading_order():
+    lines = ["Quarterly sales of the company", "Q1 100", "Growth was strong in spring", "Q2 200", "Source: report"]
+    budget = estimate_tokens(TRUNCATION_MARKER) + (estimate_tokens("Q1 100") + 1) + (estimate_tokens("Q2 200") + 1)
+    text, stats = compact_text("\n".join(lines), max_tokens=budget)
+
+    assert text.splitlines() == ["Q1 100", "Q2 200", TRUNCATION_MARKER.format(omitted=3)]
+    assert stats["omitted"] == 3
+    assert stats["tokens_after"] <= budget
+
+
+def test_shorter_line_still_fits_after_a_long_one_is_skipped():
+    lines = ["A" * 80, "Q1 100", "Short"]
+    budget = estimate_tokens(TRUNCATION_MARKER) + (estimate_tokens("Q1 100") + 1) + (estimate_tokens("Short") + 1)
+
+    assert compact_text("\n".join(lines), max_tokens=budget)[0].splitlines()[:-1] == ["Q1 100", "Short"]
+
+
+def test_no_budget_means_no_truncation():
+    text = "\n".join(f"Line {i}" for i in range(500))
+    assert compact_text(text, max_tokens=0)[0] == text
+    assert compact_text(text)[1]["omitted"] == 0
+
+
+def test_markdown_is_only_budgeted():
+    assert compact_text(MARKDOWN)[0] != MARKDOWN  # the OCR filters would break it
+    assert compact_text(MARKDOWN, clean=False) == (
+        MARKDOWN,
+        {"tokens_before": estimate_tokens(MARKDOWN), "duplicates": 0, "noise": 0, "omitted": 0,
+         "tokens_after": estimate_tokens(MARKDOWN)},
+    )
+
+    long_markdown = "\n".join([MARKDOWN] * 20)
+    text, stats = compact_text(long_markdown, max_tokens=50, clean=False)
+    assert stats["omitted"] > 0
+    assert text.startswith("**Wnioski:**")
+    assert stats["tokens_after"] <= 50
+
+
+def test_fit_input_filters_ocr_stages_only(monkeypatch):
+    monkeypatch.setattr(TokenBudgetConfig, "COMPACTION_ENABLED", True)
+
+    assert llm.fit_input("summary", MARKDOWN) == MARKDOWN
+    assert llm.fit_input("short_summary", MARKDOWN) == MARKDOWN
+    assert llm.fit_input("interpret", "Food\n---\nFood") == "Food"
@@ -0,0 +1,90 @@
+import pytest
+
+from src import modul_ocr, pdf_utils
+from src.cache import TwoTierCache
+from src.config import OCRConfig
+
+pypdf = pytest.importorskip("pypdf")
+from pypdf.generic import (  # noqa: E402
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    NameObject,
+    NumberObject,
+)
+
+LINES = ("Quarterly revenue report 2024", "Q1 25000 Q2 31500 Q3 29800")
+
+
+def _pdf(path, image_side_px=None):
+    """One-page PDF with LINES in its text layer and, optionally, an embedded image."""
+    writer = pypdf.PdfWriter()
+    page = writer.add_blank_page(612, 792)
+    font = DictionaryObject(
+        {
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject("/Helvetica"),
+        }
+    )
+    resources = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): writer._add_object(font)})})
+    content = "BT /F1 12 Tf 72 720 Td " + " ".join(f"({line}) Tj 0 -20 Td" for line in LINES) + " ET"
+    if image_side_px:
+        image = DecodedStreamObject()
+        image.set_data(b"\xff" * image_side_px * image_side_px)
+        image.update(
+            {
+                NameObject("/Type"): NameObject("/XObject"),
+                NameObject("/Subtype"): NameObject("/Image"),
+                NameObject("/Width"): NumberObject(image_side_px),
+                NameObject("/Height"): NumberObject(image_side_px),
+                NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+                NameObject("/BitsPerComponent"): NumberObject(8),
+            }
+        )
+        resources[NameObject("/XObject")] = DictionaryObject({NameObject("/Im1"): writer._add_object(image)})
+        content += f" q {image_side_px} 0 0 {image_side_px} 72 300 cm /Im1 Do Q"
+    stream = DecodedStreamObject()
+    stream.set_data(content.encode("latin-1"))
+    page[NameObject("/Resources")] = resources
+    page[NameObject("/Contents")] = writer._add_object(stream)
+    page[NameObject("/MediaBox")] = ArrayObject([NumberObject(n) for n in (0, 0, 612, 792)])
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def text_layer_on(monkeypatch):
+    monkeypatch.setattr(OCRConfig, "PDF_TEXT_LAYER", True)
+    monkeypatch.setattr(OCRConfig, "PDF_TEXT_LAYER_MIN_CHARS_PER_PAGE", 25)
+    monkeypatch.setattr(OCRConfig, "PDF_TEXT_LAYER_MIN_IMAGE_PX", 150)
+
+
+def test_text_only_pdf_uses_the_text_layer(tmp_path):
+    assert modul_ocr._text_layer(_pdf(tmp_path / "text.pdf")) == list(LINES)
+
+
+def test_page_with_a_chart_image_goes_to_ocr(tmp_path):
+    path = _pdf(tmp_path / "chart.pdf", image_side_px=400)
+
+    assert pdf_utils.extract_text_layer(path, 150).image_pages == [1]
+    assert modul_ocr._text_layer(path) is None
+
+
+def test_small_images_such_as_logos_are_ignored(tmp_path):
+    assert modul_ocr._text_layer(_pdf(tmp_path / "logo.pdf", image_side_px=40)) == list(LINES)
+
+
+def test_text_layer_decision_is_cached(tmp_path, monkeypatch):
+    cache = TwoTierCache("ocr")
+    text_pdf, chart_pdf = _pdf(tmp_path / "text.pdf"), _pdf(tmp_path / "chart.pdf", image_side_px=400)
+    assert modul_ocr._text_layer(text_pdf, cache, "key-text") == list(LINES)
+    assert modul_ocr._text_layer(chart_pdf, cache, "key-chart") is None
+
+    def no_parsing(*args):
+        raise AssertionError("PDF parsed again")
+
+    monkeypatch.setattr(modul_ocr, "extract_text_layer", no_parsing)
+    assert modul_ocr._text_layer(text_pdf, cache, "key-text") == list(LINES)
+    assert modul_ocr._text_layer(chart_pdf, cache, "key-chart") is None
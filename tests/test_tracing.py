@@ -0,0 +1,47 @@
+import json
+import logging
+
+from src import pipeline
+from src.tracing import Tracer
+
+
+def test_spans_are_appended_through_one_open_file(tmp_path, capsys):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(jsonl_path=str(path))
+
+    with tracer.span("pipeline"):
+        with tracer.span("ocr"):
+            pass
+    handle = tracer._file
+    with tracer.span("pipeline"):
+        pass
+
+    assert tracer._file is handle  # not reopened per span
+    names = [json.loads(line)["name"] for line in path.read_text(encoding="utf-8").splitlines()]
+    assert names == ["ocr", "pipeline", "pipeline"]  # line-buffered: readable before close()
+    tracer.close()
+    assert capsys.readouterr().out == ""  # no [Trace] line unless console=True
+
+
+def test_console_summary_is_opt_in(caplog):
+    caplog.set_level(logging.INFO, logger="src")
+    tracer = Tracer(console=True)
+    with tracer.span("pipeline"):
+        with tracer.span("ocr"):
+            pass
+
+    assert caplog.messages[-1].startswith("[Trace] pipeline ")
+
+
+def test_progress_lines_are_quiet_without_tracing_console(replay, reports, caplog, capsys):
+    replay()
+    report = str(reports / "Commits.png")
+
+    caplog.set_level(logging.WARNING, logger="src")
+    pipeline.analyze_report_file(report, "three_call")
+    assert caplog.records == []
+    assert capsys.readouterr().out == ""  # no stray print() left in the stages
+
+    caplog.set_level(logging.INFO, logger="src")
+    pipeline.analyze_report_file(report, "three_call")
+    assert "--- [Pipeline] Analysis started (three_call)... ---" in caplog.messages